@@ -1,4 +1,5 @@
 from backend import create_app
+import os
 import logging
 
 # Configure logging
@@ -11,6 +12,30 @@ logging.basicConfig(
 app = create_app()
 
 if __name__ == '__main__':
+    # Bring the schema up to date before serving
+    if os.getenv('DB_AUTO_MIGRATE', 'true').lower() == 'true':
+        from backend.db_connection import db
+        from backend.migrations import migrate
+
+        conn = db.connect()
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+
+    # Load the unit conversion tables before the first request
+    try:
+        from backend.db_connection import db
+        from backend.units import warm_unit_table
+
+        conn = db.connect()
+        try:
+            warm_unit_table(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.warning(f'Unit table not preloaded, loading on first use: {e}')
+
     app.run(
         host='0.0.0.0',
         port=8000,
@@ -13,6 +13,14 @@ def create_app():
     # Register close_db function to run after each request
     app.teardown_appcontext(db.close_db)
     
+    # Request timing middleware, /metrics and the api_logs writer
+    from backend.metrics import init_metrics
+    init_metrics(app)
+    
+    # Liveness and readiness probes
+    from backend.health import init_health
+    init_health(app)
+    
     # Import and register blueprints
     from backend.meal import meals
     from backend.meal_plan import meal_plans
@@ -1,10 +1,66 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from backend.db_connection import db
+from backend.cache import catalog_cache
+from backend.nutrition import backfill_daily_nutrition
+from backend.log_rollup import get_api_log_stats, rebuild_api_log_rollups
+from backend.pagination import Page
+from backend.migrations import status as migration_status
+from backend.metrics import metrics
+from backend.etag import bump_versions
+from backend.health import health_monitor
+from backend.events import event_hub
+from backend.log_writer import log_writer
 import csv
+import pymysql
 from io import StringIO
+from datetime import datetime, timedelta
 
 admin = Blueprint('admin', __name__)
 
+# Rows formatted per chunk when streaming CSV exports
+EXPORT_CHUNK_ROWS = 1000
+
+
+def _parse_range_bound(value, end=False):
+    """Parse a YYYY-MM-DD[THH:MM:SS] filter; a bare end date is inclusive"""
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def _stream_csv(conn, query, params, header):
+    """Yield CSV text in chunks from an unbuffered server-side cursor"""
+    cursor = conn.cursor(pymysql.cursors.SSCursor)
+    finished = False
+    try:
+        cursor.execute(query, params)
+        si = StringIO()
+        writer = csv.writer(si)
+        writer.writerow(header)
+        yield si.getvalue()
+
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            si.seek(0)
+            si.truncate()
+            writer.writerows(rows)
+            yield si.getvalue()
+        finished = True
+    finally:
+        if finished:
+            cursor.close()
+        else:
+            # Client went away mid-export: draining the rest of the result
+            # would read the whole table, so drop the connection instead
+            # (the pool discards it when the rollback on release fails)
+            try:
+                conn.close()
+            except Exception:
+                pass
+
 
 # Route 1: GET /admin/error_logs
 @admin.route('/admin/error_logs', methods=['GET'])
@@ -13,9 +69,15 @@ def get_error_logs():
     # Get query parameters
     resolved = request.args.get('resolved', 'false').lower()
     severity = request.args.get('severity')
+    start = request.args.get('start')  # YYYY-MM-DD[THH:MM:SS]
+    end = request.args.get('end')
     export_csv = request.args.get('export', 'false').lower() == 'true'
     
-    cursor = db.get_db().cursor()
+    try:
+        start = _parse_range_bound(start) if start else None
+        end = _parse_range_bound(end, end=True) if end else None
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO dates'}), 400
     
     # Base query
     query = '''
@@ -36,39 +98,35 @@ def get_error_logs():
         query += ' AND severity = %s'
         params.append(severity)
     
-    query += ' ORDER BY timestamp DESC'
+    if start:
+        query += ' AND timestamp >= %s'
+        params.append(start)
     
-    cursor.execute(query, params)
-    results = cursor.fetchall()
+    if end:
+        query += ' AND timestamp < %s'
+        params.append(end)
     
-    # Export as CSV if requested
+    # Stream as CSV if requested, in constant memory
     if export_csv:
-        si = StringIO()
-        writer = csv.writer(si)
-        
-        # Write header
-        writer.writerow(['error_id', 'error_type', 'error_message', 
-                        'severity', 'timestamp', 'is_resolved'])
-        
-        # Write data
-        for row in results:
-            writer.writerow([
-                row['error_id'],
-                row['error_type'],
-                row['error_message'],
-                row['severity'],
-                row['timestamp'],
-                row['is_resolved']
-            ])
-        
-        output = si.getvalue()
+        query += ' ORDER BY timestamp DESC'
+        header = ['error_id', 'error_type', 'error_message',
+                  'severity', 'timestamp', 'is_resolved']
         return Response(
-            output,
+            stream_with_context(_stream_csv(db.get_db(), query, params, header)),
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment;filename=error_logs.csv'}
         )
     
-    return jsonify(results), 200
+    cursor = db.get_db().cursor()
+    page = Page([('timestamp', 'DESC'), ('error_id', 'DESC')], ['timestamp', 'error_id'],
+                not_null=('error_id',))
+    where, where_params = page.where()
+    query += where + page.order_by()
+    
+    cursor.execute(query, params + where_params)
+    results = cursor.fetchall()
+    
+    return page.response(results), 200
 
 
 # Route 2: PUT /admin/error_logs
@@ -101,9 +159,15 @@ def get_all_meal_plans():
     
     cursor = db.get_db().cursor()
     
+    # status_rank is a stored column (problematic statuses first) indexed
+    # with created_at DESC and plan_id DESC, so every page is a range scan
+    order = [('mp.status_rank', 'ASC'), ('mp.created_at', 'DESC'), ('mp.plan_id', 'DESC')]
+    page = Page(order, ['status_rank', 'created_at', 'plan_id'], hidden=('status_rank',),
+                not_null=[expr for expr, _ in order])
+    
     query = '''
         SELECT mp.plan_id, u.username, mp.status,
-               mp.week_start, mp.week_end, mp.created_at
+               mp.week_start, mp.week_end, mp.created_at, mp.status_rank
         FROM meal_plans mp
         JOIN users u ON mp.user_id = u.user_id
         WHERE 1=1
@@ -111,19 +175,17 @@ def get_all_meal_plans():
     params = []
     
     if status_filter:
-        query += ' AND mp.status = %s'
+        query += " AND mp.status_rank = FIELD(%s, 'failed', 'corrupted', 'draft', 'complete')"
         params.append(status_filter)
     
     # Order by problematic statuses first
-    query += '''
-        ORDER BY FIELD(mp.status, 'failed', 'corrupted', 'draft', 'complete'),
-                 mp.created_at DESC
-    '''
+    where, where_params = page.where()
+    query += where + page.order_by()
     
-    cursor.execute(query, params)
+    cursor.execute(query, params + where_params)
     results = cursor.fetchall()
     
-    return jsonify(results), 200
+    return page.response(results), 200
 
 
 # Route 4: GET /admin/ingredients/unmatched
@@ -201,95 +263,206 @@ def delete_duplicate_ingredient(ingredient_id):
         WHERE ingredient_id = %s
     '''
     cursor.execute(delete_query, (ingredient_id,))
+    deleted = cursor.rowcount
+    bump_versions(cursor, 'catalog')
     db.get_db().commit()
     
-    if cursor.rowcount == 0:
+    if deleted == 0:
         return jsonify({'error': 'Ingredient not found'}), 404
     
+    catalog_cache.invalidate('ingredients', f'ingredient:{ingredient_id}')
+    
     return jsonify({'message': 'Duplicate ingredient deleted successfully'}), 200
 
 
 # Route 7: GET /admin/api_logs
 @admin.route('/admin/api_logs', methods=['GET'])
 def get_api_logs():
-    """Get API performance metrics grouped by service"""
+    """Get API latency percentiles by service and endpoint with an hourly series"""
     time_range = request.args.get('time_range', '24h')  # 24h, 7d, 30d
     
     cursor = db.get_db().cursor()
     
-    # Determine time filter
-    time_filter = ''
-    if time_range == '24h':
-        time_filter = 'AND timestamp >= NOW() - INTERVAL 24 HOUR'
-    elif time_range == '7d':
-        time_filter = 'AND timestamp >= NOW() - INTERVAL 7 DAY'
-    elif time_range == '30d':
-        time_filter = 'AND timestamp >= NOW() - INTERVAL 30 DAY'
-    
-    query = f'''
-        SELECT api_service,
-               COUNT(*) AS request_count,
-               AVG(response_time_ms) AS avg_response_time_ms,
-               MIN(response_time_ms) AS min_response_time_ms,
-               MAX(response_time_ms) AS max_response_time_ms,
-               SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END) AS error_count
-        FROM api_logs
-        WHERE 1=1 {time_filter}
-        GROUP BY api_service
-        ORDER BY avg_response_time_ms DESC
-    '''
-    
-    cursor.execute(query)
-    results = cursor.fetchall()
-    
-    return jsonify({
-        'time_range': time_range,
-        'services': results
-    }), 200
+    return jsonify(get_api_log_stats(cursor, time_range)), 200
 
 
 # Route 8: GET /admin/system_health (Bonus route)
 @admin.route('/admin/system_health', methods=['GET'])
 def get_system_health():
-    """Get overall system health summary"""
+    """Get the latest system health snapshot and its age"""
+    try:
+        return jsonify(health_monitor.describe()), 200
+    except Exception as e:
+        return jsonify({'status': 'unknown', 'error': str(e)}), 503
+
+
+# Route 9: GET /admin/db_pool
+@admin.route('/admin/db_pool', methods=['GET'])
+def get_db_pool_stats():
+    """Get database connection pool usage for sizing"""
+    return jsonify(db.pool_stats()), 200
+
+
+# Route 10: GET /admin/catalog_cache
+@admin.route('/admin/catalog_cache', methods=['GET'])
+def get_catalog_cache_stats():
+    """Get catalog cache hit rate and memory usage"""
+    return jsonify(catalog_cache.stats()), 200
+
+
+# Route 11: DELETE /admin/catalog_cache
+@admin.route('/admin/catalog_cache', methods=['DELETE'])
+def clear_catalog_cache():
+    """Drop every cached catalog entry after out-of-band catalog edits"""
+    catalog_cache.clear()
+    bump_versions(db.get_db().cursor(), 'catalog')
+    db.get_db().commit()
+    return jsonify({'message': 'Catalog cache cleared'}), 200
+
+
+# Route 12: POST /admin/nutrition_summary/rebuild
+@admin.route('/admin/nutrition_summary/rebuild', methods=['POST'])
+def rebuild_nutrition_summary():
+    """Recompute daily nutrition summaries from consumed meals"""
+    user_id = request.args.get('user_id', type=int)
     cursor = db.get_db().cursor()
+
+    # Users whose summaries the rebuild may delete, rewrite or create; read
+    # before it runs, as it may delete a user's last summary row
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        cursor.execute('''
+            SELECT user_id FROM daily_nutrition_summary
+            UNION
+            SELECT user_id FROM consumed_meals
+        ''')
+        user_ids = [r['user_id'] for r in cursor.fetchall()]
+    rows = backfill_daily_nutrition(cursor, user_id=user_id)
+    bump_versions(cursor, *(f'consumed_meals:{u}' for u in user_ids))
+    db.get_db().commit()
+
+    return jsonify({
+        'message': 'Daily nutrition summaries rebuilt',
+        'rows_written': rows
+    }), 200
+
+
+# Route 13: GET /admin/migrations
+@admin.route('/admin/migrations', methods=['GET'])
+def get_migrations():
+    """Get applied and pending schema migrations"""
+    return jsonify(migration_status(db.get_db(write=True))), 200
+
+
+# Route 14: GET /admin/route_metrics
+@admin.route('/admin/route_metrics', methods=['GET'])
+def get_route_metrics():
+    """Get per-route request counts and p50/p95/p99 latency, slowest first"""
+    return jsonify({
+        'routes': metrics.summary(),
+        'log_writer': log_writer.stats()
+    }), 200
+
+
+# Route 15: POST /admin/api_logs/rebuild
+@admin.route('/admin/api_logs/rebuild', methods=['POST'])
+def rebuild_api_logs_rollup():
+    """Recompute hourly API log rollups from api_logs"""
+    since = request.args.get('since')
+    try:
+        since = _parse_range_bound(since) if since else None
+    except ValueError:
+        return jsonify({'error': 'since must be an ISO date'}), 400
     
-    # Get error count
-    cursor.execute('''
-        SELECT COUNT(*) as unresolved_errors
-        FROM error_logs
-        WHERE is_resolved = FALSE
-    ''')
-    error_count = cursor.fetchone()['unresolved_errors']
-    
-    # Get unmatched ingredients count
+    cursor = db.get_db().cursor()
+
+    rows = rebuild_api_log_rollups(cursor, since=since)
+    db.get_db().commit()
+
+    return jsonify({
+        'message': 'API log rollups rebuilt',
+        'rows_written': rows
+    }), 200
+
+
+# Route 16: GET /admin/events
+@admin.route('/admin/events', methods=['GET'])
+def stream_admin_events():
+    """Stream new error logs, health changes and api_logs ticks as Server-Sent Events"""
+    return Response(
+        stream_with_context(event_hub.stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Route 17: GET /admin/units
+@admin.route('/admin/units', methods=['GET'])
+def get_units():
+    """Get the unit table and every ingredient's conversions"""
+    cursor = db.get_db().cursor()
+
     cursor.execute('''
-        SELECT COUNT(*) as unmatched_count
-        FROM ingredients
-        WHERE standardized_name IS NULL OR standardized_name = ''
+        SELECT unit, dimension, to_base
+        FROM units
+        ORDER BY dimension, to_base
     ''')
-    unmatched_count = cursor.fetchone()['unmatched_count']
-    
-    # Get failed meal plans count
+    units = cursor.fetchall()
+
     cursor.execute('''
-        SELECT COUNT(*) as failed_plans
-        FROM meal_plans
-        WHERE status IN ('failed', 'corrupted')
+        SELECT c.ingredient_id, i.ingredient_name,
+               c.density_g_per_ml, c.grams_per_piece
+        FROM ingredient_unit_conversions c
+        JOIN ingredients i ON c.ingredient_id = i.ingredient_id
+        ORDER BY i.ingredient_name
     ''')
-    failed_plans = cursor.fetchone()['failed_plans']
-    
-    # Determine overall status
-    if error_count > 10 or failed_plans > 5:
-        status = 'critical'
-    elif error_count > 5 or unmatched_count > 20:
-        status = 'warning'
-    else:
-        status = 'healthy'
-    
+    conversions = cursor.fetchall()
+
+    return jsonify({'units': units, 'conversions': conversions}), 200
+
+
+# Route 18: PUT /admin/ingredients/<id>/conversions
+@admin.route('/admin/ingredients/<int:ingredient_id>/conversions', methods=['PUT'])
+def set_ingredient_conversions(ingredient_id):
+    """Set an ingredient's density (g per ml) and piece weight (g per piece)"""
+    data = request.json or {}
+    values = []
+    for field in ('density_g_per_ml', 'grams_per_piece'):
+        value = data.get(field)
+        if value is not None:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                value = 0
+            if not value > 0:
+                return jsonify({'error': f'{field} must be a positive number or null'}), 400
+        values.append(value)
+
+    cursor = db.get_db().cursor()
+    cursor.execute('SELECT ingredient_id FROM ingredients WHERE ingredient_id = %s',
+                   (ingredient_id,))
+    if not cursor.fetchone():
+        return jsonify({'error': 'Ingredient not found'}), 404
+
+    query = '''
+        INSERT INTO ingredient_unit_conversions
+            (ingredient_id, density_g_per_ml, grams_per_piece)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            density_g_per_ml = VALUES(density_g_per_ml),
+            grams_per_piece = VALUES(grams_per_piece)
+    '''
+    cursor.execute(query, (ingredient_id, values[0], values[1]))
+    bump_versions(cursor, 'catalog')
+    db.get_db().commit()
+
+    # Grocery lists convert on read, so the new values apply immediately
+    catalog_cache.invalidate('units')
+
     return jsonify({
-        'status': status,
-        'unresolved_errors': error_count,
-        'unmatched_ingredients': unmatched_count,
-        'failed_meal_plans': failed_plans,
-        'timestamp': db.get_db().cursor().execute('SELECT NOW()').fetchone()[0]
+        'message': 'Conversions updated',
+        'ingredient_id': ingredient_id,
+        'density_g_per_ml': values[0],
+        'grams_per_piece': values[1]
     }), 200
@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from backend.db_connection import db
+
+
+def _estimate_size(value):
+    """Approximate memory cost of a cached value by its JSON length
+
+    Objects that know their own footprint expose it as nbytes.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    if nbytes is not None:
+        return nbytes
+    return len(json.dumps(value, default=str))
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTL, a byte cap and tags
+
+    Each entry may carry tags (e.g. 'meal:5') so that a write can
+    invalidate every entry derived from the rows it touched.
+    """
+
+    def __init__(self, ttl=300, max_bytes=16 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires, size, tags)
+        self._tags = {}  # tag -> set of keys
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _remove(self, key):
+        value, expires, size, tags = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        """Return (True, value) on a live hit, (False, None) otherwise"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry[1] < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def set(self, key, value, tags=(), ttl=None):
+        """Store a value, evicting least recently used entries over the cap"""
+        size = _estimate_size(value)
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, expires, size, tags)
+            self._bytes += size
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def get_or_load(self, key, loader, tags=(), ttl=None):
+        """Return the cached value or call loader() and cache its result
+
+        tags may be a callable taking the loaded value, for entries whose
+        dependencies are only known after the query runs.
+        """
+        found, value = self.get(key)
+        if found:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, tags(value) if callable(tags) else tags, ttl)
+        return value
+
+    def invalidate(self, *tags):
+        """Drop every entry carrying any of the given tags"""
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class CatalogCache(LRUCache):
+    """Cache for the meals / ingredients / meal_ingredients catalog
+
+    Entries are tagged 'meals', 'meal:<id>', 'ingredients' and
+    'ingredient:<id>'. Writes to the catalog call invalidate() with the
+    tags they affect. In addition, ingredients.last_modified is polled at
+    most every refresh_interval seconds and only entries that depend on
+    the changed ingredients are dropped. The same poll reads the 'catalog'
+    row of resource_versions, so catalog ETags need no query of their own.
+    """
+
+    def __init__(self, ttl=300, max_bytes=16 * 1024 * 1024, refresh_interval=5):
+        super().__init__(ttl, max_bytes)
+        self.refresh_interval = refresh_interval
+        self._version = 0
+        self._watermark = None
+        self._seen_at_watermark = set()
+        self._next_refresh = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self):
+        """Invalidate entries for ingredients modified since the last check
+
+        Touches the database at most once per refresh_interval.
+        """
+        now = time.monotonic()
+        if now < self._next_refresh or not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = now + self.refresh_interval
+            cursor = db.get_db().cursor()
+            cursor.execute("SELECT version FROM resource_versions WHERE scope = 'catalog'")
+            row = cursor.fetchone()
+            self._version = row['version'] if row else 0
+
+            if self._watermark is None:
+                cursor.execute('SELECT MAX(last_modified) AS watermark FROM ingredients')
+                row = cursor.fetchone()
+                self._watermark = row['watermark'] if row else None
+                if self._watermark is not None:
+                    cursor.execute('''
+                        SELECT ingredient_id FROM ingredients
+                        WHERE last_modified = %s
+                    ''', (self._watermark,))
+                    self._seen_at_watermark = {r['ingredient_id'] for r in cursor.fetchall()}
+                return
+
+            # >= plus the seen set catches same-second updates without
+            # re-invalidating rows already handled
+            cursor.execute('''
+                SELECT ingredient_id, last_modified
+                FROM ingredients
+                WHERE last_modified >= %s
+            ''', (self._watermark,))
+            changed = [
+                r for r in cursor.fetchall()
+                if not (r['last_modified'] == self._watermark
+                        and r['ingredient_id'] in self._seen_at_watermark)
+            ]
+            if not changed:
+                return
+
+            self.invalidate('ingredients', *(f"ingredient:{r['ingredient_id']}" for r in changed))
+            newest = max(r['last_modified'] for r in changed)
+            if newest != self._watermark:
+                self._watermark = newest
+                self._seen_at_watermark = set()
+            self._seen_at_watermark.update(
+                r['ingredient_id'] for r in changed if r['last_modified'] == newest
+            )
+        finally:
+            self._refresh_lock.release()
+
+    def watermark(self):
+        """Newest ingredients.last_modified seen, after a rate-limited refresh"""
+        self.refresh()
+        return self._watermark
+
+    def version(self):
+        """The 'catalog' scope version, after a rate-limited refresh"""
+        self.refresh()
+        return self._version
+
+    def expire_version(self):
+        """Re-read the version on the next check, after a catalog bump"""
+        self._next_refresh = 0.0
+
+
+# Create single instance
+catalog_cache = CatalogCache(
+    ttl=int(os.getenv('CATALOG_CACHE_TTL', 300)),
+    max_bytes=int(os.getenv('CATALOG_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+    refresh_interval=float(os.getenv('CATALOG_CACHE_REFRESH', 5))
+)
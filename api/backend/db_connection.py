@@ -1,35 +1,355 @@
 import os
-from flask import g
+import time
+import threading
+from collections import deque
+from flask import g, request, has_request_context, has_app_context
 import pymysql
 
+
+class TimedDictCursor(pymysql.cursors.DictCursor):
+    """DictCursor that adds its query time and row counts to the request
+
+    The request-timing middleware reads g.db_time_ms, g.db_queries and
+    g.db_rows to split database time from total time.
+    """
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            if has_app_context():
+                g.db_time_ms = g.get('db_time_ms', 0.0) + (time.perf_counter() - started) * 1000
+                g.db_queries = g.get('db_queries', 0) + 1
+                if self.description is not None and self.rowcount > 0:
+                    g.db_rows = g.get('db_rows', 0) + self.rowcount
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of pymysql connections with health checks on checkout"""
+
+    def __init__(self, connect, max_size=10, timeout=10.0,
+                 recycle_seconds=3600, max_uses=1000):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle_seconds = recycle_seconds
+        self.max_uses = max_uses
+
+        self._idle = deque()
+        self._meta = {}  # id(conn) -> {'created': ts, 'uses': n}
+        self._size = 0
+        self._cond = threading.Condition()
+
+        # Counters reported by stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_pings = 0
+
+    def _open(self):
+        conn = self._connect()
+        self._meta[id(conn)] = {'created': time.monotonic(), 'uses': 0}
+        return conn
+
+    def _discard(self, conn):
+        self._meta.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_stale(self, conn):
+        meta = self._meta.get(id(conn))
+        if meta is None:
+            return True
+        if self.recycle_seconds and time.monotonic() - meta['created'] > self.recycle_seconds:
+            return True
+        if self.max_uses and meta['uses'] >= self.max_uses:
+            return True
+        return False
+
+    def acquire(self, timeout=None):
+        """Check a connection out of the pool, opening or waiting as needed"""
+        timeout = self.timeout if timeout is None else timeout
+        conn = None
+        with self._cond:
+            if not self._idle and self._size >= self.max_size:
+                self._waits += 1
+                started = time.monotonic()
+                deadline = started + timeout
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        self._wait_time += time.monotonic() - started
+                        raise PoolTimeout(
+                            f'No database connection available after {timeout}s'
+                        )
+                    self._cond.wait(remaining)
+                self._wait_time += time.monotonic() - started
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                # Reserve the slot before connecting outside the lock
+                self._size += 1
+
+        if conn is None:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+        else:
+            conn = self._check_health(conn)
+
+        with self._cond:
+            self._checkouts += 1
+            self._meta[id(conn)]['uses'] += 1
+        return conn
+
+    def _check_health(self, conn):
+        """Recycle old or overused connections and ping the rest"""
+        if self._is_stale(conn):
+            self._recycled += 1
+            self._discard(conn)
+            return self._reopen()
+        try:
+            conn.ping(reconnect=False)
+        except Exception:
+            self._failed_pings += 1
+            self._discard(conn)
+            return self._reopen()
+        return conn
+
+    def _reopen(self):
+        try:
+            return self._open()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or self._is_stale(conn):
+                if not discard:
+                    self._recycled += 1
+                self._discard(conn)
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection (in-use ones close on release)"""
+        with self._cond:
+            while self._idle:
+                self._discard(self._idle.pop())
+                self._size -= 1
+
+    def stats(self):
+        """Snapshot of pool usage for sizing against the worker count"""
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 2),
+                'avg_wait_ms': round(self._wait_time * 1000 / self._waits, 2) if self._waits else 0.0,
+                'timeouts': self._timeouts,
+                'recycled': self._recycled,
+                'failed_pings': self._failed_pings,
+            }
+
+
+# Request methods whose queries may be served by a read replica
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Header a client sends to be recognised across requests for sticky reads
+CLIENT_ID_HEADER = 'X-Client-Id'
+
+
+class StickyReads:
+    """Clients that wrote recently and keep reading from the primary
+
+    Held in this process, keyed by the X-Client-Id header (the frontend
+    sends one per Streamlit session) or the remote address for clients
+    that send none. Each write restarts the client's window.
+    """
+
+    def __init__(self, seconds, max_clients=10000):
+        self.seconds = seconds
+        self.max_clients = max_clients
+        self._until = {}  # client key -> monotonic deadline
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def client_key():
+        return request.headers.get(CLIENT_ID_HEADER) or request.remote_addr
+
+    def mark(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_clients:
+                self._until = {k: t for k, t in self._until.items() if t > now}
+            self._until[key] = now + self.seconds
+
+    def active(self, key):
+        with self._lock:
+            until = self._until.get(key)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._until[key]
+                return False
+            return True
+
+
+def _parse_hosts(value):
+    """Parse 'host[:port],host[:port]' into (host, port) pairs"""
+    hosts = []
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.partition(':')
+        hosts.append((host, int(port) if port else int(os.getenv('DB_PORT', 3306))))
+    return hosts
+
+
 class DB:
+    """Routes each request to the primary or a read replica through pools
+
+    With no DB_REPLICA_HOSTS configured every request uses the primary.
+    Otherwise GET/HEAD requests read from a replica (round robin) and
+    mutating requests use the primary. After a write the same client (see
+    StickyReads) keeps reading from the primary for DB_READ_STICKY_SECONDS
+    so it sees its own changes despite replication lag.
+    """
+
     def __init__(self):
-        self.conn = None
+        self.sticky = StickyReads(float(os.getenv('DB_READ_STICKY_SECONDS', 5)))
+        self.pool = None
+        self.replica_pools = None
+        self._pool_lock = threading.Lock()
+        self._next_replica = 0
 
-    def connect(self):
+    def connect(self, host=None, port=None):
         """Create database connection"""
-        self.conn = pymysql.connect(
-            host=os.getenv('DB_HOST', 'db'),
-            port=int(os.getenv('DB_PORT', 3306)),
+        return pymysql.connect(
+            host=host or os.getenv('DB_HOST', 'db'),
+            port=port or int(os.getenv('DB_PORT', 3306)),
             user=os.getenv('DB_USER', 'root'),
             password=os.getenv('MYSQL_ROOT_PASSWORD', 'your_password'),
             database=os.getenv('DB_NAME', 'mealbuddy'),
-            cursorclass=pymysql.cursors.DictCursor,
+            cursorclass=TimedDictCursor,
             autocommit=False
         )
-        return self.conn
 
-    def get_db(self):
-        """Get database connection, create if doesn't exist"""
-        if 'db_conn' not in g:
-            g.db_conn = self.connect()
-        return g.db_conn
+    def _make_pool(self, host=None, port=None):
+        return ConnectionPool(
+            lambda: self.connect(host, port),
+            max_size=int(os.getenv('DB_POOL_SIZE', 10)),
+            timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+            recycle_seconds=int(os.getenv('DB_POOL_RECYCLE', 3600)),
+            max_uses=int(os.getenv('DB_POOL_MAX_USES', 1000))
+        )
+
+    def get_pool(self):
+        """Get the primary connection pool, create if doesn't exist"""
+        if self.pool is None:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.replica_pools = [
+                        (f'{host}:{port}', self._make_pool(host, port))
+                        for host, port in _parse_hosts(os.getenv('DB_REPLICA_HOSTS'))
+                    ]
+                    self.pool = self._make_pool()
+        return self.pool
+
+    def _wants_primary(self, write):
+        """Decide whether this checkout must go to the primary"""
+        if write or not self.replica_pools:
+            return True
+        if not has_request_context():
+            return False
+        if request.method not in READ_METHODS:
+            return True
+        return self.sticky.active(self.sticky.client_key())
+
+    def _acquire_replica(self):
+        """Check out from the next healthy replica, None if all are down"""
+        with self._pool_lock:
+            start = self._next_replica
+            self._next_replica = (start + 1) % len(self.replica_pools)
+        for offset in range(len(self.replica_pools)):
+            _, pool = self.replica_pools[(start + offset) % len(self.replica_pools)]
+            try:
+                return pool, pool.acquire()
+            except Exception:
+                continue
+        return None, None
+
+    def get_db(self, write=False):
+        """Get database connection for this request, check out if needed
+
+        Pass write=True from a read-only route that still has to write.
+        Once a request holds a primary connection all of its queries use it.
+        """
+        conns = g.setdefault('db_conns', {})
+        self.get_pool()
+
+        if 'primary' not in conns and self._wants_primary(write):
+            conns['primary'] = (self.pool, self.pool.acquire())
+            if has_request_context() and self.replica_pools and \
+                    (write or request.method not in READ_METHODS):
+                self.sticky.mark(self.sticky.client_key())
+
+        if 'primary' in conns:
+            return conns['primary'][1]
+
+        if 'replica' not in conns:
+            pool, conn = self._acquire_replica()
+            if conn is None:
+                conns['primary'] = (self.pool, self.pool.acquire())
+                return conns['primary'][1]
+            conns['replica'] = (pool, conn)
+        return conns['replica'][1]
 
     def close_db(self, e=None):
-        """Close database connection"""
-        db_conn = g.pop('db_conn', None)
-        if db_conn is not None:
-            db_conn.close()
+        """Return database connections to their pools"""
+        conns = g.pop('db_conns', None) or {}
+        for pool, db_conn in conns.values():
+            pool.release(db_conn)
+
+    def pool_stats(self):
+        """Get connection pool usage counters per database host"""
+        return {
+            'primary': self.get_pool().stats(),
+            'replicas': {name: pool.stats() for name, pool in self.replica_pools}
+        }
 
 # Create single instance
 db = DB()
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import date
+from functools import wraps
+from flask import request, make_response
+from backend.db_connection import db
+
+# Conditional GETs.
+#
+# resource_versions holds a counter per scope ('meal_plan:<id>',
+# 'meal_plans:<user>' for the set of a user's plans, 'inventory:<user>',
+# 'consumed_meals:<user>', 'templates:<user>', 'catalog'). Write routes
+# bump the scopes they change in the same transaction. A route wrapped in
+# @conditional derives its ETag from the URL and the versions of the
+# scopes it reads, so a matching If-None-Match is answered 304 after one
+# primary-key lookup, without running the route's queries. The 'catalog'
+# scope is not looked up per request: its version and the newest
+# ingredients.last_modified (which covers edits made outside the API) are
+# kept by the catalog cache and re-read on its refresh interval, so
+# catalog-only GETs never touch the database. A catalog bump makes this
+# process re-read them on its next check.
+
+
+def bump_versions(cursor, *scopes):
+    """Mark scopes as changed; call inside the writing transaction"""
+    if not scopes:
+        return
+    if 'catalog' in scopes:
+        from backend.cache import catalog_cache
+        catalog_cache.expire_version()
+    cursor.executemany('''
+        INSERT INTO resource_versions (scope, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    ''', [(scope,) for scope in scopes])
+
+
+def get_versions(cursor, scopes):
+    """Map scope -> version, 0 for scopes never written"""
+    placeholders = ', '.join(['%s'] * len(scopes))
+    cursor.execute(f'''
+        SELECT scope, version FROM resource_versions
+        WHERE scope IN ({placeholders})
+    ''', tuple(scopes))
+    versions = dict.fromkeys(scopes, 0)
+    versions.update({row['scope']: row['version'] for row in cursor.fetchall()})
+    return versions
+
+
+def compute_etag(scopes):
+    from backend.cache import catalog_cache
+
+    row_scopes = [scope for scope in scopes if scope != 'catalog']
+    versions = get_versions(db.get_db().cursor(), row_scopes) if row_scopes else {}
+    if 'catalog' in scopes:
+        versions['catalog'] = catalog_cache.version()
+    # Today's date covers responses filtered on expiration dates
+    parts = [request.full_path, date.today().isoformat()]
+    parts += [f'{scope}={versions[scope]}' for scope in sorted(versions)]
+    if 'catalog' in versions:
+        parts.append(f'ingredients={catalog_cache.watermark()}')
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:20]
+
+
+def conditional(scopes):
+    """Serve GETs with an ETag and answer matching If-None-Match with 304
+
+    scopes is a function of the view arguments returning the version
+    scopes the response depends on.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = compute_etag(scopes(**kwargs))
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
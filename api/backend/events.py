@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Admin dashboard event stream.
+#
+# One watcher thread polls for changes while at least one dashboard is
+# subscribed and fans each change out to every subscriber's queue, so N
+# open dashboards cost one query loop. Each tick reads new error_logs rows
+# past a watermark and the current hour's api_logs rollup; health status
+# changes come from the health snapshot without touching the database.
+# error_id is assigned at insert but rows become visible at commit, so a
+# lower id can appear after a higher one: the watcher re-reads the last
+# error_window ids each tick and skips the ones it already published.
+# Subscribers that fall too far behind are disconnected and reconnect.
+
+
+def format_event(event, data, event_id=None):
+    """Serialize one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    payload = json.dumps(data, default=str)
+    lines.append(f'data: {payload}')
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One SSE client's pending messages"""
+
+    def __init__(self, max_pending):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.closed = False
+
+
+class EventHub:
+    """Single watcher fanning admin change events out to SSE subscribers"""
+
+    def __init__(self, interval=2.0, max_pending=100, error_window=200):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.error_window = error_window
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+        # Last published state, replayed to new subscribers
+        self._last_error_id = None
+        self._seen_error_ids = set()
+        self._health = None
+        self._api_tick = None
+
+    def subscribe(self):
+        sub = Subscription(self.max_pending)
+        with self._lock:
+            self._subscribers.add(sub)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='admin-events', daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def current(self):
+        """Latest health and api_logs tick for a new subscriber, no queries"""
+        events = []
+        if self._health is not None:
+            events.append(('health', self._health))
+        if self._api_tick is not None:
+            events.append(('api_logs', self._api_tick))
+        return events
+
+    def publish(self, event, data, event_id=None):
+        message = format_event(event, data, event_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                # Too slow; end its stream so the browser reconnects fresh
+                sub.closed = True
+                self.unsubscribe(sub)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = bool(self._subscribers)
+            if not active:
+                # Idle until someone subscribes
+                self._wake.clear()
+                self._wake.wait()
+                continue
+            try:
+                self.poll()
+            except Exception as e:
+                logger.warning(f'Admin event poll failed: {e}')
+            time.sleep(self.interval)
+
+    def poll(self):
+        """Run one watcher tick and publish whatever changed"""
+        from backend.db_connection import db
+        from backend.health import health_monitor
+        from backend.log_rollup import hour_of
+
+        pool = db.get_pool()
+        conn = pool.acquire()
+        discard = False
+        try:
+            cursor = conn.cursor()
+            if self._last_error_id is None:
+                cursor.execute('SELECT COALESCE(MAX(error_id), 0) AS last_id FROM error_logs')
+                self._last_error_id = cursor.fetchone()['last_id']
+                cursor.execute('SELECT error_id FROM error_logs WHERE error_id > %s',
+                               (self._last_error_id - self.error_window,))
+                self._seen_error_ids = {r['error_id'] for r in cursor.fetchall()}
+            else:
+                cursor.execute('''
+                    SELECT error_id, error_type, error_message, severity,
+                           timestamp, is_resolved
+                    FROM error_logs
+                    WHERE error_id > %s
+                    ORDER BY error_id
+                    LIMIT %s
+                ''', (self._last_error_id - self.error_window, 500 + self.error_window))
+                self._publish_errors(cursor.fetchall())
+
+            hour = hour_of(datetime.now())
+            cursor.execute('''
+                SELECT SUM(request_count) AS request_count,
+                       SUM(error_count) AS error_count,
+                       SUM(total_ms) AS total_ms
+                FROM api_log_hourly
+                WHERE hour_start = %s
+            ''', (hour,))
+            row = cursor.fetchone()
+        except Exception:
+            discard = True
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+
+        count = int(row['request_count'] or 0)
+        tick = {
+            'hour': hour.isoformat(),
+            'request_count': count,
+            'error_count': int(row['error_count'] or 0),
+            'avg_response_time_ms': round(float(row['total_ms']) / count, 2) if count else None,
+        }
+        if tick != self._api_tick:
+            self._api_tick = tick
+            self.publish('api_logs', tick)
+
+        # Publish when a counter or the status changes, not on every refresh
+        snapshot, _ = health_monitor.get()
+        health = dict(snapshot)
+        counters = {k: v for k, v in health.items() if k != 'timestamp'}
+        if self._health is None or counters != {k: v for k, v in self._health.items() if k != 'timestamp'}:
+            self._health = health
+            self.publish('health', health)
+
+    def _publish_errors(self, rows):
+        """Publish rows not seen yet and slide the window past the newest id"""
+        for row in rows:
+            if row['error_id'] in self._seen_error_ids:
+                continue
+            self.publish('error_log', row, event_id=row['error_id'])
+            self._seen_error_ids.add(row['error_id'])
+            self._last_error_id = max(self._last_error_id, row['error_id'])
+        floor = self._last_error_id - self.error_window
+        self._seen_error_ids = {i for i in self._seen_error_ids if i > floor}
+
+    def stream(self, keepalive=15.0):
+        """Yield SSE text for one client until it disconnects or falls behind"""
+        sub = self.subscribe()
+        try:
+            yield 'retry: 3000\n\n'
+            for event, data in self.current():
+                yield format_event(event, data)
+            while not sub.closed:
+                try:
+                    yield sub.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(sub)
+
+
+# Create single instance
+event_hub = EventHub(
+    interval=float(os.getenv('ADMIN_EVENTS_POLL_SECONDS', 2.0)),
+    error_window=int(os.getenv('ADMIN_EVENTS_ERROR_WINDOW', 200))
+)
@@ -0,0 +1,207 @@
+from backend.units import get_unit_table
+
+# Materialized per-plan grocery lists.
+#
+# Each meal plan owns one grocery_list row (grocery_list.plan_id) holding
+# the summed quantity of every ingredient/unit the plan needs. The list is
+# built on first read and then kept current by applying each planned
+# meal's ingredients as a +1 / -1 delta in the same transaction as the
+# planned_meals write. Callers commit.
+
+
+def get_plan_list_id(cursor, plan_id):
+    """Get the grocery_list id for a plan, None if not materialized yet"""
+    cursor.execute('SELECT gl_id FROM grocery_list WHERE plan_id = %s', (plan_id,))
+    row = cursor.fetchone()
+    return row['gl_id'] if row else None
+
+
+def build_plan_list(cursor, plan_id):
+    """Materialize a plan's grocery list from planned_meals
+
+    Returns the grocery_list id, or None if the plan does not exist.
+    """
+    # A concurrent first read waits on the winner's row and then takes the
+    # duplicate branch; LAST_INSERT_ID(gl_id) reports the existing id, so
+    # neither a unique key error nor a stale snapshot read can get in the way
+    cursor.execute('''
+        INSERT INTO grocery_list (user_id, plan_id)
+        SELECT user_id, plan_id
+        FROM meal_plans
+        WHERE plan_id = %s
+        ON DUPLICATE KEY UPDATE gl_id = LAST_INSERT_ID(gl_id)
+    ''', (plan_id,))
+    created = cursor.rowcount == 1
+
+    gl_id = cursor.lastrowid or None
+    if created:
+        _fill_plan_list(cursor, plan_id, gl_id)
+    return gl_id
+
+
+def rebuild_plan_list(cursor, plan_id):
+    """Recompute a plan's grocery list from scratch"""
+    gl_id = build_plan_list(cursor, plan_id)
+    if gl_id is not None:
+        cursor.execute('DELETE FROM grocery_list_ingredients WHERE gl_id = %s', (gl_id,))
+        _fill_plan_list(cursor, plan_id, gl_id)
+        cursor.execute('UPDATE grocery_list SET date_generated = NOW() WHERE gl_id = %s', (gl_id,))
+    return gl_id
+
+
+def _fill_plan_list(cursor, plan_id, gl_id):
+    cursor.execute('''
+        INSERT INTO grocery_list_ingredients (gl_id, ingredient_id, unit, quantity)
+        SELECT %s, mi.ingredient_id, mi.unit, SUM(mi.quantity)
+        FROM planned_meals pm
+        JOIN meal_ingredients mi ON pm.meal_id = mi.meal_id
+        WHERE pm.plan_id = %s
+        GROUP BY mi.ingredient_id, mi.unit
+    ''', (gl_id, plan_id))
+
+
+def apply_meal_delta(cursor, plan_id, meal_id, sign):
+    """Add (sign=1) or remove (sign=-1) one serving of a meal's ingredients
+
+    Only the meal's ingredient rows are touched. Plans whose list has not
+    been materialized yet are skipped; their first read builds it from
+    the current planned_meals.
+    """
+    gl_id = get_plan_list_id(cursor, plan_id)
+    if gl_id is None:
+        return
+
+    cursor.execute('''
+        INSERT INTO grocery_list_ingredients (gl_id, ingredient_id, unit, quantity)
+        SELECT %s, ingredient_id, unit, quantity * %s
+        FROM meal_ingredients
+        WHERE meal_id = %s
+        ON DUPLICATE KEY UPDATE
+            quantity = grocery_list_ingredients.quantity + VALUES(quantity)
+    ''', (gl_id, sign, meal_id))
+
+    if sign < 0:
+        cursor.execute('''
+            DELETE FROM grocery_list_ingredients
+            WHERE gl_id = %s
+              AND quantity <= 0
+              AND ingredient_id IN (
+                  SELECT ingredient_id FROM meal_ingredients WHERE meal_id = %s
+              )
+        ''', (gl_id, meal_id))
+
+
+# Reading a list.
+#
+# Lines are stored in recipe units so that deltas and conversion edits
+# never require a rebuild. On read they are converted to canonical units
+# and collapsed to one line per ingredient and unit (see units.py).
+#
+# The to-buy list nets that against the plan owner's unexpired inventory,
+# converted the same way, and the first date the plan needs each
+# ingredient (unscheduled meals count from week_start). Stock that
+# expires before that date does not cover the need and is flagged.
+# Inventory rows without a unit predate unit tracking and are drawn down
+# across the ingredient's lines in order.
+
+
+def _collapse(rows):
+    """Sum list rows per ingredient and canonical unit, keeping row details"""
+    details = {row['ingredient_id']: row for row in rows}
+    ids, units, totals = get_unit_table().aggregate(
+        [row['ingredient_id'] for row in rows],
+        [row['unit'] for row in rows],
+        [row['quantity'] for row in rows]
+    )
+    lines = []
+    for ingredient_id, unit, total in zip(ids.tolist(), units, totals.tolist()):
+        row = details[ingredient_id]
+        lines.append({
+            'ingredient_id': ingredient_id,
+            'ingredient_name': row['ingredient_name'],
+            'category': row['category'],
+            'unit': unit,
+            'total_quantity': round(total, 2),
+        })
+    lines.sort(key=lambda l: (l['category'] or '', l['ingredient_name'], l['unit'] or ''))
+    return lines
+
+
+def get_list_lines(cursor, gl_id):
+    """Get a grocery list as one line per ingredient and canonical unit"""
+    cursor.execute('''
+        SELECT i.ingredient_id, i.ingredient_name, i.category,
+               gli.quantity, gli.unit
+        FROM grocery_list_ingredients gli
+        JOIN ingredients i ON gli.ingredient_id = i.ingredient_id
+        WHERE gli.gl_id = %s
+    ''', (gl_id,))
+    return _collapse(cursor.fetchall())
+
+
+def get_to_buy(cursor, plan_id, gl_id):
+    """Get the plan's grocery lines still to buy after the owner's inventory"""
+    lines = get_list_lines(cursor, gl_id)
+
+    cursor.execute('''
+        SELECT mi.ingredient_id,
+               MIN(IF(pm.day_of_week IS NULL, mp.week_start,
+                      mp.week_start + INTERVAL FIELD(pm.day_of_week,
+                          'Mon','Tue','Wed','Thu','Fri','Sat','Sun') - 1 DAY)) AS first_needed
+        FROM planned_meals pm
+        JOIN meal_plans mp ON mp.plan_id = pm.plan_id
+        JOIN meal_ingredients mi ON mi.meal_id = pm.meal_id
+        WHERE pm.plan_id = %s
+        GROUP BY mi.ingredient_id
+    ''', (plan_id,))
+    first_needed = {row['ingredient_id']: row['first_needed'] for row in cursor.fetchall()}
+
+    cursor.execute('''
+        SELECT inv.ingredient_id, inv.quantity, inv.unit, inv.expiration_date
+        FROM inventory inv
+        JOIN grocery_list gl ON gl.user_id = inv.user_id
+        WHERE gl.gl_id = %s
+          AND (inv.expiration_date IS NULL OR inv.expiration_date >= CURDATE())
+          AND inv.ingredient_id IN (
+              SELECT ingredient_id FROM grocery_list_ingredients WHERE gl_id = %s
+          )
+    ''', (gl_id, gl_id))
+    stock = cursor.fetchall()
+    quantities, units = get_unit_table().normalize(
+        [row['ingredient_id'] for row in stock],
+        [row['unit'] for row in stock],
+        [row['quantity'] for row in stock]
+    )
+    # ingredient_id -> [usable quantity left, canonical unit or None, expiration, expires early]
+    remaining = {}
+    for row, quantity, unit in zip(stock, quantities.tolist(), units):
+        needed = first_needed.get(row['ingredient_id'])
+        expiring = row['expiration_date']
+        early = expiring is not None and needed is not None and expiring < needed
+        remaining[row['ingredient_id']] = [0.0 if early else quantity, unit, expiring, early]
+
+    results = []
+    for line in lines:
+        entry = remaining.get(line['ingredient_id'])
+        on_hand = used = 0.0
+        expiration, early = None, False
+        if entry is not None and entry[1] in (None, line['unit']):
+            on_hand, _, expiration, early = entry
+            used = min(on_hand, line['total_quantity'])
+            entry[0] = on_hand - used
+
+        to_buy = round(line['total_quantity'] - used, 2)
+        if to_buy > 0:
+            results.append({
+                'ingredient_id': line['ingredient_id'],
+                'ingredient_name': line['ingredient_name'],
+                'category': line['category'],
+                'unit': line['unit'],
+                'required_quantity': line['total_quantity'],
+                'on_hand': round(on_hand, 2),
+                'expiration_date': expiration,
+                'first_needed': first_needed.get(line['ingredient_id']),
+                'to_buy': to_buy,
+                'expires_before_needed': early,
+            })
+    return results
@@ -0,0 +1,137 @@
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from types import MappingProxyType
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# Health snapshot.
+#
+# A background thread runs one consolidated counting query every
+# `interval` seconds and publishes the result as a read-only mapping; the
+# system health route only reads the latest snapshot, so dashboard polls
+# cost the database nothing. The thread starts with the first read.
+
+
+def _status(counts):
+    if counts['unresolved_errors'] > 10 or counts['failed_meal_plans'] > 5:
+        return 'critical'
+    if counts['unresolved_errors'] > 5 or counts['unmatched_ingredients'] > 20:
+        return 'warning'
+    return 'healthy'
+
+
+class HealthMonitor:
+    """Periodically refreshed, immutable system health snapshot"""
+
+    def __init__(self, interval=30.0):
+        self.interval = interval
+        self._snapshot = None
+        self._refreshed_at = None  # monotonic time of the last success
+        self._last_error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='health-monitor', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f'Health snapshot refresh failed: {e}')
+
+    def refresh(self):
+        """Recompute every counter in one query and publish a new snapshot"""
+        from backend.db_connection import db
+
+        pool = db.get_pool()
+        conn = pool.acquire()
+        discard = False
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT
+                    (SELECT COUNT(*) FROM error_logs
+                     WHERE is_resolved = FALSE) AS unresolved_errors,
+                    (SELECT COUNT(*) FROM ingredients
+                     WHERE standardized_name IS NULL OR standardized_name = '') AS unmatched_ingredients,
+                    (SELECT COUNT(*) FROM meal_plans
+                     WHERE status IN ('failed', 'corrupted')) AS failed_meal_plans,
+                    NOW() AS timestamp
+            ''')
+            row = cursor.fetchone()
+        except Exception as e:
+            discard = True
+            self._last_error = str(e)
+            raise
+        finally:
+            pool.release(conn, discard=discard)
+
+        counts = {
+            'unresolved_errors': row['unresolved_errors'],
+            'unmatched_ingredients': row['unmatched_ingredients'],
+            'failed_meal_plans': row['failed_meal_plans'],
+        }
+        self._snapshot = MappingProxyType(
+            dict(counts, status=_status(counts), timestamp=row['timestamp'])
+        )
+        self._refreshed_at = time.monotonic()
+        self._last_error = None
+        return self._snapshot
+
+    def get(self):
+        """Latest snapshot and its age in seconds, computing the first one inline"""
+        self.start()
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot, time.monotonic() - self._refreshed_at
+
+    def describe(self):
+        """JSON body for the system health route"""
+        snapshot, age = self.get()
+        body = dict(snapshot)
+        body['age_seconds'] = round(age, 1)
+        body['refresh_interval_seconds'] = self.interval
+        body['stale'] = age > 3 * self.interval
+        if self._last_error:
+            body['last_error'] = self._last_error
+        return body
+
+
+# Create single instance
+health_monitor = HealthMonitor(interval=float(os.getenv('HEALTH_REFRESH_SECONDS', 30)))
+
+
+def init_health(app):
+    """Register the liveness and readiness probes"""
+    from backend.db_connection import db, PoolTimeout
+
+    @app.route('/health/live')
+    def liveness():
+        return jsonify({'status': 'alive', 'timestamp': datetime.now().isoformat()}), 200
+
+    @app.route('/health/ready')
+    def readiness():
+        # A checkout pings the connection; no tables are read
+        pool = db.get_pool()
+        try:
+            conn = pool.acquire(timeout=1.0)
+        except PoolTimeout:
+            return jsonify({'status': 'unavailable', 'reason': 'connection pool exhausted',
+                            'pool': pool.stats()}), 503
+        except Exception as e:
+            return jsonify({'status': 'unavailable', 'reason': str(e)}), 503
+        pool.release(conn)
+        return jsonify({'status': 'ready', 'pool': pool.stats()}), 200
@@ -0,0 +1,230 @@
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from backend.units import get_unit_table
+
+# Pantry sync.
+#
+# inventory holds one row per user and ingredient (unique key), so a whole
+# grocery run or pantry count is applied as one multi-row
+# INSERT ... ON DUPLICATE KEY UPDATE plus one multi-row insert into
+# inventory_event_log, inside a single transaction. The user's rows are
+# locked and read once up front to work out the new quantities, the
+# events and the rows to remove. Quantities are converted to canonical
+# units (see units.py) before they are compared or stored. Stored rows
+# are restated the same way first: a row written before its ingredient
+# had a density or piece weight is still in ml or piece and is rewritten
+# in grams on its next write. Rows with no unit predate unit tracking
+# and take the unit of the next write. Callers commit.
+#
+# Removed rows are logged (USED in delta mode, a negative ADJUSTED in
+# full mode) and then deleted; inventory_event_log.inventory_id is set to
+# NULL on delete, so their history is kept.
+
+MODES = ('delta', 'full')
+
+
+def _quantity(value):
+    try:
+        quantity = Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'Invalid quantity {value!r}')
+    if not quantity.is_finite():
+        raise ValueError(f'Invalid quantity {value!r}')
+    return quantity
+
+
+def parse_sync(data):
+    """Validate a pantry sync body, raises ValueError
+
+    {"mode": "delta" | "full",
+     "items": [{"ingredient_id", "quantity", "unit"?, "expiration_date"?}, ...]}
+
+    In delta mode quantities are added (negative means used) and an item
+    that reaches zero is removed. In full mode quantities are the new
+    amounts and ingredients not listed are removed. Repeated ingredients
+    are summed in delta mode; in full mode the last one wins.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Body must be a JSON object')
+    mode = data.get('mode', 'delta')
+    if mode not in MODES:
+        raise ValueError(f'mode must be one of {list(MODES)}')
+
+    items = []
+    try:
+        for item in data.get('items') or []:
+            expiration = item.get('expiration_date')
+            items.append({
+                'ingredient_id': int(item['ingredient_id']),
+                'quantity': _quantity(item['quantity']),
+                'unit': item.get('unit'),
+                'expiration_date': None if expiration is None else date.fromisoformat(expiration),
+            })
+    except (TypeError, KeyError, AttributeError):
+        raise ValueError('Each item needs ingredient_id and quantity')
+    if mode == 'full' and any(item['quantity'] < 0 for item in items):
+        raise ValueError('Quantities must not be negative in full mode')
+    return {'mode': mode, 'items': items}
+
+
+def _merge(mode, items):
+    """Convert items to canonical units and fold repeats, ingredient_id -> item"""
+    quantities, units = get_unit_table().normalize(
+        [item['ingredient_id'] for item in items],
+        [item['unit'] for item in items],
+        [item['quantity'] for item in items]
+    )
+    merged = {}
+    for item, quantity, unit in zip(items, quantities.tolist(), units):
+        item = dict(item, quantity=quantity, unit=unit)
+        previous = merged.get(item['ingredient_id'])
+        if mode == 'delta' and previous is not None:
+            if None not in (unit, previous['unit']) and unit != previous['unit']:
+                raise ValueError(f"Cannot combine {previous['unit']} and {unit} "
+                                 f"of ingredient {item['ingredient_id']}")
+            item['quantity'] += previous['quantity']
+            item['unit'] = unit or previous['unit']
+            item['expiration_date'] = item['expiration_date'] or previous['expiration_date']
+        merged[item['ingredient_id']] = item
+    return merged
+
+
+def restate_item(cursor, row):
+    """Rewrite a locked inventory row in its current canonical unit
+
+    Returns the row's (quantity, unit) afterwards.
+    """
+    quantity, unit = get_unit_table().to_canonical(
+        row['ingredient_id'], row['unit'], row['quantity']
+    )
+    quantity = round(quantity, 2)
+    if unit != row['unit']:
+        cursor.execute('UPDATE inventory SET quantity = %s, unit = %s WHERE inventory_id = %s',
+                       (quantity, unit, row['inventory_id']))
+    return quantity, unit
+
+
+def sync_inventory(cursor, user_id, sync):
+    """Apply a parsed pantry sync to a user's inventory in one transaction
+
+    Returns counts of added, updated, removed and unchanged items and of
+    events logged. Raises ValueError for unknown ingredients and for
+    deltas in a unit that cannot be converted to the stored one.
+    """
+    mode = sync['mode']
+    items = _merge(mode, sync['items'])
+
+    if items:
+        placeholders = ', '.join(['%s'] * len(items))
+        cursor.execute(f'''
+            SELECT ingredient_id FROM ingredients WHERE ingredient_id IN ({placeholders})
+        ''', tuple(items))
+        unknown = set(items) - {row['ingredient_id'] for row in cursor.fetchall()}
+        if unknown:
+            raise ValueError(f'Unknown ingredient_id(s): {sorted(unknown)}')
+
+    cursor.execute('''
+        SELECT inventory_id, ingredient_id, quantity, unit
+        FROM inventory
+        WHERE user_id = %s
+        FOR UPDATE
+    ''', (user_id,))
+    rows = cursor.fetchall()
+    quantities, units = get_unit_table().normalize(
+        [row['ingredient_id'] for row in rows],
+        [row['unit'] for row in rows],
+        [row['quantity'] for row in rows]
+    )
+    # Compare against stored rows restated in their current canonical unit
+    current = {
+        row['ingredient_id']: dict(row, quantity=round(quantity, 2), unit=unit,
+                                   stored_unit=row['unit'])
+        for row, quantity, unit in zip(rows, quantities.tolist(), units)
+    }
+
+    upserts, events, removed = [], [], []
+    counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    for ingredient_id, item in items.items():
+        row = current.get(ingredient_id)
+        have = row['quantity'] if row else 0.0
+        if row and item['unit'] is None and row['stored_unit'] is not None:
+            # A quantity without a unit is in the unit the row was stored in
+            quantity, unit = get_unit_table().to_canonical(
+                ingredient_id, row['stored_unit'], item['quantity']
+            )
+            item = dict(item, quantity=quantity, unit=unit)
+        if mode == 'delta':
+            if row and None not in (row['unit'], item['unit']) and row['unit'] != item['unit']:
+                raise ValueError(f"Ingredient {ingredient_id} is stocked in {row['unit']}, "
+                                 f"not {item['unit']}")
+            new = round(have + item['quantity'], 2)
+        else:
+            new = round(item['quantity'], 2)
+
+        if new <= 0:
+            if row:
+                removed.append(row['inventory_id'])
+                events.append((ingredient_id, 'USED', have) if mode == 'delta'
+                              else (ingredient_id, 'ADJUSTED', -have))
+            continue
+        change = round(new - have, 2)
+        if row is None:
+            counts['added'] += 1
+            events.append((ingredient_id, 'ADDED', new))
+        elif change:
+            counts['updated'] += 1
+            if mode == 'full':
+                events.append((ingredient_id, 'ADJUSTED', change))
+            else:
+                events.append((ingredient_id, 'ADDED' if change > 0 else 'USED', abs(change)))
+        elif (item['expiration_date'] is None and item['unit'] in (None, row['unit'])
+              and row['unit'] == row['stored_unit']):
+            counts['unchanged'] += 1
+            continue
+        else:
+            counts['updated'] += 1
+        unit = item['unit'] or (row['unit'] if row else None)
+        upserts.append((user_id, ingredient_id, new, unit, item['expiration_date']))
+
+    if mode == 'full':
+        for ingredient_id, row in current.items():
+            if ingredient_id not in items:
+                removed.append(row['inventory_id'])
+                events.append((ingredient_id, 'ADJUSTED', -row['quantity']))
+
+    if upserts:
+        # pymysql sends this as a single multi-row statement
+        cursor.executemany('''
+            INSERT INTO inventory (user_id, ingredient_id, quantity, unit, expiration_date)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                quantity = VALUES(quantity),
+                unit = COALESCE(VALUES(unit), inventory.unit),
+                expiration_date = COALESCE(VALUES(expiration_date), inventory.expiration_date)
+        ''', upserts)
+
+    if events:
+        # New rows only have an inventory_id once inserted
+        ids = {ingredient_id: row['inventory_id'] for ingredient_id, row in current.items()}
+        new_ids = [ingredient_id for ingredient_id, _, _ in events if ingredient_id not in ids]
+        if new_ids:
+            placeholders = ', '.join(['%s'] * len(new_ids))
+            cursor.execute(f'''
+                SELECT inventory_id, ingredient_id FROM inventory
+                WHERE user_id = %s AND ingredient_id IN ({placeholders})
+            ''', (user_id, *new_ids))
+            ids.update({row['ingredient_id']: row['inventory_id'] for row in cursor.fetchall()})
+        cursor.executemany('''
+            INSERT INTO inventory_event_log (inventory_id, user_id, event_type, event_quantity)
+            VALUES (%s, %s, %s, %s)
+        ''', [(ids[ingredient_id], user_id, event_type, quantity)
+              for ingredient_id, event_type, quantity in events])
+
+    if removed:
+        placeholders = ', '.join(['%s'] * len(removed))
+        cursor.execute(f'DELETE FROM inventory WHERE inventory_id IN ({placeholders})',
+                       tuple(removed))
+
+    counts['removed'] = len(removed)
+    counts['events_logged'] = len(events)
+    return counts
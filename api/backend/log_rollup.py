@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta
+from backend.sketch import LatencySketch, bucket_index, LOG_GAMMA
+
+# Hourly api_logs rollups.
+#
+# api_log_hourly keeps request/error counts and total/min/max response time
+# per hour, service and endpoint; api_log_hourly_sketch keeps the same
+# rows' latency sketch as (bucket, bucket_count) rows. Both are additive:
+# the log writer folds each batch in with upserts in the same transaction
+# as the api_logs INSERT, and percentiles over any range come from summing
+# bucket counts across hours. Callers commit.
+
+TIME_RANGES = {'24h': timedelta(hours=24), '7d': timedelta(days=7), '30d': timedelta(days=30)}
+
+
+def hour_of(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def apply_api_logs(cursor, rows):
+    """Fold (api_service, endpoint, request_time, response_time_ms, status_code) rows in"""
+    hourly, buckets = {}, {}
+    for service, endpoint, request_time, ms, status in rows:
+        if request_time is None or ms is None:
+            continue
+        key = (hour_of(request_time), service or '', endpoint or '')
+        totals = hourly.get(key)
+        if totals is None:
+            totals = hourly[key] = [0, 0, 0, ms, ms]
+        totals[0] += 1
+        totals[1] += 1 if status is not None and status >= 400 else 0
+        totals[2] += ms
+        totals[3] = min(totals[3], ms)
+        totals[4] = max(totals[4], ms)
+        bucket = key + (bucket_index(ms),)
+        buckets[bucket] = buckets.get(bucket, 0) + 1
+
+    if not hourly:
+        return
+    cursor.executemany('''
+        INSERT INTO api_log_hourly
+            (hour_start, api_service, endpoint, request_count, error_count,
+             total_ms, min_ms, max_ms)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            request_count = request_count + VALUES(request_count),
+            error_count = error_count + VALUES(error_count),
+            total_ms = total_ms + VALUES(total_ms),
+            min_ms = LEAST(min_ms, VALUES(min_ms)),
+            max_ms = GREATEST(max_ms, VALUES(max_ms))
+    ''', [key + tuple(totals) for key, totals in hourly.items()])
+    cursor.executemany('''
+        INSERT INTO api_log_hourly_sketch
+            (hour_start, api_service, endpoint, bucket, bucket_count)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE bucket_count = bucket_count + VALUES(bucket_count)
+    ''', [key + (n,) for key, n in buckets.items()])
+
+
+def rebuild_api_log_rollups(cursor, since=None):
+    """Recompute rollups from api_logs for hours from `since` (all if None)
+
+    Returns the number of hourly rows written.
+    """
+    since = hour_of(since) if since else datetime.min
+    cursor.execute('DELETE FROM api_log_hourly WHERE hour_start >= %s', (since,))
+    cursor.execute('DELETE FROM api_log_hourly_sketch WHERE hour_start >= %s', (since,))
+
+    cursor.execute('''
+        INSERT INTO api_log_hourly
+            (hour_start, api_service, endpoint, request_count, error_count,
+             total_ms, min_ms, max_ms)
+        SELECT DATE_FORMAT(request_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+               COALESCE(api_service, ''), COALESCE(endpoint, ''),
+               COUNT(*),
+               SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END),
+               SUM(response_time_ms), MIN(response_time_ms), MAX(response_time_ms)
+        FROM api_logs
+        WHERE request_time >= %s AND response_time_ms IS NOT NULL
+        GROUP BY 1, 2, 3
+    ''', (since,))
+    written = cursor.rowcount
+
+    # Same bucketing as sketch.bucket_index
+    cursor.execute('''
+        INSERT INTO api_log_hourly_sketch
+            (hour_start, api_service, endpoint, bucket, bucket_count)
+        SELECT DATE_FORMAT(request_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+               COALESCE(api_service, ''), COALESCE(endpoint, ''),
+               CASE WHEN response_time_ms <= 1 THEN 0
+                    ELSE CEIL(LN(response_time_ms) / %s) END AS bucket,
+               COUNT(*)
+        FROM api_logs
+        WHERE request_time >= %s AND response_time_ms IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ''', (LOG_GAMMA, since))
+    return written
+
+
+def _summarize(totals, sketch):
+    count = int(totals['request_count'])
+    summary = {
+        'request_count': count,
+        'error_count': int(totals['error_count']),
+        'avg_response_time_ms': round(float(totals['total_ms']) / count, 2) if count else None,
+        'min_response_time_ms': totals['min_ms'],
+        'max_response_time_ms': totals['max_ms'],
+    }
+    summary.update(sketch.percentiles())
+    return summary
+
+
+def get_api_log_stats(cursor, time_range='24h'):
+    """Per-service and per-endpoint totals and percentiles plus an hourly series"""
+    since = None
+    if time_range in TIME_RANGES:
+        hours = int(TIME_RANGES[time_range].total_seconds() // 3600)
+        since = hour_of(datetime.now()) - timedelta(hours=hours - 1)
+    params = (since or datetime.min,)
+
+    cursor.execute('''
+        SELECT api_service, endpoint,
+               SUM(request_count) AS request_count, SUM(error_count) AS error_count,
+               SUM(total_ms) AS total_ms, MIN(min_ms) AS min_ms, MAX(max_ms) AS max_ms
+        FROM api_log_hourly
+        WHERE hour_start >= %s
+        GROUP BY api_service, endpoint
+    ''', params)
+    endpoint_totals = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT api_service, endpoint, bucket, SUM(bucket_count) AS n
+        FROM api_log_hourly_sketch
+        WHERE hour_start >= %s
+        GROUP BY api_service, endpoint, bucket
+    ''', params)
+    endpoint_sketches = {}
+    for row in cursor.fetchall():
+        sketch = endpoint_sketches.setdefault((row['api_service'], row['endpoint']), LatencySketch())
+        sketch.buckets[row['bucket']] = int(row['n'])
+
+    # Services merge their endpoints' totals and sketches
+    service_totals, service_sketches, endpoints = {}, {}, []
+    for row in endpoint_totals:
+        key = (row['api_service'], row['endpoint'])
+        sketch = endpoint_sketches.get(key, LatencySketch())
+        endpoints.append(dict(api_service=key[0], endpoint=key[1], **_summarize(row, sketch)))
+
+        totals = service_totals.setdefault(row['api_service'], {
+            'request_count': 0, 'error_count': 0, 'total_ms': 0, 'min_ms': None, 'max_ms': None
+        })
+        totals['request_count'] += row['request_count']
+        totals['error_count'] += row['error_count']
+        totals['total_ms'] += row['total_ms']
+        totals['min_ms'] = row['min_ms'] if totals['min_ms'] is None else min(totals['min_ms'], row['min_ms'])
+        totals['max_ms'] = row['max_ms'] if totals['max_ms'] is None else max(totals['max_ms'], row['max_ms'])
+        service_sketches.setdefault(row['api_service'], LatencySketch()).merge(sketch)
+
+    services = [
+        dict(api_service=service, **_summarize(totals, service_sketches[service]))
+        for service, totals in service_totals.items()
+    ]
+    services.sort(key=lambda r: r['avg_response_time_ms'] or 0, reverse=True)
+    endpoints.sort(key=lambda r: r['p95_ms'] or 0, reverse=True)
+
+    return {
+        'time_range': time_range,
+        'services': services,
+        'endpoints': endpoints,
+        'hourly': _hourly_series(cursor, since),
+    }
+
+
+def _hourly_series(cursor, since):
+    params = (since or datetime.min,)
+    cursor.execute('''
+        SELECT hour_start, SUM(request_count) AS request_count,
+               SUM(error_count) AS error_count, SUM(total_ms) AS total_ms
+        FROM api_log_hourly
+        WHERE hour_start >= %s
+        GROUP BY hour_start
+    ''', params)
+    hours = {row['hour_start']: row for row in cursor.fetchall()}
+
+    cursor.execute('''
+        SELECT hour_start, bucket, SUM(bucket_count) AS n
+        FROM api_log_hourly_sketch
+        WHERE hour_start >= %s
+        GROUP BY hour_start, bucket
+    ''', params)
+    sketches = {}
+    for row in cursor.fetchall():
+        sketches.setdefault(row['hour_start'], LatencySketch()).buckets[row['bucket']] = int(row['n'])
+
+    # Fixed ranges list every hour so charts get zeros for idle hours
+    if since is not None:
+        current = hour_of(datetime.now())
+        slots = []
+        hour = since
+        while hour <= current:
+            slots.append(hour)
+            hour += timedelta(hours=1)
+    else:
+        slots = sorted(hours)
+
+    series = []
+    for hour in slots:
+        row = hours.get(hour)
+        count = int(row['request_count']) if row else 0
+        series.append({
+            'hour': hour.isoformat(),
+            'request_count': count,
+            'error_count': int(row['error_count']) if row else 0,
+            'avg_response_time_ms': round(float(row['total_ms']) / count, 2) if count else None,
+            'p95_ms': sketches[hour].quantile(0.95) if hour in sketches else None,
+        })
+    return series
@@ -0,0 +1,190 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from backend.log_rollup import apply_api_logs
+
+logger = logging.getLogger(__name__)
+
+# Columns written for each log table, in the order rows are enqueued
+TABLES = {
+    'api_logs': ('api_service', 'endpoint', 'request_time',
+                 'response_time_ms', 'status_code'),
+    'error_logs': ('error_type', 'error_message', 'severity', 'timestamp',
+                   'related_user_id', 'related_plan_id', 'related_ingredient_id'),
+}
+
+_STOP = object()
+
+
+class LogWriter:
+    """Bounded queue drained by a background thread into multi-row INSERTs
+
+    log() never blocks: when the queue is full the row is dropped and
+    counted. The thread writes once batch_size rows are pending or the
+    oldest pending row is flush_interval seconds old, and stop() flushes
+    whatever is left on shutdown. api_logs rows are folded into the hourly
+    rollups in the same transaction.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval=2.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        # Counters reported by stats(), per table
+        self._enqueued = dict.fromkeys(TABLES, 0)
+        self._dropped = dict.fromkeys(TABLES, 0)
+        self._written = dict.fromkeys(TABLES, 0)
+        self._failed = dict.fromkeys(TABLES, 0)
+        self._batches = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run, name='log-writer', daemon=True
+                )
+                self._thread.start()
+
+    def log(self, table, row):
+        """Queue one row (a tuple in TABLES[table] order), False if dropped"""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((table, row))
+        except queue.Full:
+            with self._lock:
+                self._dropped[table] += 1
+            return False
+        with self._lock:
+            self._enqueued[table] += 1
+        return True
+
+    def log_request(self, api_service, endpoint, request_time, response_time_ms, status_code):
+        return self.log('api_logs', (api_service, endpoint, request_time,
+                                     response_time_ms, status_code))
+
+    def log_error(self, error_type, error_message, severity, timestamp,
+                  user_id=None, plan_id=None, ingredient_id=None):
+        return self.log('error_logs', (error_type, error_message, severity, timestamp,
+                                       user_id, plan_id, ingredient_id))
+
+    def _run(self):
+        pending = {}
+        count = 0
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = self.flush_interval if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+                if item is _STOP:
+                    stopping = True
+                else:
+                    table, row = item
+                    pending.setdefault(table, []).append(row)
+                    count += 1
+                    if deadline is None:
+                        deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+
+            if pending and (stopping or count >= self.batch_size
+                            or time.monotonic() >= deadline):
+                self._write_all(pending)
+                pending, count, deadline = {}, 0, None
+
+        self._write_all(self._drain())
+
+    def _drain(self):
+        pending = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return pending
+            if item is not _STOP:
+                table, row = item
+                pending.setdefault(table, []).append(row)
+
+    def _write_all(self, pending):
+        if not pending:
+            return
+        from backend.db_connection import db
+
+        pool = db.get_pool()
+        try:
+            conn = pool.acquire()
+        except Exception as e:
+            self._record_failure(pending, e)
+            return
+
+        discard = False
+        try:
+            cursor = conn.cursor()
+            for table, rows in pending.items():
+                columns = TABLES[table]
+                query = (f'INSERT INTO {table} ({", ".join(columns)}) '
+                         f'VALUES ({", ".join(["%s"] * len(columns))})')
+                for start in range(0, len(rows), self.batch_size):
+                    cursor.executemany(query, rows[start:start + self.batch_size])
+                if table == 'api_logs':
+                    apply_api_logs(cursor, rows)
+            conn.commit()
+            with self._lock:
+                for table, rows in pending.items():
+                    self._written[table] += len(rows)
+                self._batches += 1
+        except Exception as e:
+            discard = True
+            self._record_failure(pending, e)
+        finally:
+            pool.release(conn, discard=discard)
+
+    def _record_failure(self, pending, error):
+        with self._lock:
+            for table, rows in pending.items():
+                self._failed[table] += len(rows)
+        total = sum(len(rows) for rows in pending.values())
+        logger.warning(f'Dropped {total} log rows: {error}')
+
+    def stop(self, timeout=5.0):
+        """Flush queued rows and stop the thread, used at shutdown"""
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+        if thread is None:
+            self._write_all(self._drain())
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning('Log queue still full at shutdown')
+        thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'capacity': self._queue.maxsize,
+                'batches': self._batches,
+                'enqueued': dict(self._enqueued),
+                'written': dict(self._written),
+                'dropped': dict(self._dropped),
+                'failed': dict(self._failed),
+            }
+
+
+# Create single instance
+log_writer = LogWriter(
+    max_queue=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+    batch_size=int(os.getenv('LOG_BATCH_SIZE', 200)),
+    flush_interval=float(os.getenv('LOG_FLUSH_SECONDS', 2.0))
+)
+atexit.register(log_writer.stop)
@@ -1,60 +1,81 @@
 from flask import Blueprint, request, jsonify
 from backend.db_connection import db
+from backend.etag import conditional
+from backend.cache import catalog_cache
+from backend.suggestions import get_suggestion_index
+from backend.pagination import Page
 
 meals = Blueprint('meals', __name__)
 
 
 # Route 1: GET /meals
 @meals.route('/meals', methods=['GET'])
+@conditional(lambda **_: ['catalog'])
 def get_all_meals():
     """Get all meals with optional filters"""
     # Get query parameters
     difficulty = request.args.get('difficulty')
     max_time = request.args.get('max_time', type=int)
     diet_type = request.args.get('diet_type')
+    page = Page([('m.meal_name', 'ASC'), ('m.meal_id', 'ASC')], ['meal_name', 'meal_id'])
 
-    cursor = db.get_db().cursor()
+    def load():
+        cursor = db.get_db().cursor()
 
-    # Base query
-    query = '''
-        SELECT m.meal_id, m.meal_name, m.difficulty, 
-               m.cooking_time_minutes, m.calories
-        FROM meals m
-        WHERE 1=1
-    '''
-    params = []
+        # Base query
+        query = '''
+            SELECT m.meal_id, m.meal_name, m.difficulty, 
+                   m.cooking_time_minutes, m.calories
+            FROM meals m
+            WHERE 1=1
+        '''
+        params = []
 
-    # Add filters
-    if difficulty:
-        query += ' AND m.difficulty = %s'
-        params.append(difficulty)
+        # Add filters
+        if difficulty:
+            query += ' AND m.difficulty = %s'
+            params.append(difficulty)
 
-    if max_time:
-        query += ' AND m.cooking_time_minutes <= %s'
-        params.append(max_time)
+        if max_time:
+            query += ' AND m.cooking_time_minutes <= %s'
+            params.append(max_time)
 
-    query += ' ORDER BY m.meal_name'
+        where, where_params = page.where()
+        query += where + page.order_by()
+        params += where_params
 
-    cursor.execute(query, params)
-    results = cursor.fetchall()
+        cursor.execute(query, params)
+        return cursor.fetchall()
 
-    return jsonify(results), 200
+    catalog_cache.refresh()
+    results = catalog_cache.get_or_load(
+        ('meals', difficulty, max_time, page.after, page.limit), load, tags=('meals',)
+    )
+
+    return page.response(results), 200
 
 
 # Route 2: GET /meals/<id>
 @meals.route('/meals/<int:meal_id>', methods=['GET'])
+@conditional(lambda **_: ['catalog'])
 def get_meal_details(meal_id):
     """Get complete details for a specific meal"""
-    cursor = db.get_db().cursor()
-
-    query = '''
-        SELECT meal_id, meal_name, difficulty, cooking_time_minutes,
-               calories, protein_g, carbs_g, fat_g, recipe_steps
-        FROM meals
-        WHERE meal_id = %s
-    '''
-    cursor.execute(query, (meal_id,))
-    result = cursor.fetchone()
+    def load():
+        cursor = db.get_db().cursor()
+
+        query = '''
+            SELECT meal_id, meal_name, difficulty, cooking_time_minutes,
+                   calories, protein_g, carbs_g, fat_g, recipe_steps
+            FROM meals
+            WHERE meal_id = %s
+        '''
+        cursor.execute(query, (meal_id,))
+        return cursor.fetchone()
+
+    catalog_cache.refresh()
+    result = catalog_cache.get_or_load(
+        ('meal', meal_id), load, tags=('meals', f'meal:{meal_id}')
+    )
 
     if not result:
         return jsonify({'error': 'Meal not found'}), 404
@@ -64,20 +85,29 @@ def get_meal_details(meal_id):
 
 # Route 3: GET /meals/<id>/ingredients
 @meals.route('/meals/<int:meal_id>/ingredients', methods=['GET'])
+@conditional(lambda **_: ['catalog'])
 def get_meal_ingredients(meal_id):
     """Get all ingredients for a specific meal"""
-    cursor = db.get_db().cursor()
-
-    query = '''
-        SELECT i.ingredient_id, i.ingredient_name, i.category,
-               mi.quantity, mi.unit
-        FROM meal_ingredients mi
-        JOIN ingredients i ON mi.ingredient_id = i.ingredient_id
-        WHERE mi.meal_id = %s
-        ORDER BY i.category, i.ingredient_name
-    '''
-    cursor.execute(query, (meal_id,))
-    results = cursor.fetchall()
+    def load():
+        cursor = db.get_db().cursor()
+
+        query = '''
+            SELECT i.ingredient_id, i.ingredient_name, i.category,
+                   mi.quantity, mi.unit
+            FROM meal_ingredients mi
+            JOIN ingredients i ON mi.ingredient_id = i.ingredient_id
+            WHERE mi.meal_id = %s
+            ORDER BY i.category, i.ingredient_name
+        '''
+        cursor.execute(query, (meal_id,))
+        return cursor.fetchall()
+
+    catalog_cache.refresh()
+    results = catalog_cache.get_or_load(
+        ('meal_ingredients', meal_id), load,
+        tags=lambda rows: [f'meal:{meal_id}', 'meal_ingredients'] +
+                          [f"ingredient:{r['ingredient_id']}" for r in rows]
+    )
 
     return jsonify(results), 200
 
@@ -107,29 +137,37 @@ def get_meal_costs(meal_id):
 
 # Route 5: GET /meals/suggestions
 @meals.route('/meals/suggestions', methods=['GET'])
+@conditional(lambda **_: ['catalog', f"inventory:{request.args.get('user_id', type=int)}"])
 def get_meal_suggestions():
     """Get meal suggestions based on user inventory"""
     user_id = request.args.get('user_id', type=int)
+    difficulty = request.args.get('difficulty')
+    max_time = request.args.get('max_time', type=int)
+    min_match = request.args.get('min_match', 0, type=float)  # percent
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
 
     if not user_id:
         return jsonify({'error': 'user_id parameter required'}), 400
 
     cursor = db.get_db().cursor()
 
+    # Usable pantry items only
     query = '''
-        SELECT DISTINCT m.meal_id, m.meal_name, m.difficulty,
-               m.cooking_time_minutes, m.calories,
-               COUNT(DISTINCT mi.ingredient_id) as matching_ingredients
-        FROM meals m
-        JOIN meal_ingredients mi ON m.meal_id = mi.meal_id
-        JOIN inventory inv ON inv.ingredient_id = mi.ingredient_id
-        WHERE inv.user_id = %s
-        GROUP BY m.meal_id, m.meal_name, m.difficulty, 
-                 m.cooking_time_minutes, m.calories
-        ORDER BY matching_ingredients DESC
-        LIMIT 10
+        SELECT DISTINCT ingredient_id
+        FROM inventory
+        WHERE user_id = %s
+          AND (quantity IS NULL OR quantity > 0)
+          AND (expiration_date IS NULL OR expiration_date >= CURDATE())
     '''
     cursor.execute(query, (user_id,))
-    results = cursor.fetchall()
+    owned = [row['ingredient_id'] for row in cursor.fetchall()]
 
-    return jsonify(results), 200
\ No newline at end of file
+    results = get_suggestion_index().suggest(
+        owned,
+        difficulty=difficulty.lower() if difficulty and difficulty.lower() != 'all' else None,
+        max_time=max_time,
+        min_coverage=min_match / 100,
+        limit=limit
+    )
+
+    return jsonify(results), 200
@@ -1,11 +1,20 @@
 from flask import Blueprint, request, jsonify
 from backend.db_connection import db
+from backend.etag import bump_versions, conditional
+from backend.planner import (apply_week_changes, clone_plan, get_week_view,
+                             parse_copy_options, parse_week_changes, save_template)
+from backend.grocery import (apply_meal_delta, build_plan_list, get_list_lines,
+                             get_plan_list_id, get_to_buy, rebuild_plan_list)
+from backend.nutrition import (UNSCHEDULED, apply_nutrition_delta, build_plan_nutrition,
+                               get_plan_nutrition)
+from datetime import date
 
 meal_plans = Blueprint('meal_plans', __name__)
 
 
 # Route 1: GET /meal_plans/<id>/planned_meals
 @meal_plans.route('/meal_plans/<int:plan_id>/planned_meals', methods=['GET'])
+@conditional(lambda plan_id: [f'meal_plan:{plan_id}', 'catalog'])
 def get_planned_meals(plan_id):
     """Get all planned meals for a specific meal plan"""
     cursor = db.get_db().cursor()
@@ -41,35 +50,56 @@ def add_planned_meal(plan_id):
         data['day_of_week'],
         data['meal_type']
     ))
+    apply_meal_delta(cursor, plan_id, data['meal_id'], 1)
+    apply_nutrition_delta(cursor, plan_id, data['day_of_week'], data['meal_id'], 1)
+    bump_versions(cursor, f'meal_plan:{plan_id}')
     db.get_db().commit()
 
     return jsonify({'message': 'Meal added successfully', 'plan_id': plan_id}), 201
 
 
+def _grocery_scopes(plan_id):
+    scopes = [f'meal_plan:{plan_id}', 'catalog']
+    if request.args.get('mode') == 'to_buy':
+        cursor = db.get_db().cursor()
+        cursor.execute('SELECT user_id FROM meal_plans WHERE plan_id = %s', (plan_id,))
+        row = cursor.fetchone()
+        if row:
+            scopes.append(f"inventory:{row['user_id']}")
+    return scopes
+
+
 # Route 3: GET /meal_plans/<id>/ingredients
 @meal_plans.route('/meal_plans/<int:plan_id>/ingredients', methods=['GET'])
+@conditional(_grocery_scopes)
 def get_grocery_list(plan_id):
-    """Get complete grocery list for meal plan"""
+    """Get complete grocery list for meal plan, or what is left to buy (mode=to_buy)"""
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
     cursor = db.get_db().cursor()
+    gl_id = None if refresh else get_plan_list_id(cursor, plan_id)
 
-    query = '''
-        SELECT i.ingredient_id, i.ingredient_name, i.category,
-               SUM(mi.quantity) as total_quantity, mi.unit
-        FROM planned_meals pm
-        JOIN meal_ingredients mi ON pm.meal_id = mi.meal_id
-        JOIN ingredients i ON mi.ingredient_id = i.ingredient_id
-        WHERE pm.plan_id = %s
-        GROUP BY i.ingredient_id, i.ingredient_name, i.category, mi.unit
-        ORDER BY i.category, i.ingredient_name
-    '''
-    cursor.execute(query, (plan_id,))
-    results = cursor.fetchall()
+    # Build the materialized list on first read (or on request)
+    if gl_id is None:
+        conn = db.get_db(write=True)
+        cursor = conn.cursor()
+        if refresh:
+            gl_id = rebuild_plan_list(cursor, plan_id)
+        else:
+            gl_id = build_plan_list(cursor, plan_id)
+        conn.commit()
 
-    return jsonify(results), 200
+    if gl_id is None:
+        return jsonify({'error': 'Meal plan not found'}), 404
+
+    if request.args.get('mode') == 'to_buy':
+        return jsonify(get_to_buy(cursor, plan_id, gl_id)), 200
+
+    return jsonify(get_list_lines(cursor, gl_id)), 200
 
 
 # Route 4: GET /meal_plans/<id>/shared_ingredients
 @meal_plans.route('/meal_plans/<int:plan_id>/shared_ingredients', methods=['GET'])
+@conditional(lambda plan_id: [f'meal_plan:{plan_id}', 'catalog'])
 def get_shared_ingredients(plan_id):
     """Get ingredients used in multiple meals"""
     cursor = db.get_db().cursor()
@@ -94,22 +124,141 @@ def get_shared_ingredients(plan_id):
 
 # Route 5: GET /meal_plans/<id>/weekly_nutrition
 @meal_plans.route('/meal_plans/<int:plan_id>/weekly_nutrition', methods=['GET'])
+@conditional(lambda plan_id: [f'meal_plan:{plan_id}', 'catalog'])
 def get_weekly_nutrition(plan_id):
-    """Get nutritional summary for entire week"""
+    """Get nutritional summary for entire week with per-day breakdown"""
+    refresh = request.args.get('refresh', 'false').lower() == 'true'
     cursor = db.get_db().cursor()
+    days = [] if refresh else get_plan_nutrition(cursor, plan_id)
 
-    query = '''
-        SELECT 
-            SUM(m.calories) as total_calories,
-            SUM(m.protein_g) as total_protein,
-            SUM(m.carbs_g) as total_carbs,
-            SUM(m.fat_g) as total_fat,
-            COUNT(DISTINCT pm.day_of_week) as days_planned
-        FROM planned_meals pm
-        JOIN meals m ON pm.meal_id = m.meal_id
-        WHERE pm.plan_id = %s
-    '''
-    cursor.execute(query, (plan_id,))
-    result = cursor.fetchone()
+    # Build the rollup rows on first read (or on request)
+    if not days:
+        conn = db.get_db(write=True)
+        cursor = conn.cursor()
+        cursor.execute('SELECT plan_id FROM meal_plans WHERE plan_id = %s', (plan_id,))
+        if cursor.fetchone() is None:
+            return jsonify({'error': 'Meal plan not found'}), 404
+        build_plan_nutrition(cursor, plan_id, rebuild=refresh)
+        conn.commit()
+        days = get_plan_nutrition(cursor, plan_id)
+
+    # Meals without a day count towards the totals but not days_planned
+    unscheduled = [d for d in days if d['day_of_week'] == UNSCHEDULED]
+    days = [d for d in days if d['day_of_week'] != UNSCHEDULED]
+    rows = days + unscheduled
+    result = {
+        'total_calories': sum(d['calories'] for d in rows),
+        'total_protein': sum(d['protein_g'] for d in rows),
+        'total_carbs': sum(d['carbs_g'] for d in rows),
+        'total_fat': sum(d['fat_g'] for d in rows),
+        'days_planned': sum(1 for d in days if d['meal_count'] > 0),
+        'days': days,
+        'unscheduled': unscheduled[0] if unscheduled else None
+    }
+
+    return jsonify(result), 200
+
+
+def _week_view_scopes(plan_id):
+    # The previous/next week links change when the owner gets a new plan
+    scopes = [f'meal_plan:{plan_id}', 'catalog']
+    cursor = db.get_db().cursor()
+    cursor.execute('SELECT user_id FROM meal_plans WHERE plan_id = %s', (plan_id,))
+    row = cursor.fetchone()
+    if row:
+        scopes.append(f"meal_plans:{row['user_id']}")
+    return scopes
+
+
+# Route 6: GET /meal_plans/<id>/week_view
+@meal_plans.route('/meal_plans/<int:plan_id>/week_view', methods=['GET'])
+@conditional(_week_view_scopes)
+def get_plan_week_view(plan_id):
+    """Get the weekly planner grid, per-day macros, cost and adjacent weeks"""
+    cursor = db.get_db().cursor()
+
+    result = get_week_view(cursor, plan_id)
+    if result is None:
+        return jsonify({'error': 'Meal plan not found'}), 404
+
+    return jsonify(result), 200
+
+
+# Route 7: POST /meal_plans/<id>/planned_meals/bulk
+@meal_plans.route('/meal_plans/<int:plan_id>/planned_meals/bulk', methods=['POST'])
+def bulk_update_planned_meals(plan_id):
+    """Add, replace and delete planned meals in one transaction"""
+    try:
+        changes = parse_week_changes(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    try:
+        counts = apply_week_changes(cursor, plan_id, changes)
+    except ValueError as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    if counts is None:
+        return jsonify({'error': 'Meal plan not found'}), 404
+
+    bump_versions(cursor, f'meal_plan:{plan_id}')
+    conn.commit()
+
+    result = get_week_view(cursor, plan_id)
+    result.update(counts)
+    return jsonify(result), 200
+
+
+# Route 8: POST /meal_plans/<id>/clone
+@meal_plans.route('/meal_plans/<int:plan_id>/clone', methods=['POST'])
+def clone_meal_plan(plan_id):
+    """Copy a plan into a new draft plan for another week"""
+    data = request.json or {}
+    try:
+        week_start = date.fromisoformat(data['week_start'])
+        options = parse_copy_options(data)
+    except (KeyError, TypeError):
+        return jsonify({'error': 'week_start (YYYY-MM-DD) is required'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    new_id = clone_plan(cursor, plan_id, week_start, options)
+    if new_id is None:
+        return jsonify({'error': 'Meal plan not found'}), 404
+
+    cursor.execute('SELECT user_id FROM meal_plans WHERE plan_id = %s', (new_id,))
+    bump_versions(cursor, f'meal_plan:{new_id}', f"meal_plans:{cursor.fetchone()['user_id']}")
+    conn.commit()
+
+    return jsonify(get_week_view(cursor, new_id)), 201
+
+
+# Route 9: POST /meal_plans/<id>/templates
+@meal_plans.route('/meal_plans/<int:plan_id>/templates', methods=['POST'])
+def save_meal_plan_template(plan_id):
+    """Save a plan's slots as a named template, replacing one of the same name"""
+    data = request.json or {}
+    name = (data.get('name') or '').strip()
+    if not name:
+        return jsonify({'error': 'name is required'}), 400
+    try:
+        options = parse_copy_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    template_id = save_template(cursor, plan_id, name, options)
+    if template_id is None:
+        return jsonify({'error': 'Meal plan not found'}), 404
+
+    cursor.execute('SELECT user_id FROM meal_plans WHERE plan_id = %s', (plan_id,))
+    bump_versions(cursor, f"templates:{cursor.fetchone()['user_id']}")
+    conn.commit()
 
-    return jsonify(result), 200
\ No newline at end of file
+    return jsonify({'message': 'Template saved', 'template_id': template_id, 'name': name}), 201
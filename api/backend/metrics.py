@@ -0,0 +1,204 @@
+import time
+import threading
+from datetime import datetime
+from flask import g, request, Response, got_request_exception
+
+# Upper bounds (ms) of the latency histogram buckets; the last is +Inf
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with percentile estimates"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS_MS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """Estimate the q-th percentile by interpolating within its bucket"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                lower = BUCKETS_MS[i - 1] if i else 0.0
+                upper = BUCKETS_MS[i]
+                if upper == float('inf'):
+                    return lower
+                return round(lower + (upper - lower) * (rank - seen) / n, 2)
+            seen += n
+        return None
+
+
+class RouteStats:
+    def __init__(self):
+        self.latency = Histogram()
+        self.db_latency = Histogram()
+        self.statuses = {}
+        self.rows = 0
+        self.queries = 0
+
+
+class MetricsRegistry:
+    """Per (blueprint, route, method) request timings, thread-safe"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, blueprint, route, method, status, total_ms, db_ms, rows, queries):
+        key = (blueprint, route, method)
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                stats = self._routes[key] = RouteStats()
+            stats.latency.observe(total_ms)
+            stats.db_latency.observe(db_ms)
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.rows += rows
+            stats.queries += queries
+
+    def summary(self):
+        """Per-route counts and p50/p95/p99, slowest p95 first"""
+        with self._lock:
+            routes = [
+                {
+                    'blueprint': blueprint,
+                    'route': route,
+                    'method': method,
+                    'count': s.latency.count,
+                    'avg_ms': round(s.latency.total / s.latency.count, 2),
+                    'p50_ms': s.latency.percentile(50),
+                    'p95_ms': s.latency.percentile(95),
+                    'p99_ms': s.latency.percentile(99),
+                    'avg_db_ms': round(s.db_latency.total / s.db_latency.count, 2),
+                    'p95_db_ms': s.db_latency.percentile(95),
+                    'rows': s.rows,
+                    'queries': s.queries,
+                    'statuses': {str(code): n for code, n in sorted(s.statuses.items())},
+                }
+                for (blueprint, route, method), s in self._routes.items()
+            ]
+        return sorted(routes, key=lambda r: r['p95_ms'] or 0, reverse=True)
+
+    def prometheus(self):
+        """Render every series in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            items = sorted(self._routes.items())
+            for name, attr, help_text in (
+                ('mealbuddy_request_duration_ms', 'latency', 'Total request time'),
+                ('mealbuddy_request_db_duration_ms', 'db_latency', 'Database time per request'),
+            ):
+                lines.append(f'# HELP {name} {help_text} in milliseconds')
+                lines.append(f'# TYPE {name} histogram')
+                for (blueprint, route, method), s in items:
+                    labels = f'blueprint="{blueprint}",route="{route}",method="{method}"'
+                    hist = getattr(s, attr)
+                    cumulative = 0
+                    for bound, n in zip(BUCKETS_MS, hist.counts):
+                        cumulative += n
+                        le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{labels}}} {hist.total:.3f}')
+                    lines.append(f'{name}_count{{{labels}}} {hist.count}')
+
+            lines.append('# HELP mealbuddy_requests_total Requests by status code')
+            lines.append('# TYPE mealbuddy_requests_total counter')
+            for (blueprint, route, method), s in items:
+                labels = f'blueprint="{blueprint}",route="{route}",method="{method}"'
+                for code, n in sorted(s.statuses.items()):
+                    lines.append(f'mealbuddy_requests_total{{{labels},status="{code}"}} {n}')
+
+            lines.append('# HELP mealbuddy_db_rows_total Rows returned by SELECTs')
+            lines.append('# TYPE mealbuddy_db_rows_total counter')
+            for (blueprint, route, method), s in items:
+                labels = f'blueprint="{blueprint}",route="{route}",method="{method}"'
+                lines.append(f'mealbuddy_db_rows_total{{{labels}}} {s.rows}')
+        return '\n'.join(lines) + '\n'
+
+
+# Create single instance
+metrics = MetricsRegistry()
+
+
+def init_metrics(app):
+    """Register request timing middleware, error logging and /metrics"""
+    from backend.db_connection import db
+    from backend.log_writer import log_writer
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.request_started_at = datetime.now()
+
+    @app.after_request
+    def record_timing(response):
+        started = g.get('request_started')
+        if started is None or request.url_rule is None:
+            return response
+
+        total_ms = (time.perf_counter() - started) * 1000
+        blueprint = request.blueprint or 'app'
+        route = request.url_rule.rule
+        metrics.record(
+            blueprint, route, request.method, response.status_code, total_ms,
+            g.get('db_time_ms', 0.0), g.get('db_rows', 0), g.get('db_queries', 0)
+        )
+        log_writer.log_request(blueprint, route, g.request_started_at,
+                               int(round(total_ms)), response.status_code)
+        response.headers['Server-Timing'] = (
+            f"db;dur={g.get('db_time_ms', 0.0):.1f}, total;dur={total_ms:.1f}"
+        )
+        return response
+
+    def log_exception(sender, exception, **extra):
+        view_args = request.view_args or {}
+        log_writer.log_error(
+            type(exception).__name__,
+            f'{request.method} {request.path}: {exception}',
+            'critical',
+            datetime.now(),
+            user_id=view_args.get('user_id'),
+            plan_id=view_args.get('plan_id'),
+            ingredient_id=view_args.get('ingredient_id')
+        )
+
+    # Unhandled exceptions become error_logs rows; weak=False keeps the
+    # local receiver alive after this function returns
+    got_request_exception.connect(log_exception, app, weak=False)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        text = metrics.prometheus()
+        pool = db.get_pool().stats()
+        text += (
+            '# HELP mealbuddy_db_pool_connections Primary pool connections by state\n'
+            '# TYPE mealbuddy_db_pool_connections gauge\n'
+            f'mealbuddy_db_pool_connections{{state="in_use"}} {pool["in_use"]}\n'
+            f'mealbuddy_db_pool_connections{{state="idle"}} {pool["idle"]}\n'
+            '# HELP mealbuddy_db_pool_waits_total Checkouts that had to wait\n'
+            '# TYPE mealbuddy_db_pool_waits_total counter\n'
+            f'mealbuddy_db_pool_waits_total {pool["waits"]}\n'
+        )
+        writer = log_writer.stats()
+        text += (
+            '# HELP mealbuddy_log_queue_depth Log rows waiting to be written\n'
+            '# TYPE mealbuddy_log_queue_depth gauge\n'
+            f'mealbuddy_log_queue_depth {writer["queued"]}\n'
+            '# HELP mealbuddy_log_rows_dropped_total Log rows dropped on a full queue\n'
+            '# TYPE mealbuddy_log_rows_dropped_total counter\n'
+        )
+        for table, n in writer['dropped'].items():
+            text += f'mealbuddy_log_rows_dropped_total{{table="{table}"}} {n}\n'
+        return Response(text, mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,127 @@
+import re
+import pkgutil
+import importlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Migration modules are named v<version>_<name>.py and define upgrade(cursor)
+MODULE_PATTERN = re.compile(r'^v(\d+)_(\w+)$')
+LOCK_NAME = 'mealbuddy_schema_migrations'
+
+
+def discover():
+    """List (version, name, module) for every migration, oldest first"""
+    found = []
+    for info in pkgutil.iter_modules(__path__):
+        match = MODULE_PATTERN.match(info.name)
+        if match:
+            module = importlib.import_module(f'{__name__}.{info.name}')
+            found.append((int(match.group(1)), match.group(2), module))
+    return sorted(found, key=lambda m: m[0])
+
+
+def _ensure_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+           version INT PRIMARY KEY,
+           name VARCHAR(255) NOT NULL,
+           applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def status(conn):
+    """Get every migration with its applied_at time (None if pending)"""
+    cursor = conn.cursor()
+    _ensure_table(cursor)
+    cursor.execute('SELECT version, applied_at FROM schema_migrations')
+    applied = {row['version']: row['applied_at'] for row in cursor.fetchall()}
+    return [
+        {'version': version, 'name': name, 'applied_at': applied.get(version)}
+        for version, name, _ in discover()
+    ]
+
+
+def migrate(conn, target=None):
+    """Apply pending migrations in order, returns the versions applied
+
+    A MySQL advisory lock keeps concurrent API workers from racing.
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT GET_LOCK(%s, 60) AS locked', (LOCK_NAME,))
+    if not cursor.fetchone()['locked']:
+        raise RuntimeError('Timed out waiting for the migration lock')
+    try:
+        _ensure_table(cursor)
+        cursor.execute('SELECT version FROM schema_migrations')
+        applied = {row['version'] for row in cursor.fetchall()}
+
+        done = []
+        for version, name, module in discover():
+            if version in applied or (target is not None and version > target):
+                continue
+            logger.info(f'Applying migration {version}: {name}')
+            module.upgrade(cursor)
+            cursor.execute(
+                'INSERT INTO schema_migrations (version, name) VALUES (%s, %s)',
+                (version, name)
+            )
+            conn.commit()
+            done.append(version)
+        return done
+    finally:
+        cursor.execute('SELECT RELEASE_LOCK(%s)', (LOCK_NAME,))
+
+
+# Helpers so migrations are safe on databases created from 00_schema.sql,
+# which already contains every change
+
+def table_exists(cursor, table):
+    cursor.execute('''
+        SELECT COUNT(*) AS n FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name = %s
+    ''', (table,))
+    return cursor.fetchone()['n'] > 0
+
+
+def column_exists(cursor, table, column):
+    cursor.execute('''
+        SELECT COUNT(*) AS n FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone()['n'] > 0
+
+
+def index_columns(cursor, table):
+    """Map index name -> {'columns': [...], 'unique': bool} for a table"""
+    cursor.execute('''
+        SELECT index_name AS index_name, column_name AS column_name,
+               non_unique AS non_unique
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    ''', (table,))
+    indexes = {}
+    for row in cursor.fetchall():
+        index = indexes.setdefault(
+            row['index_name'], {'columns': [], 'unique': not row['non_unique']}
+        )
+        index['columns'].append(row['column_name'])
+    return indexes
+
+
+def ensure_index(cursor, table, name, columns, unique=False):
+    """Create an index unless an equivalent one already leads with columns
+
+    Returns True if an index was created.
+    """
+    for index in index_columns(cursor, table).values():
+        if unique and not (index['unique'] and index['columns'] == list(columns)):
+            continue
+        if index['columns'][:len(columns)] == list(columns):
+            return False
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    cols = ', '.join(f'`{c}`' for c in columns)
+    cursor.execute(f'CREATE {kind} `{name}` ON `{table}` ({cols})')
+    return True
@@ -0,0 +1,29 @@
+import sys
+from backend.db_connection import db
+from backend.migrations import migrate, status
+
+USAGE = 'Usage: python -m backend.migrations [status|migrate [target_version]]'
+
+
+def main(argv):
+    command = argv[0] if argv else 'status'
+    conn = db.connect()
+    try:
+        if command == 'migrate':
+            target = int(argv[1]) if len(argv) > 1 else None
+            applied = migrate(conn, target)
+            print(f'Applied: {applied or "nothing to do"}')
+        elif command == 'status':
+            for m in status(conn):
+                state = m['applied_at'] or 'pending'
+                print(f"{m['version']:>4}  {m['name']:<30} {state}")
+        else:
+            print(USAGE)
+            return 2
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,82 @@
+from backend.migrations import column_exists, ensure_index, index_columns
+
+# Brings databases created before the materialized grocery list, plan
+# nutrition rollups, daily summary upserts and keyset pagination up to
+# 00_schema.sql.
+
+
+def upgrade(cursor):
+    # Materialized grocery list per plan
+    if not column_exists(cursor, 'grocery_list', 'plan_id'):
+        cursor.execute('''
+            ALTER TABLE grocery_list
+                ADD COLUMN plan_id BIGINT NULL UNIQUE AFTER user_id,
+                ADD FOREIGN KEY (plan_id) REFERENCES meal_plans(plan_id) ON DELETE CASCADE
+        ''')
+
+    if 'unit' not in index_columns(cursor, 'grocery_list_ingredients')['PRIMARY']['columns']:
+        cursor.execute("UPDATE grocery_list_ingredients SET unit = '' WHERE unit IS NULL")
+        cursor.execute('''
+            ALTER TABLE grocery_list_ingredients
+                MODIFY unit VARCHAR(50) NOT NULL,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (gl_id, ingredient_id, unit)
+        ''')
+
+    # Per-day plan nutrition rollups
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS plan_nutrition_summary (
+           plan_id BIGINT NOT NULL,
+           day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun') NOT NULL,
+           meal_count INT NOT NULL DEFAULT 0,
+           calories INT NOT NULL DEFAULT 0,
+           protein_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+           carbs_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+           fat_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+           PRIMARY KEY (plan_id, day_of_week),
+           FOREIGN KEY (plan_id) REFERENCES meal_plans(plan_id) ON DELETE CASCADE
+        )
+    ''')
+
+    # One daily summary row per user and date. Existing duplicates are
+    # merged into the oldest row (summed nutrients) before the unique key
+    # is added.
+    if not any(index['unique'] and index['columns'] == ['user_id', 'summary_date']
+               for index in index_columns(cursor, 'daily_nutrition_summary').values()):
+        cursor.execute('''
+            CREATE TEMPORARY TABLE daily_nutrition_keep AS
+            SELECT user_id, summary_date, MIN(summary_id) AS keep_id,
+                   SUM(calories) AS calories, SUM(protein_g) AS protein_g,
+                   SUM(carbs_g) AS carbs_g, SUM(fat_g) AS fat_g,
+                   SUM(sodium_mg) AS sodium_mg
+            FROM daily_nutrition_summary
+            GROUP BY user_id, summary_date
+            HAVING COUNT(*) > 1
+        ''')
+        cursor.execute('''
+            UPDATE daily_nutrition_summary s
+            JOIN daily_nutrition_keep k ON s.summary_id = k.keep_id
+            SET s.calories = k.calories, s.protein_g = k.protein_g,
+                s.carbs_g = k.carbs_g, s.fat_g = k.fat_g, s.sodium_mg = k.sodium_mg
+        ''')
+        cursor.execute('''
+            DELETE s FROM daily_nutrition_summary s
+            JOIN daily_nutrition_keep k
+              ON k.user_id = s.user_id AND k.summary_date = s.summary_date
+            WHERE s.summary_id <> k.keep_id
+        ''')
+        cursor.execute('DROP TEMPORARY TABLE daily_nutrition_keep')
+    ensure_index(cursor, 'daily_nutrition_summary', 'uq_daily_nutrition_user_date',
+                 ['user_id', 'summary_date'], unique=True)
+
+    # Keyset pagination orderings
+    ensure_index(cursor, 'meals', 'idx_meals_name', ['meal_name'])
+    ensure_index(cursor, 'ingredients', 'idx_ingredients_category_name',
+                 ['category', 'ingredient_name'])
+    ensure_index(cursor, 'meal_plans', 'idx_meal_plans_status_created',
+                 ['status', 'created_at'])
+    ensure_index(cursor, 'inventory', 'idx_inventory_user_expiration',
+                 ['user_id', 'expiration_date'])
+    ensure_index(cursor, 'error_logs', 'idx_error_logs_timestamp', ['timestamp'])
+    ensure_index(cursor, 'error_logs', 'idx_error_logs_resolved_timestamp',
+                 ['is_resolved', 'timestamp'])
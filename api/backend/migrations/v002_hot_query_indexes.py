@@ -0,0 +1,18 @@
+from backend.migrations import ensure_index
+
+# Covering indexes for the hottest filters in the blueprints
+
+
+def upgrade(cursor):
+    ensure_index(cursor, 'planned_meals', 'idx_planned_meals_plan_slot',
+                 ['plan_id', 'day_of_week', 'meal_type'])
+    ensure_index(cursor, 'inventory', 'idx_inventory_user_ingredient',
+                 ['user_id', 'ingredient_id'])
+    ensure_index(cursor, 'daily_nutrition_summary', 'idx_daily_nutrition_user_date',
+                 ['user_id', 'summary_date'])
+    ensure_index(cursor, 'meal_cost_history', 'idx_meal_cost_meal_date',
+                 ['meal_id', 'calculation_date'])
+    ensure_index(cursor, 'error_logs', 'idx_error_logs_status',
+                 ['is_resolved', 'severity', 'timestamp'])
+    ensure_index(cursor, 'api_logs', 'idx_api_logs_time_service',
+                 ['request_time', 'api_service'])
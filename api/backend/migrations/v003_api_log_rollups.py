@@ -0,0 +1,61 @@
+import math
+
+# Hourly api_logs rollups with latency sketches, backfilled from api_logs.
+# The backfill is frozen here rather than calling log_rollup, so later
+# changes to the application code do not change what this migration does.
+
+# Sketch bucketing as of this migration: 2% relative accuracy
+LOG_GAMMA = math.log(1.02 / 0.98)
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_log_hourly (
+           hour_start DATETIME NOT NULL,
+           api_service VARCHAR(100) NOT NULL,
+           endpoint VARCHAR(255) NOT NULL,
+           request_count INT NOT NULL DEFAULT 0,
+           error_count INT NOT NULL DEFAULT 0,
+           total_ms BIGINT NOT NULL DEFAULT 0,
+           min_ms INT,
+           max_ms INT,
+           PRIMARY KEY (hour_start, api_service, endpoint)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS api_log_hourly_sketch (
+           hour_start DATETIME NOT NULL,
+           api_service VARCHAR(100) NOT NULL,
+           endpoint VARCHAR(255) NOT NULL,
+           bucket SMALLINT NOT NULL,
+           bucket_count INT NOT NULL DEFAULT 0,
+           PRIMARY KEY (hour_start, api_service, endpoint, bucket)
+        )
+    ''')
+    cursor.execute('DELETE FROM api_log_hourly')
+    cursor.execute('DELETE FROM api_log_hourly_sketch')
+    cursor.execute('''
+        INSERT INTO api_log_hourly
+            (hour_start, api_service, endpoint, request_count, error_count,
+             total_ms, min_ms, max_ms)
+        SELECT DATE_FORMAT(request_time, '%Y-%m-%d %H:00:00') AS hour_start,
+               COALESCE(api_service, ''), COALESCE(endpoint, ''),
+               COUNT(*),
+               SUM(CASE WHEN status_code >= 400 THEN 1 ELSE 0 END),
+               SUM(response_time_ms), MIN(response_time_ms), MAX(response_time_ms)
+        FROM api_logs
+        WHERE request_time IS NOT NULL AND response_time_ms IS NOT NULL
+        GROUP BY 1, 2, 3
+    ''')
+    cursor.execute('''
+        INSERT INTO api_log_hourly_sketch
+            (hour_start, api_service, endpoint, bucket, bucket_count)
+        SELECT DATE_FORMAT(request_time, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+               COALESCE(api_service, ''), COALESCE(endpoint, ''),
+               CASE WHEN response_time_ms <= 1 THEN 0
+                    ELSE CEIL(LN(response_time_ms) / %s) END AS bucket,
+               COUNT(*)
+        FROM api_logs
+        WHERE request_time IS NOT NULL AND response_time_ms IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+    ''', (LOG_GAMMA,))
@@ -0,0 +1,10 @@
+# Version counters behind ETags on conditional GETs
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS resource_versions (
+           scope VARCHAR(100) PRIMARY KEY,
+           version BIGINT NOT NULL DEFAULT 0
+        )
+    ''')
@@ -0,0 +1,7 @@
+from backend.migrations import ensure_index
+
+# Week navigation looks plans up by user and week_start
+
+
+def upgrade(cursor):
+    ensure_index(cursor, 'meal_plans', 'idx_meal_plans_user_week', ['user_id', 'week_start'])
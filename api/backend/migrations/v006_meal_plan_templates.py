@@ -0,0 +1,27 @@
+# Named week templates saved from a plan and reapplied to new weeks
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meal_plan_templates (
+           template_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+           user_id BIGINT NOT NULL,
+           name VARCHAR(100) NOT NULL,
+           created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+           updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+           UNIQUE KEY uq_meal_plan_templates_user_name (user_id, name),
+           FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS meal_plan_template_meals (
+           template_meal_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+           template_id BIGINT NOT NULL,
+           meal_id BIGINT NOT NULL,
+           day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun'),
+           meal_type ENUM('breakfast','lunch','dinner','snack'),
+           INDEX idx_template_meals_template (template_id),
+           FOREIGN KEY (template_id) REFERENCES meal_plan_templates(template_id) ON DELETE CASCADE,
+           FOREIGN KEY (meal_id) REFERENCES meals(meal_id) ON DELETE CASCADE
+        )
+    ''')
@@ -0,0 +1,45 @@
+from backend.migrations import ensure_index, index_columns
+
+# One inventory row per user and ingredient. Existing duplicates are
+# merged into the oldest row (summed quantity, earliest expiration) and
+# their events moved onto it before the unique key is added.
+
+
+def upgrade(cursor):
+    indexes = index_columns(cursor, 'inventory')
+    if any(index['unique'] and index['columns'] == ['user_id', 'ingredient_id']
+           for index in indexes.values()):
+        return
+
+    cursor.execute('''
+        CREATE TEMPORARY TABLE inventory_keep AS
+        SELECT user_id, ingredient_id, MIN(inventory_id) AS keep_id,
+               SUM(quantity) AS quantity, MIN(expiration_date) AS expiration_date
+        FROM inventory
+        GROUP BY user_id, ingredient_id
+        HAVING COUNT(*) > 1
+    ''')
+    cursor.execute('''
+        UPDATE inventory_event_log e
+        JOIN inventory inv ON e.inventory_id = inv.inventory_id
+        JOIN inventory_keep k
+          ON k.user_id = inv.user_id AND k.ingredient_id = inv.ingredient_id
+        SET e.inventory_id = k.keep_id
+    ''')
+    cursor.execute('''
+        UPDATE inventory inv
+        JOIN inventory_keep k ON inv.inventory_id = k.keep_id
+        SET inv.quantity = k.quantity, inv.expiration_date = k.expiration_date
+    ''')
+    cursor.execute('''
+        DELETE inv FROM inventory inv
+        JOIN inventory_keep k
+          ON k.user_id = inv.user_id AND k.ingredient_id = inv.ingredient_id
+        WHERE inv.inventory_id <> k.keep_id
+    ''')
+    cursor.execute('DROP TEMPORARY TABLE inventory_keep')
+
+    ensure_index(cursor, 'inventory', 'uq_inventory_user_ingredient',
+                 ['user_id', 'ingredient_id'], unique=True)
+    if 'idx_inventory_user_ingredient' in indexes:
+        cursor.execute('ALTER TABLE inventory DROP INDEX idx_inventory_user_ingredient')
@@ -0,0 +1,41 @@
+from backend.migrations import column_exists
+
+# Unit conversion tables and a unit for inventory quantities (NULL on
+# rows written before units were tracked)
+
+UNITS = (
+    ('g', 'mass', 1),
+    ('kg', 'mass', 1000),
+    ('oz', 'mass', 28.349523),
+    ('lb', 'mass', 453.59237),
+    ('ml', 'volume', 1),
+    ('l', 'volume', 1000),
+    ('tsp', 'volume', 4.928922),
+    ('tbsp', 'volume', 14.786765),
+    ('cup', 'volume', 236.588237),
+    ('pinch', 'volume', 0.308058),
+    ('piece', 'count', 1),
+)
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS units (
+           unit VARCHAR(50) PRIMARY KEY,
+           dimension ENUM('mass','volume','count') NOT NULL,
+           to_base DECIMAL(16,6) NOT NULL
+        )
+    ''')
+    cursor.executemany(
+        'INSERT IGNORE INTO units (unit, dimension, to_base) VALUES (%s, %s, %s)', UNITS
+    )
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS ingredient_unit_conversions (
+           ingredient_id BIGINT PRIMARY KEY,
+           density_g_per_ml DECIMAL(10,4),
+           grams_per_piece DECIMAL(10,2),
+           FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
+        )
+    ''')
+    if not column_exists(cursor, 'inventory', 'unit'):
+        cursor.execute('ALTER TABLE inventory ADD COLUMN unit VARCHAR(50) NULL AFTER quantity')
@@ -0,0 +1,31 @@
+# Keep inventory_event_log rows when their inventory item is deleted. The
+# removal itself is logged first; the delete then sets inventory_id to
+# NULL instead of cascading the item's history away.
+
+FK_NAME = 'fk_inventory_event_log_inventory'
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        SELECT rc.constraint_name AS name, rc.delete_rule AS delete_rule
+        FROM information_schema.referential_constraints rc
+        JOIN information_schema.key_column_usage k
+          ON k.constraint_schema = rc.constraint_schema
+         AND k.constraint_name = rc.constraint_name
+        WHERE rc.constraint_schema = DATABASE()
+          AND rc.table_name = 'inventory_event_log'
+          AND rc.referenced_table_name = 'inventory'
+          AND k.column_name = 'inventory_id'
+    ''')
+    foreign_keys = cursor.fetchall()
+    if any(fk['delete_rule'] == 'SET NULL' for fk in foreign_keys):
+        return
+
+    for fk in foreign_keys:
+        cursor.execute(f"ALTER TABLE inventory_event_log DROP FOREIGN KEY `{fk['name']}`")
+    cursor.execute('ALTER TABLE inventory_event_log MODIFY inventory_id BIGINT NULL')
+    cursor.execute(f'''
+        ALTER TABLE inventory_event_log
+        ADD CONSTRAINT {FK_NAME} FOREIGN KEY (inventory_id)
+            REFERENCES inventory(inventory_id) ON DELETE SET NULL
+    ''')
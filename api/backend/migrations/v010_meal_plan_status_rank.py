@@ -0,0 +1,26 @@
+from backend.migrations import column_exists, index_columns
+
+# Admin plan list order (problematic statuses first, newest first) as a
+# stored column plus a matching index, so keyset pages are range scans.
+# created_at becomes NOT NULL so the keyset needs no IS NULL branches;
+# rows without one take their week_start.
+
+
+def upgrade(cursor):
+    if not column_exists(cursor, 'meal_plans', 'status_rank'):
+        cursor.execute('''
+            UPDATE meal_plans SET created_at = week_start WHERE created_at IS NULL
+        ''')
+        cursor.execute('''
+            ALTER TABLE meal_plans
+            MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            ADD COLUMN status_rank TINYINT
+                AS (FIELD(status, 'failed', 'corrupted', 'draft', 'complete')) STORED NOT NULL
+                AFTER created_at
+        ''')
+    if 'idx_meal_plans_status_rank' not in index_columns(cursor, 'meal_plans'):
+        # ensure_index cannot declare descending parts
+        cursor.execute('''
+            CREATE INDEX idx_meal_plans_status_rank
+            ON meal_plans (status_rank, created_at DESC, plan_id DESC)
+        ''')
@@ -0,0 +1,25 @@
+# Planned meals without a day_of_week get their own 'Unscheduled' row in
+# plan_nutrition_summary so weekly totals include them. Plans already
+# materialized get the row filled from planned_meals.
+
+
+def upgrade(cursor):
+    cursor.execute('''
+        ALTER TABLE plan_nutrition_summary
+        MODIFY day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun','Unscheduled') NOT NULL
+    ''')
+    cursor.execute('''
+        INSERT IGNORE INTO plan_nutrition_summary
+            (plan_id, day_of_week, meal_count, calories, protein_g, carbs_g, fat_g)
+        SELECT p.plan_id, 'Unscheduled',
+               COUNT(pm.planned_meal_id),
+               COALESCE(SUM(m.calories), 0),
+               COALESCE(SUM(m.protein_g), 0),
+               COALESCE(SUM(m.carbs_g), 0),
+               COALESCE(SUM(m.fat_g), 0)
+        FROM (SELECT DISTINCT plan_id FROM plan_nutrition_summary) p
+        LEFT JOIN planned_meals pm
+               ON pm.plan_id = p.plan_id AND pm.day_of_week IS NULL
+        LEFT JOIN meals m ON pm.meal_id = m.meal_id
+        GROUP BY p.plan_id
+    ''')
@@ -0,0 +1,194 @@
+from datetime import date
+from decimal import Decimal
+import numpy as np
+
+# Per-plan nutrition rollups.
+#
+# plan_nutrition_summary keeps one row per plan and day with the summed
+# calories and macros of that day's planned meals. All seven rows are
+# created the first time a plan's nutrition is read; afterwards the
+# planned_meals routes adjust only the affected day by +1 / -1 of the
+# meal's values in the same transaction. Meals without a day_of_week are
+# kept in an extra 'Unscheduled' row so the week's totals still include
+# them. Callers commit.
+
+DAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+UNSCHEDULED = 'Unscheduled'
+
+
+def get_plan_nutrition(cursor, plan_id):
+    """Get a plan's per-day rollup rows, empty if not materialized yet"""
+    cursor.execute('''
+        SELECT day_of_week, meal_count, calories, protein_g, carbs_g, fat_g
+        FROM plan_nutrition_summary
+        WHERE plan_id = %s
+        ORDER BY FIELD(day_of_week,'Mon','Tue','Wed','Thu','Fri','Sat','Sun','Unscheduled')
+    ''', (plan_id,))
+    return cursor.fetchall()
+
+
+def build_plan_nutrition(cursor, plan_id, rebuild=False):
+    """Materialize a plan's per-day rollups from planned_meals"""
+    if rebuild:
+        cursor.execute('DELETE FROM plan_nutrition_summary WHERE plan_id = %s', (plan_id,))
+
+    days = ' UNION ALL '.join(f"SELECT '{day}' AS day_of_week" for day in DAYS + (UNSCHEDULED,))
+    cursor.execute(f'''
+        INSERT IGNORE INTO plan_nutrition_summary
+            (plan_id, day_of_week, meal_count, calories, protein_g, carbs_g, fat_g)
+        SELECT mp.plan_id, d.day_of_week,
+               COUNT(pm.planned_meal_id),
+               COALESCE(SUM(m.calories), 0),
+               COALESCE(SUM(m.protein_g), 0),
+               COALESCE(SUM(m.carbs_g), 0),
+               COALESCE(SUM(m.fat_g), 0)
+        FROM meal_plans mp
+        CROSS JOIN ({days}) d
+        LEFT JOIN planned_meals pm
+               ON pm.plan_id = mp.plan_id
+              AND pm.day_of_week <=> NULLIF(d.day_of_week, %s)
+        LEFT JOIN meals m ON pm.meal_id = m.meal_id
+        WHERE mp.plan_id = %s
+        GROUP BY mp.plan_id, d.day_of_week
+    ''', (UNSCHEDULED, plan_id))
+
+
+def apply_nutrition_delta(cursor, plan_id, day_of_week, meal_id, sign):
+    """Add (sign=1) or remove (sign=-1) a meal from one day's rollup
+
+    Plans that are not materialized have no rows, so nothing is updated.
+    """
+    if day_of_week is None:
+        day_of_week = UNSCHEDULED
+    cursor.execute('''
+        UPDATE plan_nutrition_summary s
+        JOIN meals m ON m.meal_id = %s
+        SET s.meal_count = s.meal_count + %s,
+            s.calories = s.calories + %s * COALESCE(m.calories, 0),
+            s.protein_g = s.protein_g + %s * COALESCE(m.protein_g, 0),
+            s.carbs_g = s.carbs_g + %s * COALESCE(m.carbs_g, 0),
+            s.fat_g = s.fat_g + %s * COALESCE(m.fat_g, 0)
+        WHERE s.plan_id = %s AND s.day_of_week = %s
+    ''', (meal_id, sign, sign, sign, sign, sign, plan_id, day_of_week))
+
+
+# Daily nutrition from consumed meals.
+#
+# daily_nutrition_summary holds one row per user and date (unique key).
+# Each consumed meal is folded in as its nutrients times
+# serving_multiplier, rounded per meal to the column's precision (whole
+# calories, hundredths for the rest) half away from zero, as MySQL rounds
+# exact values. The batch backfill rounds each meal the same way before
+# summing, so both paths agree, recomputes every (user, date) from
+# consumed_meals in one vectorized pass and drops dates that no longer
+# have any consumed meals.
+
+NUTRIENTS = ('calories', 'protein_g', 'carbs_g', 'fat_g', 'sodium_mg')
+
+
+def apply_consumed_meal(cursor, user_id, meal_id, date_consumed, serving_multiplier, sign):
+    """Add (sign=1) or remove (sign=-1) a consumed meal from its day's summary"""
+    factor = sign * Decimal(str(serving_multiplier))
+    cursor.execute('''
+        INSERT INTO daily_nutrition_summary
+            (user_id, summary_date, calories, protein_g, carbs_g, fat_g, sodium_mg)
+        SELECT %s, %s,
+               ROUND(COALESCE(calories, 0) * %s),
+               COALESCE(protein_g, 0) * %s,
+               COALESCE(carbs_g, 0) * %s,
+               COALESCE(fat_g, 0) * %s,
+               COALESCE(sodium_mg, 0) * %s
+        FROM meals
+        WHERE meal_id = %s
+        ON DUPLICATE KEY UPDATE
+            calories = COALESCE(daily_nutrition_summary.calories, 0) + VALUES(calories),
+            protein_g = COALESCE(daily_nutrition_summary.protein_g, 0) + VALUES(protein_g),
+            carbs_g = COALESCE(daily_nutrition_summary.carbs_g, 0) + VALUES(carbs_g),
+            fat_g = COALESCE(daily_nutrition_summary.fat_g, 0) + VALUES(fat_g),
+            sodium_mg = COALESCE(daily_nutrition_summary.sodium_mg, 0) + VALUES(sodium_mg)
+    ''', (user_id, date_consumed, factor, factor, factor, factor, factor, meal_id))
+
+
+def backfill_daily_nutrition(cursor, user_id=None, batch_size=1000):
+    """Recompute daily summaries from consumed_meals in one vectorized pass
+
+    Summary rows of the targeted users with no consumed meals left on
+    their date are deleted first, in the caller's transaction. Returns
+    the number of (user, date) rows written.
+    """
+    query = '''
+        DELETE s FROM daily_nutrition_summary s
+        LEFT JOIN consumed_meals c
+          ON c.user_id = s.user_id AND c.date_consumed = s.summary_date
+        WHERE c.consumed_id IS NULL
+    '''
+    params = ()
+    if user_id is not None:
+        query += ' AND s.user_id = %s'
+        params = (user_id,)
+    cursor.execute(query, params)
+
+    cursor.execute('''
+        SELECT meal_id, calories, protein_g, carbs_g, fat_g, sodium_mg
+        FROM meals
+        ORDER BY meal_id
+    ''')
+    meals = cursor.fetchall()
+    if not meals:
+        return 0
+    meal_ids = np.array([m['meal_id'] for m in meals], dtype=np.int64)
+    # Nutrients and multipliers in hundredths, so the products are exact
+    per_meal = np.array(
+        [[round(float(m[n] or 0) * 100) for n in NUTRIENTS] for m in meals], dtype=np.int64
+    )
+
+    query = '''
+        SELECT user_id, meal_id, date_consumed, serving_multiplier
+        FROM consumed_meals
+    '''
+    params = ()
+    if user_id is not None:
+        query += ' WHERE user_id = %s'
+        params = (user_id,)
+    cursor.execute(query, params)
+    consumed = cursor.fetchall()
+    if not consumed:
+        return 0
+
+    users = np.array([c['user_id'] for c in consumed], dtype=np.int64)
+    days = np.array([c['date_consumed'].toordinal() for c in consumed], dtype=np.int64)
+    multiplier = np.array(
+        [round(float(c['serving_multiplier']) * 100) if c['serving_multiplier'] is not None else 100
+         for c in consumed], dtype=np.int64
+    )
+    rows = np.searchsorted(meal_ids, np.array([c['meal_id'] for c in consumed], dtype=np.int64))
+    values = per_meal[rows] * multiplier[:, None]  # ten-thousandths
+
+    # Round each meal like apply_consumed_meal: calories to whole units,
+    # the rest to hundredths
+    scale = np.array([10000] + [100] * (len(NUTRIENTS) - 1), dtype=np.int64)
+    values = np.sign(values) * ((np.abs(values) + scale // 2) // scale)
+
+    # Group by (user_id, date) and sum each nutrient column
+    keys, group = np.unique(np.stack([users, days], axis=1), axis=0, return_inverse=True)
+    totals = np.zeros((len(keys), len(NUTRIENTS)), dtype=np.int64)
+    np.add.at(totals, group.ravel(), values)
+
+    records = [
+        (int(u), date.fromordinal(int(d)), t[0]) + tuple(Decimal(v).scaleb(-2) for v in t[1:])
+        for (u, d), t in zip(keys.tolist(), totals.tolist())
+    ]
+    query = '''
+        INSERT INTO daily_nutrition_summary
+            (user_id, summary_date, calories, protein_g, carbs_g, fat_g, sodium_mg)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            calories = VALUES(calories),
+            protein_g = VALUES(protein_g),
+            carbs_g = VALUES(carbs_g),
+            fat_g = VALUES(fat_g),
+            sodium_mg = VALUES(sodium_mg)
+    '''
+    for start in range(0, len(records), batch_size):
+        cursor.executemany(query, records[start:start + batch_size])
+    return len(records)
@@ -0,0 +1,131 @@
+import json
+import base64
+from urllib.parse import urlencode
+from flask import request, jsonify, abort, make_response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+def encode_cursor(values, sort=None):
+    """Pack the last row's sort key into an opaque url-safe token"""
+    raw = json.dumps({'k': values, 's': sort}, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort=None):
+    """Unpack a token from encode_cursor, ValueError if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw)
+        values = data['k']
+    except Exception:
+        raise ValueError('Malformed cursor')
+    if data.get('s') != sort or not isinstance(values, list):
+        raise ValueError('Cursor does not match this listing')
+    return values
+
+
+def keyset_clause(order, values, not_null=()):
+    """SQL predicate selecting rows strictly after `values` in `order`
+
+    order is a list of (sql_expression, 'ASC' | 'DESC'). The predicate is
+    the expanded form (a > x) OR (a = x AND b > y) ..., which MySQL can
+    serve with a range scan on an index matching the ORDER BY. NULLs sort
+    first ascending and last descending, as in MySQL; expressions listed
+    in not_null get no IS NULL branch, which would block the range scan.
+    """
+    branches, params = [], []
+    for i, (expr, direction) in enumerate(order):
+        parts, branch_params = [], []
+        for j, (prev_expr, _) in enumerate(order[:i]):
+            prev = values[j]
+            if prev is None:
+                parts.append(f'{prev_expr} IS NULL')
+            else:
+                parts.append(f'{prev_expr} = %s')
+                branch_params.append(prev)
+
+        value = values[i]
+        if direction == 'ASC':
+            if value is None:
+                parts.append(f'{expr} IS NOT NULL')
+            else:
+                parts.append(f'{expr} > %s')
+                branch_params.append(value)
+        else:
+            if value is None:
+                continue  # nothing sorts after NULL descending
+            if expr in not_null:
+                parts.append(f'{expr} < %s')
+            else:
+                parts.append(f'({expr} < %s OR {expr} IS NULL)')
+            branch_params.append(value)
+
+        branches.append('(' + ' AND '.join(parts) + ')')
+        params.extend(branch_params)
+
+    if not branches:
+        return '1=0', []
+    return '(' + ' OR '.join(branches) + ')', params
+
+
+class Page:
+    """Keyset pagination for a list route
+
+    Reads `after` and `limit` from the query string. keys name the row
+    fields holding each ORDER BY expression's value; hidden keys are
+    stripped from the response; not_null names the ORDER BY expressions
+    that cannot be NULL. The body stays a JSON list; the token for the
+    next page is sent in the X-Next-Cursor and Link headers.
+    """
+
+    def __init__(self, order, keys, sort=None, hidden=(), not_null=()):
+        self.order = order
+        self.keys = keys
+        self.not_null = not_null
+        self.sort = sort
+        self.hidden = hidden
+        self.after = request.args.get('after')
+        self.limit = min(max(request.args.get('limit', DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+
+        self.values = None
+        if self.after:
+            try:
+                self.values = decode_cursor(self.after, sort)
+                if len(self.values) != len(order):
+                    raise ValueError('Cursor does not match this listing')
+            except ValueError as e:
+                abort(make_response(jsonify({'error': str(e)}), 400))
+
+    def where(self):
+        """' AND <predicate>' for the page start, '' on the first page"""
+        if self.values is None:
+            return '', []
+        clause, params = keyset_clause(self.order, self.values, self.not_null)
+        return ' AND ' + clause, params
+
+    def order_by(self):
+        """ORDER BY plus LIMIT one past the page to detect a next page"""
+        columns = ', '.join(f'{expr} {direction}' for expr, direction in self.order)
+        return f' ORDER BY {columns} LIMIT {self.limit + 1}'
+
+    def response(self, rows):
+        """Trim the lookahead row and attach next-page headers"""
+        rows = list(rows)
+        next_cursor = None
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            next_cursor = encode_cursor([last[k] for k in self.keys], self.sort)
+
+        if self.hidden:
+            rows = [{k: v for k, v in row.items() if k not in self.hidden} for row in rows]
+
+        response = jsonify(rows)
+        if next_cursor:
+            args = request.args.to_dict()
+            args.update({'after': next_cursor, 'limit': self.limit})
+            response.headers['X-Next-Cursor'] = next_cursor
+            response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+        return response
@@ -1,5 +1,10 @@
 from flask import Blueprint, request, jsonify
 from backend.db_connection import db
+from backend.etag import bump_versions, conditional
+from backend.cache import catalog_cache
+from backend.grocery import apply_meal_delta
+from backend.nutrition import apply_nutrition_delta
+from backend.pagination import Page
 
 planned_meals = Blueprint('planned_meals', __name__)
 
@@ -33,16 +38,34 @@ def update_planned_meal(planned_meal_id):
     data = request.json
     cursor = db.get_db().cursor()
 
+    cursor.execute('''
+        SELECT plan_id, meal_id, day_of_week
+        FROM planned_meals
+        WHERE planned_meal_id = %s
+        FOR UPDATE
+    ''', (planned_meal_id,))
+    current = cursor.fetchone()
+
+    if not current:
+        return jsonify({'error': 'Planned meal not found'}), 404
+
     query = '''
         UPDATE planned_meals
         SET meal_id = %s
         WHERE planned_meal_id = %s
     '''
     cursor.execute(query, (data['meal_id'], planned_meal_id))
-    db.get_db().commit()
 
-    if cursor.rowcount == 0:
-        return jsonify({'error': 'Planned meal not found'}), 404
+    # Swap the old meal's ingredients for the new one's
+    if current['meal_id'] != data['meal_id']:
+        apply_meal_delta(cursor, current['plan_id'], current['meal_id'], -1)
+        apply_meal_delta(cursor, current['plan_id'], data['meal_id'], 1)
+        apply_nutrition_delta(cursor, current['plan_id'], current['day_of_week'],
+                              current['meal_id'], -1)
+        apply_nutrition_delta(cursor, current['plan_id'], current['day_of_week'],
+                              data['meal_id'], 1)
+    bump_versions(cursor, f"meal_plan:{current['plan_id']}")
+    db.get_db().commit()
 
     return jsonify({'message': 'Planned meal updated successfully'}), 200
 
@@ -53,16 +76,28 @@ def delete_planned_meal(planned_meal_id):
     """Remove a meal from the plan"""
     cursor = db.get_db().cursor()
 
+    cursor.execute('''
+        SELECT plan_id, meal_id, day_of_week
+        FROM planned_meals
+        WHERE planned_meal_id = %s
+        FOR UPDATE
+    ''', (planned_meal_id,))
+    current = cursor.fetchone()
+
+    if not current:
+        return jsonify({'error': 'Planned meal not found'}), 404
+
     query = '''
         DELETE FROM planned_meals
         WHERE planned_meal_id = %s
     '''
     cursor.execute(query, (planned_meal_id,))
+    apply_meal_delta(cursor, current['plan_id'], current['meal_id'], -1)
+    apply_nutrition_delta(cursor, current['plan_id'], current['day_of_week'],
+                          current['meal_id'], -1)
+    bump_versions(cursor, f"meal_plan:{current['plan_id']}")
     db.get_db().commit()
 
-    if cursor.rowcount == 0:
-        return jsonify({'error': 'Planned meal not found'}), 404
-
     return jsonify({'message': 'Meal removed from plan'}), 200
 
 
@@ -104,17 +139,31 @@ def get_meal_reports(user_id):
 
 # Route 5: GET /ingredients
 @planned_meals.route('/ingredients', methods=['GET'])
+@conditional(lambda **_: ['catalog'])
 def get_all_ingredients():
     """Get list of all ingredients"""
-    cursor = db.get_db().cursor()
+    page = Page(
+        [('category', 'ASC'), ('ingredient_name', 'ASC'), ('ingredient_id', 'ASC')],
+        ['category', 'ingredient_name', 'ingredient_id']
+    )
 
-    query = '''
-        SELECT ingredient_id, ingredient_name, category, 
-               standardized_name
-        FROM ingredients
-        ORDER BY category, ingredient_name
-    '''
-    cursor.execute(query)
-    results = cursor.fetchall()
+    def load():
+        cursor = db.get_db().cursor()
+
+        query = '''
+            SELECT ingredient_id, ingredient_name, category, 
+                   standardized_name
+            FROM ingredients
+            WHERE 1=1
+        '''
+        where, params = page.where()
+        query += where + page.order_by()
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    catalog_cache.refresh()
+    results = catalog_cache.get_or_load(
+        ('ingredients', page.after, page.limit), load, tags=('ingredients',)
+    )
 
-    return jsonify(results), 200
\ No newline at end of file
+    return page.response(results), 200
\ No newline at end of file
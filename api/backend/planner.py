@@ -0,0 +1,386 @@
+from datetime import timedelta
+from backend.grocery import build_plan_list, get_plan_list_id, rebuild_plan_list
+from backend.nutrition import DAYS, build_plan_nutrition
+
+# Week view of a plan.
+#
+# Everything the weekly planner shows comes from two queries however many
+# meals are planned: the plan with its neighbouring weeks, and the planned
+# meals joined to their meal and latest cost. Per-day macros and the cost
+# estimate are summed from the second query's rows.
+#
+# Bulk week writes apply a whole grid of changes in one transaction: one
+# lookup validates every meal, one DELETE and one multi-row INSERT change
+# planned_meals, and the plan's rollups are recomputed once instead of
+# per meal. Callers commit.
+#
+# Cloning a plan or applying a saved template is a fixed number of
+# statements whatever the plan's size: INSERT ... SELECT for the new
+# meal_plans row and again for its planned meals (days shifted and slots
+# filtered in SQL), then the set-based rollup builds.
+
+MEAL_TYPES = ('breakfast', 'lunch', 'dinner', 'snack')
+MACROS = ('calories', 'protein_g', 'carbs_g', 'fat_g')
+
+
+def get_plan_header(cursor, plan_id):
+    """Get a plan with the previous and next week's plans of the same user"""
+    cursor.execute('''
+        SELECT mp.plan_id, mp.user_id, mp.week_start, mp.week_end, mp.status,
+               prev.plan_id AS prev_plan_id, prev.week_start AS prev_week_start,
+               nxt.plan_id AS next_plan_id, nxt.week_start AS next_week_start
+        FROM meal_plans mp
+        LEFT JOIN meal_plans prev ON prev.plan_id = (
+            SELECT p.plan_id FROM meal_plans p
+            WHERE p.user_id = mp.user_id AND p.week_start < mp.week_start
+            ORDER BY p.week_start DESC, p.plan_id DESC
+            LIMIT 1)
+        LEFT JOIN meal_plans nxt ON nxt.plan_id = (
+            SELECT p.plan_id FROM meal_plans p
+            WHERE p.user_id = mp.user_id AND p.week_start > mp.week_start
+            ORDER BY p.week_start, p.plan_id
+            LIMIT 1)
+        WHERE mp.plan_id = %s
+    ''', (plan_id,))
+    return cursor.fetchone()
+
+
+def find_plan_for_week(cursor, user_id, day):
+    """Get the id of the user's plan whose week contains day, or None"""
+    cursor.execute('''
+        SELECT plan_id
+        FROM meal_plans
+        WHERE user_id = %s
+          AND week_start BETWEEN %s - INTERVAL 6 DAY AND %s
+        ORDER BY week_start DESC, plan_id DESC
+        LIMIT 1
+    ''', (user_id, day, day))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    return row['plan_id']
+
+
+def get_plan_meals(cursor, plan_id):
+    """Get a plan's planned meals with nutrition and latest cost per serving"""
+    cursor.execute('''
+        SELECT pm.planned_meal_id, pm.day_of_week, pm.meal_type,
+               m.meal_id, m.meal_name, m.cooking_time_minutes, m.difficulty,
+               m.calories, m.protein_g, m.carbs_g, m.fat_g,
+               c.cost_per_serving
+        FROM planned_meals pm
+        JOIN meals m ON pm.meal_id = m.meal_id
+        LEFT JOIN (
+            SELECT meal_id, cost_per_serving,
+                   ROW_NUMBER() OVER (PARTITION BY meal_id
+                                      ORDER BY calculation_date DESC, cost_id DESC) AS rn
+            FROM meal_cost_history
+            WHERE meal_id IN (SELECT meal_id FROM planned_meals WHERE plan_id = %s)
+        ) c ON c.meal_id = pm.meal_id AND c.rn = 1
+        WHERE pm.plan_id = %s
+        ORDER BY FIELD(pm.day_of_week,'Mon','Tue','Wed','Thu','Fri','Sat','Sun'),
+                 FIELD(pm.meal_type,'breakfast','lunch','dinner','snack'),
+                 pm.planned_meal_id
+    ''', (plan_id, plan_id))
+    return cursor.fetchall()
+
+
+def _week(plan_id, week_start):
+    if plan_id is None:
+        return None
+    return {'plan_id': plan_id, 'week_start': week_start.isoformat()}
+
+
+def build_grid(header, meals):
+    """Arrange planned meals into days x meal types with per-day totals"""
+    days = []
+    for i, day in enumerate(DAYS):
+        days.append({
+            'day_of_week': day,
+            'date': (header['week_start'] + timedelta(days=i)).isoformat(),
+            'slots': {meal_type: [] for meal_type in MEAL_TYPES},
+            'meal_count': 0,
+            'cost': 0.0,
+            **{macro: 0.0 for macro in MACROS},
+        })
+    by_day = {d['day_of_week']: d for d in days}
+    unscheduled = []
+    priced = unpriced = 0
+    total_cost = 0.0
+
+    for meal in meals:
+        cost = meal['cost_per_serving']
+        if cost is None:
+            unpriced += 1
+        else:
+            priced += 1
+            total_cost += float(cost)
+
+        day = by_day.get(meal['day_of_week'])
+        if day is None or meal['meal_type'] is None:
+            unscheduled.append(meal)
+            continue
+        day['slots'][meal['meal_type']].append(meal)
+        day['meal_count'] += 1
+        day['cost'] += float(cost or 0)
+        for macro in MACROS:
+            day[macro] += float(meal[macro] or 0)
+
+    for day in days:
+        day['cost'] = round(day['cost'], 2)
+        for macro in MACROS:
+            day[macro] = round(day[macro], 2)
+
+    totals = {macro: round(sum(d[macro] for d in days), 2) for macro in MACROS}
+    totals['meal_count'] = sum(d['meal_count'] for d in days)
+    totals['days_planned'] = sum(1 for d in days if d['meal_count'])
+
+    return {
+        'plan': {
+            'plan_id': header['plan_id'],
+            'user_id': header['user_id'],
+            'week_start': header['week_start'].isoformat(),
+            'week_end': header['week_end'].isoformat(),
+            'status': header['status'],
+        },
+        'previous_week': _week(header['prev_plan_id'], header['prev_week_start']),
+        'next_week': _week(header['next_plan_id'], header['next_week_start']),
+        'days': days,
+        'unscheduled': unscheduled,
+        'totals': totals,
+        'cost': {
+            'estimated_total': round(total_cost, 2),
+            'meals_priced': priced,
+            'meals_unpriced': unpriced,
+        },
+    }
+
+
+def get_week_view(cursor, plan_id):
+    """Get the full week view of a plan, None if it does not exist"""
+    header = get_plan_header(cursor, plan_id)
+    if not header:
+        return None
+    return build_grid(header, get_plan_meals(cursor, plan_id))
+
+
+def _slot(item, required):
+    day, meal_type = item.get('day_of_week'), item.get('meal_type')
+    if required and (day is None or meal_type is None):
+        raise ValueError('replace entries need day_of_week and meal_type')
+    if day is not None and day not in DAYS:
+        raise ValueError(f'Unknown day_of_week {day!r}')
+    if meal_type is not None and meal_type not in MEAL_TYPES:
+        raise ValueError(f'Unknown meal_type {meal_type!r}')
+    return day, meal_type
+
+
+def parse_week_changes(data):
+    """Validate a bulk week write body, raises ValueError
+
+    {"clear": bool, "delete": [planned_meal_id, ...],
+     "replace": [{"day_of_week", "meal_type", "meal_id"}, ...],
+     "add": [{"day_of_week", "meal_type", "meal_id"}, ...]}
+
+    clear empties the plan first; a replace leaves its slot holding only
+    meal_id (null empties the slot); add appends to a slot.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Body must be a JSON object')
+    try:
+        delete = {int(i) for i in data.get('delete') or []}
+        replace, add = {}, []
+        for item in data.get('replace') or []:
+            meal_id = item.get('meal_id')
+            replace[_slot(item, True)] = None if meal_id is None else int(meal_id)
+        for item in data.get('add') or []:
+            add.append(_slot(item, False) + (int(item['meal_id']),))
+    except (TypeError, KeyError, AttributeError):
+        raise ValueError('Malformed week changes')
+    return {'clear': bool(data.get('clear')), 'delete': delete, 'replace': replace, 'add': add}
+
+
+def refresh_plan_rollups(cursor, plan_id):
+    """Recompute a plan's grocery list and nutrition rollups where materialized"""
+    if get_plan_list_id(cursor, plan_id) is not None:
+        rebuild_plan_list(cursor, plan_id)
+    cursor.execute('DELETE FROM plan_nutrition_summary WHERE plan_id = %s', (plan_id,))
+    if cursor.rowcount:
+        build_plan_nutrition(cursor, plan_id)
+
+
+def apply_week_changes(cursor, plan_id, changes):
+    """Apply parsed week changes to a plan in the current transaction
+
+    Returns {'removed', 'added'} counts, or None if the plan does not
+    exist. Raises ValueError for unknown meals or planned meals.
+    """
+    cursor.execute('SELECT plan_id FROM meal_plans WHERE plan_id = %s FOR UPDATE', (plan_id,))
+    if not cursor.fetchone():
+        return None
+
+    rows = [(day, meal_type, meal_id) for (day, meal_type), meal_id
+            in changes['replace'].items() if meal_id is not None]
+    rows += changes['add']
+
+    meal_ids = {row[2] for row in rows}
+    if meal_ids:
+        placeholders = ', '.join(['%s'] * len(meal_ids))
+        cursor.execute(f'SELECT meal_id FROM meals WHERE meal_id IN ({placeholders})',
+                       tuple(meal_ids))
+        unknown = meal_ids - {row['meal_id'] for row in cursor.fetchall()}
+        if unknown:
+            raise ValueError(f'Unknown meal_id(s): {sorted(unknown)}')
+
+    cursor.execute('''
+        SELECT planned_meal_id, day_of_week, meal_type
+        FROM planned_meals
+        WHERE plan_id = %s
+        FOR UPDATE
+    ''', (plan_id,))
+    current = cursor.fetchall()
+
+    unknown = changes['delete'] - {row['planned_meal_id'] for row in current}
+    if unknown:
+        raise ValueError(f'Planned meal(s) not in this plan: {sorted(unknown)}')
+
+    removed = [row['planned_meal_id'] for row in current
+               if changes['clear']
+               or row['planned_meal_id'] in changes['delete']
+               or (row['day_of_week'], row['meal_type']) in changes['replace']]
+    if removed:
+        placeholders = ', '.join(['%s'] * len(removed))
+        cursor.execute(f'DELETE FROM planned_meals WHERE planned_meal_id IN ({placeholders})',
+                       tuple(removed))
+    if rows:
+        # pymysql sends this as a single multi-row INSERT
+        cursor.executemany('''
+            INSERT INTO planned_meals (plan_id, day_of_week, meal_type, meal_id)
+            VALUES (%s, %s, %s, %s)
+        ''', [(plan_id,) + row for row in rows])
+
+    if removed or rows:
+        refresh_plan_rollups(cursor, plan_id)
+    return {'removed': len(removed), 'added': len(rows)}
+
+
+def parse_copy_options(data):
+    """Validate day_shift, days and meal_types of a clone body, raises ValueError"""
+    try:
+        shift = int(data.get('day_shift', 0))
+    except (TypeError, ValueError):
+        raise ValueError('day_shift must be an integer')
+    days = data.get('days') or None
+    meal_types = data.get('meal_types') or None
+    if days is not None and not set(days) <= set(DAYS):
+        raise ValueError(f'days must be drawn from {list(DAYS)}')
+    if meal_types is not None and not set(meal_types) <= set(MEAL_TYPES):
+        raise ValueError(f'meal_types must be drawn from {list(MEAL_TYPES)}')
+    return {'shift': shift % 7, 'days': days, 'meal_types': meal_types}
+
+
+SLOT_TABLES = {
+    'plan': ('planned_meals', 'plan_id'),
+    'template': ('meal_plan_template_meals', 'template_id'),
+}
+
+
+def _copy_slots(cursor, target, target_id, source, source_id, options):
+    """INSERT ... SELECT the meals of a plan or template into another
+
+    Days are moved forward by options['shift'], wrapping Sun into Mon;
+    the days and meal_types filters apply to the source slots.
+    """
+    target_table, target_key = SLOT_TABLES[target]
+    source_table, source_key = SLOT_TABLES[source]
+    day_list = ', '.join(f"'{day}'" for day in DAYS)
+
+    params = [target_id, options['shift'], source_id]
+    where = ''
+    for column, values in (('day_of_week', options['days']), ('meal_type', options['meal_types'])):
+        if values:
+            where += f" AND {column} IN ({', '.join(['%s'] * len(values))})"
+            params += values
+
+    cursor.execute(f'''
+        INSERT INTO {target_table} ({target_key}, day_of_week, meal_type, meal_id)
+        SELECT %s,
+               IF(day_of_week IS NULL, NULL,
+                  ELT(MOD(FIELD(day_of_week, {day_list}) - 1 + %s, 7) + 1, {day_list})),
+               meal_type, meal_id
+        FROM {source_table}
+        WHERE {source_key} = %s{where}
+    ''', tuple(params))
+    return cursor.rowcount
+
+
+def _new_plan(cursor, week_start, source_sql, params):
+    cursor.execute(f'''
+        INSERT INTO meal_plans (user_id, week_start, week_end, status)
+        SELECT user_id, %s, %s, 'draft'
+        {source_sql}
+    ''', (week_start, week_start + timedelta(days=6)) + params)
+    return cursor.lastrowid if cursor.rowcount else None
+
+
+def _build_rollups(cursor, plan_id):
+    build_plan_list(cursor, plan_id)
+    build_plan_nutrition(cursor, plan_id)
+
+
+def clone_plan(cursor, plan_id, week_start, options):
+    """Copy a plan into a new draft plan for week_start
+
+    Returns the new plan id, or None if the source plan does not exist.
+    """
+    new_id = _new_plan(cursor, week_start, 'FROM meal_plans WHERE plan_id = %s', (plan_id,))
+    if new_id is None:
+        return None
+    _copy_slots(cursor, 'plan', new_id, 'plan', plan_id, options)
+    _build_rollups(cursor, new_id)
+    return new_id
+
+
+def save_template(cursor, plan_id, name, options):
+    """Save a plan's slots as the named template of its user, replacing any
+
+    Returns the template id, or None if the plan does not exist. The
+    shift and filters are applied when saving.
+    """
+    cursor.execute('''
+        INSERT INTO meal_plan_templates (user_id, name)
+        SELECT user_id, %s FROM meal_plans WHERE plan_id = %s
+        ON DUPLICATE KEY UPDATE template_id = LAST_INSERT_ID(template_id),
+                                updated_at = NOW()
+    ''', (name, plan_id))
+    # LAST_INSERT_ID(template_id) reports the id of an existing template too
+    template_id = cursor.lastrowid
+    if not template_id:
+        return None
+
+    cursor.execute('DELETE FROM meal_plan_template_meals WHERE template_id = %s', (template_id,))
+    _copy_slots(cursor, 'template', template_id, 'plan', plan_id, options)
+    return template_id
+
+
+def apply_template(cursor, user_id, template_id, week_start, options):
+    """Create a draft plan for week_start from one of the user's templates
+
+    Returns the new plan id, or None if the user has no such template.
+    """
+    new_id = _new_plan(cursor, week_start, '''
+        FROM meal_plan_templates WHERE template_id = %s AND user_id = %s
+    ''', (template_id, user_id))
+    if new_id is None:
+        return None
+    _copy_slots(cursor, 'plan', new_id, 'template', template_id, options)
+    _build_rollups(cursor, new_id)
+    return new_id
+
+
+def create_plan(cursor, user_id, week_start):
+    """Create an empty draft plan, None if the user does not exist"""
+    new_id = _new_plan(cursor, week_start, 'FROM users WHERE user_id = %s', (user_id,))
+    if new_id is not None:
+        _build_rollups(cursor, new_id)
+    return new_id
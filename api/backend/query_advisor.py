@@ -0,0 +1,183 @@
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from flask import url_for
+import pymysql
+
+# Query strings for routes that need more than their URL arguments
+SAMPLE_ARGS = {
+    'meals.get_meal_suggestions': {'user_id': 1},
+}
+
+# JSON bodies for write routes; every id in the URL is 1
+SAMPLE_BODIES = {
+    'meal_plans.add_planned_meal': {'meal_id': 1, 'day_of_week': 'Mon', 'meal_type': 'dinner'},
+    'meal_plans.bulk_update_planned_meals': {
+        'delete': [1],
+        'replace': [{'day_of_week': 'Tue', 'meal_type': 'lunch', 'meal_id': 2}],
+        'add': [{'day_of_week': 'Wed', 'meal_type': 'dinner', 'meal_id': 1}],
+    },
+    'meal_plans.clone_meal_plan': {'week_start': '2099-01-05'},
+    'meal_plans.save_meal_plan_template': {'name': 'query advisor'},
+    'planned_meals.update_planned_meal': {'meal_id': 2},
+    'users.add_to_inventory': {'ingredient_id': 1, 'quantity': 1, 'unit': 'g'},
+    'users.update_inventory': {'quantity': 2},
+    'users.log_consumed_meal': {'meal_id': 1, 'date_consumed': '2099-01-05'},
+    'users.create_meal_plan': {'week_start': '2099-01-12'},
+    'users.sync_user_inventory': {
+        'mode': 'delta', 'items': [{'ingredient_id': 1, 'quantity': 1}, {'ingredient_id': 2, 'quantity': -1}],
+    },
+    'admin.update_error_log': {'is_resolved': True},
+    'admin.set_ingredient_conversions': {'density_g_per_ml': 1.0, 'grams_per_piece': 50},
+}
+
+# Streaming or side-channel routes the advisor should not call
+SKIP_ENDPOINTS = {'admin.stream_admin_events'}
+
+# Statements worth an EXPLAIN: reads and writes that locate rows
+EXPLAINABLE = re.compile(r'(?i)^(SELECT\b.*\bFROM\b|UPDATE\b|DELETE\b|INSERT\b.*\bSELECT\b.*\bFROM\b)')
+
+# A full table scan is reported once the plan expects more rows than this
+FULL_SCAN_ROWS = int(os.getenv('ADVISOR_FULL_SCAN_ROWS', 1000))
+
+
+@contextmanager
+def capture_queries():
+    """Record the final SQL of every statement executed inside the block"""
+    captured = []
+    original = pymysql.cursors.Cursor.execute
+
+    def execute(self, query, args=None):
+        captured.append(self.mogrify(query, args))
+        return original(self, query, args)
+
+    pymysql.cursors.Cursor.execute = execute
+    try:
+        yield captured
+    finally:
+        pymysql.cursors.Cursor.execute = original
+
+
+@contextmanager
+def rolled_back():
+    """Make commit() a no-op for this thread inside the block
+
+    Every request's connection goes back to the pool at teardown, which
+    rolls back its open transaction, so the routes called here (writes
+    and GETs that build rollups on first read) leave the database as it
+    was. Other threads, such as the log writer, commit as usual.
+    """
+    thread = threading.get_ident()
+    original = pymysql.connections.Connection.commit
+
+    def commit(self):
+        if threading.get_ident() != thread:
+            return original(self)
+
+    pymysql.connections.Connection.commit = commit
+    try:
+        yield
+    finally:
+        pymysql.connections.Connection.commit = original
+
+
+def collect_queries(app):
+    """Call every route once and return [(endpoint, sql)] for its queries
+
+    GETs are called with their sample arguments and writes with their
+    sample bodies; nothing they change is committed (see rolled_back).
+    """
+    client = app.test_client()
+    seen, queries = set(), []
+
+    for rule in app.url_map.iter_rules():
+        if not rule.rule.startswith('/api') or rule.endpoint in SKIP_ENDPOINTS:
+            continue
+
+        with app.test_request_context():
+            url = url_for(rule.endpoint, **{arg: 1 for arg in rule.arguments},
+                          **SAMPLE_ARGS.get(rule.endpoint, {}))
+
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            with rolled_back(), capture_queries() as captured:
+                client.open(url, method=method, json=SAMPLE_BODIES.get(rule.endpoint))
+
+            for sql in captured:
+                normalized = ' '.join(sql.split())
+                if not EXPLAINABLE.match(normalized):
+                    continue
+                if 'information_schema' in normalized or normalized in seen:
+                    continue
+                seen.add(normalized)
+                queries.append((f'{method} {rule.endpoint}', normalized))
+    return queries
+
+
+def explain(conn, sql):
+    """Run EXPLAIN and describe large full scans, filesorts and temp tables
+
+    A full scan is reported when it reads more than FULL_SCAN_ROWS rows,
+    including when an index exists but the optimizer does not use it.
+    """
+    cursor = conn.cursor()
+    cursor.execute('EXPLAIN ' + sql)
+    issues = []
+    for row in cursor.fetchall():
+        table = row.get('table') or ''
+        extra = row.get('Extra') or ''
+        if table.startswith('<'):
+            continue  # derived / union results
+        if row.get('type') == 'ALL' and (row.get('rows') or 0) > FULL_SCAN_ROWS:
+            unused = row.get('possible_keys')
+            issues.append(f'full scan of {table} (~{row.get("rows")} rows'
+                          + (f', {unused} unused)' if unused else ')'))
+        if 'Using filesort' in extra:
+            issues.append(f'filesort on {table}')
+        if 'Using temporary' in extra:
+            issues.append(f'temporary table for {table}')
+    return issues
+
+
+def advise(app, conn):
+    """Check every route's queries, returns a list of findings
+
+    Queries without a WHERE clause read the whole table on purpose (catalog
+    loads), so their findings are reported as expected.
+    """
+    findings = []
+    for endpoint, sql in collect_queries(app):
+        issues = explain(conn, sql)
+        if issues:
+            findings.append({
+                'endpoint': endpoint,
+                'sql': sql,
+                'issues': issues,
+                'expected': ' WHERE ' not in sql.upper()
+            })
+    return findings
+
+
+def main():
+    from backend import create_app
+    from backend.db_connection import db
+
+    app = create_app()
+    conn = db.connect()
+    try:
+        findings = advise(app, conn)
+    finally:
+        conn.close()
+
+    unexpected = [f for f in findings if not f['expected']]
+    for f in findings:
+        label = 'expected' if f['expected'] else 'FIX'
+        print(f"[{label}] {f['endpoint']}: {'; '.join(f['issues'])}")
+        print(f"    {f['sql'][:200]}")
+    print(f'{len(unexpected)} query plan(s) need an index')
+    return 1 if unexpected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
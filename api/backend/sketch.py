@@ -0,0 +1,67 @@
+import math
+
+# DDSketch-style latency sketch.
+#
+# A value v > 0 is counted in bucket ceil(log_gamma(v)), so every value in
+# a bucket is within RELATIVE_ACCURACY of the bucket's representative
+# value. Two sketches merge by adding counts per bucket, which lets hourly
+# sketches be stored as (bucket, count) rows and merged with SUM ... GROUP
+# BY bucket. Values below 1 ms share bucket 0.
+
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+
+def bucket_index(value):
+    """Bucket holding value (ms)"""
+    if value <= 1:
+        return 0
+    return math.ceil(math.log(value) / LOG_GAMMA)
+
+
+def bucket_value(index):
+    """Representative value of a bucket, within RELATIVE_ACCURACY of its members"""
+    if index <= 0:
+        return 1.0
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class LatencySketch:
+    """Mergeable quantile sketch over millisecond latencies"""
+
+    def __init__(self, buckets=None):
+        self.buckets = dict(buckets or {})
+
+    @property
+    def count(self):
+        return sum(self.buckets.values())
+
+    def add(self, value, count=1):
+        index = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other):
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        return self
+
+    def quantile(self, q):
+        """Estimate the q-quantile (0..1), None when empty"""
+        total = self.count
+        if not total:
+            return None
+        rank = max(math.ceil(q * total), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return round(bucket_value(index), 2)
+        return round(bucket_value(max(self.buckets)), 2)
+
+    def percentiles(self):
+        return {
+            'p50_ms': self.quantile(0.50),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+        }
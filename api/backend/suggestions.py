@@ -0,0 +1,135 @@
+import numpy as np
+from backend.db_connection import db
+from backend.cache import catalog_cache
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+
+
+class SuggestionIndex:
+    """Meal x ingredient incidence matrix held in CSR form
+
+    Row r lists the ingredient columns of meal r in
+    indices[indptr[r]:indptr[r + 1]]. Scoring a pantry is a gather over
+    indices plus a cumulative sum, so every meal is scored in one pass.
+    """
+
+    def __init__(self, meals, links, ingredient_names):
+        self.meals = list(meals)
+        n_meals = len(self.meals)
+        row_of = {m['meal_id']: r for r, m in enumerate(self.meals)}
+
+        self.ingredient_ids = np.array(
+            sorted({l['ingredient_id'] for l in links} | set(ingredient_names)),
+            dtype=np.int64
+        )
+        self.ingredient_names = np.array(
+            [ingredient_names.get(int(i), '') for i in self.ingredient_ids], dtype=object
+        )
+
+        links = [l for l in links if l['meal_id'] in row_of]
+        rows = np.array([row_of[l['meal_id']] for l in links], dtype=np.int64)
+        cols = np.searchsorted(
+            self.ingredient_ids,
+            np.array([l['ingredient_id'] for l in links], dtype=np.int64)
+        )
+        order = np.lexsort((cols, rows))
+        self.indices = cols[order]
+        self.counts = np.bincount(rows, minlength=n_meals)
+        self.indptr = np.concatenate(([0], np.cumsum(self.counts)))
+
+        self.difficulty = np.array(
+            [DIFFICULTIES.index(m['difficulty']) if m['difficulty'] in DIFFICULTIES else -1
+             for m in self.meals], dtype=np.int8
+        )
+        self.cooking_time = np.array(
+            [m['cooking_time_minutes'] if m['cooking_time_minutes'] is not None else np.nan
+             for m in self.meals], dtype=np.float64
+        )
+
+    @classmethod
+    def load(cls, cursor):
+        """Build the index from the catalog tables"""
+        cursor.execute('''
+            SELECT meal_id, meal_name, difficulty, cooking_time_minutes, calories
+            FROM meals
+        ''')
+        meals = cursor.fetchall()
+
+        cursor.execute('SELECT meal_id, ingredient_id FROM meal_ingredients')
+        links = cursor.fetchall()
+
+        cursor.execute('SELECT ingredient_id, ingredient_name FROM ingredients')
+        names = {r['ingredient_id']: r['ingredient_name'] for r in cursor.fetchall()}
+
+        return cls(meals, links, names)
+
+    @property
+    def nbytes(self):
+        """Approximate footprint, used by the catalog cache's byte cap"""
+        arrays = (self.ingredient_ids, self.indices, self.counts, self.indptr,
+                  self.difficulty, self.cooking_time)
+        return sum(a.nbytes for a in arrays) + 200 * (len(self.meals) + len(self.ingredient_ids))
+
+    def _owned_mask(self, owned_ingredient_ids):
+        owned = np.zeros(len(self.ingredient_ids), dtype=bool)
+        ids = np.unique(np.asarray(list(owned_ingredient_ids), dtype=np.int64))
+        if len(ids) and len(self.ingredient_ids):
+            cols = np.searchsorted(self.ingredient_ids, ids)
+            in_range = cols < len(self.ingredient_ids)
+            cols, ids = cols[in_range], ids[in_range]
+            owned[cols[self.ingredient_ids[cols] == ids]] = True
+        return owned
+
+    def suggest(self, owned_ingredient_ids, difficulty=None, max_time=None,
+                min_coverage=0.0, limit=10):
+        """Rank meals by how much of each recipe the pantry already covers"""
+        if not self.meals:
+            return []
+
+        owned = self._owned_mask(owned_ingredient_ids)
+
+        # matched[r] = number of meal r's ingredients present in the pantry
+        hits = np.concatenate(([0], np.cumsum(owned[self.indices], dtype=np.int64)))
+        matched = hits[self.indptr[1:]] - hits[self.indptr[:-1]]
+        coverage = np.divide(matched, self.counts, out=np.zeros(len(self.meals)),
+                             where=self.counts > 0)
+
+        mask = (matched > 0) & (coverage >= min_coverage)
+        if difficulty:
+            code = DIFFICULTIES.index(difficulty) if difficulty in DIFFICULTIES else -2
+            mask &= self.difficulty == code
+        if max_time:
+            mask &= self.cooking_time <= max_time
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > limit:
+            score = coverage[candidates] * 1e4 + matched[candidates]
+            candidates = candidates[np.argpartition(-score, limit - 1)[:limit]]
+        candidates = candidates[np.lexsort((-matched[candidates], -coverage[candidates]))]
+
+        results = []
+        for r in candidates:
+            cols = self.indices[self.indptr[r]:self.indptr[r + 1]]
+            missing = cols[~owned[cols]]
+            results.append({
+                **self.meals[r],
+                'matching_ingredients': int(matched[r]),
+                'total_ingredients': int(self.counts[r]),
+                'coverage_pct': round(float(coverage[r]) * 100, 1),
+                'missing_ingredients': [
+                    {'ingredient_id': int(self.ingredient_ids[c]),
+                     'ingredient_name': self.ingredient_names[c]}
+                    for c in missing
+                ]
+            })
+        return results
+
+
+def get_suggestion_index():
+    """Get the shared index, rebuilding it when the catalog changes"""
+    catalog_cache.refresh()
+    return catalog_cache.get_or_load(
+        ('suggestion_index',),
+        lambda: SuggestionIndex.load(db.get_db().cursor()),
+        tags=('meals', 'meal_ingredients', 'ingredients')
+    )
@@ -0,0 +1,138 @@
+import numpy as np
+from backend.db_connection import db
+from backend.cache import catalog_cache
+
+# Unit normalization.
+#
+# units maps every recipe unit to a dimension (mass, volume, count) and
+# its size in that dimension's base unit (g, ml, piece).
+# ingredient_unit_conversions holds per-ingredient density (g per ml) and
+# piece weight (g per piece). Quantities are converted to grams wherever
+# the ingredient's table allows it and otherwise to the base unit of
+# their own dimension, so an ingredient collapses to one line once its
+# conversions are filled in. Units not in the table pass through as they
+# are. The tables are loaded into arrays once (warmed at startup, then
+# kept in the catalog cache) and whole columns are converted at a time.
+
+BASE_UNITS = {'mass': 'g', 'volume': 'ml', 'count': 'piece'}
+DIMENSIONS = ('mass', 'volume', 'count')
+
+
+def _unit_key(unit):
+    return (unit or '').strip().lower()
+
+
+class UnitTable:
+    """Unit factors plus per-ingredient density and piece weight as arrays"""
+
+    def __init__(self, units, conversions):
+        self.units = {
+            _unit_key(u['unit']): (DIMENSIONS.index(u['dimension']), float(u['to_base']))
+            for u in units
+        }
+        conversions = sorted(conversions, key=lambda c: c['ingredient_id'])
+        self.ingredient_ids = np.array(
+            [c['ingredient_id'] for c in conversions], dtype=np.int64
+        )
+        self.density = np.array(
+            [np.nan if c['density_g_per_ml'] is None else float(c['density_g_per_ml'])
+             for c in conversions], dtype=np.float64
+        )
+        self.grams_per_piece = np.array(
+            [np.nan if c['grams_per_piece'] is None else float(c['grams_per_piece'])
+             for c in conversions], dtype=np.float64
+        )
+
+    @classmethod
+    def load(cls, cursor):
+        """Build the table from units and ingredient_unit_conversions"""
+        cursor.execute('SELECT unit, dimension, to_base FROM units')
+        units = cursor.fetchall()
+        cursor.execute('''
+            SELECT ingredient_id, density_g_per_ml, grams_per_piece
+            FROM ingredient_unit_conversions
+        ''')
+        return cls(units, cursor.fetchall())
+
+    @property
+    def nbytes(self):
+        """Approximate footprint, used by the catalog cache's byte cap"""
+        arrays = (self.ingredient_ids, self.density, self.grams_per_piece)
+        return sum(a.nbytes for a in arrays) + 100 * len(self.units)
+
+    def _per_ingredient(self, values, ingredient_ids):
+        """values for each id, NaN where the ingredient has no row"""
+        out = np.full(len(ingredient_ids), np.nan)
+        if len(self.ingredient_ids):
+            pos = np.searchsorted(self.ingredient_ids, ingredient_ids)
+            pos = np.minimum(pos, len(self.ingredient_ids) - 1)
+            found = self.ingredient_ids[pos] == ingredient_ids
+            out[found] = values[pos[found]]
+        return out
+
+    def normalize(self, ingredient_ids, units, quantities):
+        """Convert parallel columns to canonical units
+
+        Returns (quantities as float64, units as an object array).
+        """
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        quantities = np.asarray([float(q or 0) for q in quantities], dtype=np.float64)
+        known = [self.units.get(_unit_key(u)) for u in units]
+        dimension = np.array([k[0] if k else -1 for k in known], dtype=np.int8)
+        factor = np.array([k[1] if k else 1.0 for k in known], dtype=np.float64)
+
+        out_units = np.array(list(units), dtype=object)
+        for code, name in enumerate(DIMENSIONS):
+            out_units[dimension == code] = BASE_UNITS[name]
+        base = quantities * factor
+
+        # Volume and count reach grams through the ingredient's own table
+        density = self._per_ingredient(self.density, ingredient_ids)
+        weight = self._per_ingredient(self.grams_per_piece, ingredient_ids)
+        grams = np.select(
+            [dimension == 0, dimension == 1, dimension == 2],
+            [base, base * density, base * weight],
+            default=np.nan
+        )
+        to_grams = ~np.isnan(grams)
+        out_units[to_grams] = 'g'
+        return np.where(to_grams, grams, base), out_units
+
+    def aggregate(self, ingredient_ids, units, quantities):
+        """Sum quantities per ingredient and canonical unit
+
+        Returns (ingredient_ids, units, totals) arrays, one entry per group.
+        """
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        if not len(ingredient_ids):
+            return ingredient_ids, np.array([], dtype=object), np.array([])
+        converted, out_units = self.normalize(ingredient_ids, units, quantities)
+        unit_names, unit_codes = np.unique(
+            np.array([u or '' for u in out_units], dtype=str), return_inverse=True
+        )
+        unit_codes = unit_codes.ravel()
+        groups, first, inverse = np.unique(
+            ingredient_ids * len(unit_names) + unit_codes,
+            return_index=True, return_inverse=True
+        )
+        totals = np.bincount(inverse.ravel(), weights=converted, minlength=len(groups))
+        return ingredient_ids[first], out_units[first], totals
+
+    def to_canonical(self, ingredient_id, unit, quantity):
+        """Convert one quantity, returns (quantity, unit)"""
+        converted, out_units = self.normalize([ingredient_id], [unit], [quantity])
+        return float(converted[0]), out_units[0]
+
+
+def get_unit_table():
+    """Get the shared unit table, reloading it after conversions change"""
+    return catalog_cache.get_or_load(
+        ('unit_table',),
+        lambda: UnitTable.load(db.get_db().cursor()),
+        tags=('units',)
+    )
+
+
+def warm_unit_table(conn):
+    """Load the unit table into the catalog cache outside a request"""
+    catalog_cache.set(('unit_table',), UnitTable.load(conn.cursor()), tags=('units',))
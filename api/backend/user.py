@@ -1,11 +1,21 @@
 from flask import Blueprint, request, jsonify
 from backend.db_connection import db
+from backend.etag import bump_versions, conditional
+from backend.inventory import parse_sync, restate_item, sync_inventory
+from backend.nutrition import apply_consumed_meal
+from backend.pagination import Page
+from backend.planner import (apply_template, create_plan, find_plan_for_week,
+                             get_week_view, parse_copy_options)
+from backend.units import get_unit_table
+from datetime import date
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 
 users = Blueprint('users', __name__)
 
 
 # Route 1: GET /users/<id>/inventory
 @users.route('/users/<int:user_id>/inventory', methods=['GET'])
+@conditional(lambda user_id: ['catalog', f'inventory:{user_id}'])
 def get_user_inventory(user_id):
     """Get all inventory items for a user"""
     sort_by = request.args.get('sort_by', 'name')  # name or expiration
@@ -14,40 +24,73 @@ def get_user_inventory(user_id):
 
     query = '''
         SELECT inv.inventory_id, i.ingredient_id, i.ingredient_name,
-               i.category, inv.quantity, inv.expiration_date
+               i.category, inv.quantity, inv.unit, inv.expiration_date
         FROM inventory inv
         JOIN ingredients i ON inv.ingredient_id = i.ingredient_id
         WHERE inv.user_id = %s
     '''
 
     if sort_by == 'expiration':
-        query += ' ORDER BY inv.expiration_date ASC'
+        page = Page([('inv.expiration_date', 'ASC'), ('inv.inventory_id', 'ASC')],
+                    ['expiration_date', 'inventory_id'], sort='expiration')
     else:
-        query += ' ORDER BY i.ingredient_name'
+        page = Page([('i.ingredient_name', 'ASC'), ('inv.inventory_id', 'ASC')],
+                    ['ingredient_name', 'inventory_id'], sort='name')
 
-    cursor.execute(query, (user_id,))
+    where, where_params = page.where()
+    query += where + page.order_by()
+
+    cursor.execute(query, [user_id] + where_params)
     results = cursor.fetchall()
 
-    return jsonify(results), 200
+    return page.response(results), 200
 
 
 # Route 2: POST /users/<id>/inventory
 @users.route('/users/<int:user_id>/inventory', methods=['POST'])
 def add_to_inventory(user_id):
-    """Add new ingredient to user's inventory"""
+    """Add new ingredient to user's inventory, topping up an existing item"""
     data = request.json
     cursor = db.get_db().cursor()
+    quantity, unit = get_unit_table().to_canonical(
+        data['ingredient_id'], data.get('unit'), data['quantity']
+    )
+
+    cursor.execute('''
+        SELECT inventory_id, ingredient_id, quantity, unit FROM inventory
+        WHERE user_id = %s AND ingredient_id = %s
+        FOR UPDATE
+    ''', (user_id, data['ingredient_id']))
+    existing = cursor.fetchone()
+    if existing:
+        if data.get('unit') is None and existing['unit'] is not None:
+            # A quantity without a unit is in the unit the item is stocked in
+            quantity, unit = get_unit_table().to_canonical(
+                data['ingredient_id'], existing['unit'], data['quantity']
+            )
+        _, stocked = restate_item(cursor, existing)
+        if None not in (stocked, unit) and stocked != unit:
+            db.get_db().rollback()
+            return jsonify({'error': f"Item is stocked in {stocked}, not {unit}"}), 400
 
+    # LAST_INSERT_ID(inventory_id) reports the existing row's id on a top-up
     query = '''
-        INSERT INTO inventory (user_id, ingredient_id, quantity, expiration_date)
-        VALUES (%s, %s, %s, %s)
+        INSERT INTO inventory (user_id, ingredient_id, quantity, unit, expiration_date)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            inventory_id = LAST_INSERT_ID(inventory_id),
+            quantity = COALESCE(inventory.quantity, 0) + VALUES(quantity),
+            unit = COALESCE(VALUES(unit), inventory.unit),
+            expiration_date = COALESCE(VALUES(expiration_date), inventory.expiration_date)
     '''
     cursor.execute(query, (
         user_id,
         data['ingredient_id'],
-        data['quantity'],
+        round(quantity, 2),
+        unit,
         data.get('expiration_date')
     ))
+    bump_versions(cursor, f'inventory:{user_id}')
     db.get_db().commit()
 
     return jsonify({
@@ -64,7 +107,7 @@ def get_inventory_item(user_id, ingredient_id):
 
     query = '''
         SELECT inv.inventory_id, i.ingredient_id, i.ingredient_name,
-               inv.quantity, inv.expiration_date
+               inv.quantity, inv.unit, inv.expiration_date
         FROM inventory inv
         JOIN ingredients i ON inv.ingredient_id = i.ingredient_id
         WHERE inv.user_id = %s AND inv.ingredient_id = %s
@@ -81,21 +124,34 @@ def get_inventory_item(user_id, ingredient_id):
 # Route 4: PUT /users/<id>/inventory/<ingredient_id>
 @users.route('/users/<int:user_id>/inventory/<int:ingredient_id>', methods=['PUT'])
 def update_inventory(user_id, ingredient_id):
-    """Update inventory quantity"""
+    """Update inventory quantity, optionally in another unit"""
     data = request.json
     cursor = db.get_db().cursor()
 
+    cursor.execute('''
+        SELECT inventory_id, unit FROM inventory
+        WHERE user_id = %s AND ingredient_id = %s
+        FOR UPDATE
+    ''', (user_id, ingredient_id))
+    existing = cursor.fetchone()
+    if not existing:
+        db.get_db().rollback()
+        return jsonify({'error': 'Inventory item not found'}), 404
+
+    # Without a unit the quantity is in the stored unit, restated with it
+    quantity, unit = get_unit_table().to_canonical(
+        ingredient_id, data.get('unit') or existing['unit'], data['quantity']
+    )
+
     query = '''
         UPDATE inventory
-        SET quantity = %s
-        WHERE user_id = %s AND ingredient_id = %s
+        SET quantity = %s, unit = %s
+        WHERE inventory_id = %s
     '''
-    cursor.execute(query, (data['quantity'], user_id, ingredient_id))
+    cursor.execute(query, (round(quantity, 2), unit, existing['inventory_id']))
+    bump_versions(cursor, f'inventory:{user_id}')
     db.get_db().commit()
 
-    if cursor.rowcount == 0:
-        return jsonify({'error': 'Inventory item not found'}), 404
-
     return jsonify({'message': 'Inventory updated successfully'}), 200
 
 
@@ -105,14 +161,24 @@ def remove_from_inventory(user_id, ingredient_id):
     """Remove ingredient from inventory"""
     cursor = db.get_db().cursor()
 
+    # Log the removal first; the item's history outlives it
+    cursor.execute('''
+        INSERT INTO inventory_event_log (inventory_id, user_id, event_type, event_quantity)
+        SELECT inventory_id, user_id, 'DISCARDED', quantity
+        FROM inventory
+        WHERE user_id = %s AND ingredient_id = %s
+    ''', (user_id, ingredient_id))
+
     query = '''
         DELETE FROM inventory
         WHERE user_id = %s AND ingredient_id = %s
     '''
     cursor.execute(query, (user_id, ingredient_id))
+    changed = cursor.rowcount
+    bump_versions(cursor, f'inventory:{user_id}')
     db.get_db().commit()
 
-    if cursor.rowcount == 0:
+    if changed == 0:
         return jsonify({'error': 'Inventory item not found'}), 404
 
     return jsonify({'message': 'Item removed from inventory'}), 200
@@ -120,6 +186,7 @@ def remove_from_inventory(user_id, ingredient_id):
 
 # Route 6: GET /users/<id>/nutrition_summary
 @users.route('/users/<int:user_id>/nutrition_summary', methods=['GET'])
+@conditional(lambda user_id: [f'consumed_meals:{user_id}'])
 def get_nutrition_summary(user_id):
     """Get user's nutrition progress"""
     cursor = db.get_db().cursor()
@@ -134,4 +201,204 @@ def get_nutrition_summary(user_id):
     cursor.execute(query, (user_id,))
     results = cursor.fetchall()
 
-    return jsonify(results), 200
\ No newline at end of file
+    return jsonify(results), 200
+
+
+# Route 7: POST /users/<id>/consumed_meals
+@users.route('/users/<int:user_id>/consumed_meals', methods=['POST'])
+def log_consumed_meal(user_id):
+    """Log a consumed meal and fold it into the daily nutrition summary"""
+    data = request.json
+    # Stored as DECIMAL(5,2); a missing or null multiplier is one serving
+    multiplier = data.get('serving_multiplier')
+    try:
+        serving_multiplier = Decimal(str(1 if multiplier is None else multiplier)).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP)
+        valid = serving_multiplier.is_finite() and 0 < serving_multiplier < 1000
+    except InvalidOperation:
+        valid = False
+    if not valid:
+        return jsonify({'error': 'serving_multiplier must be a number between 0 and 1000'}), 400
+    cursor = db.get_db().cursor()
+
+    query = '''
+        INSERT INTO consumed_meals (user_id, meal_id, date_consumed, serving_multiplier)
+        VALUES (%s, %s, COALESCE(%s, CURDATE()), %s)
+    '''
+    cursor.execute(query, (
+        user_id,
+        data['meal_id'],
+        data.get('date_consumed'),
+        serving_multiplier
+    ))
+    consumed_id = cursor.lastrowid
+
+    cursor.execute('''
+        SELECT date_consumed FROM consumed_meals WHERE consumed_id = %s
+    ''', (consumed_id,))
+    date_consumed = cursor.fetchone()['date_consumed']
+
+    apply_consumed_meal(cursor, user_id, data['meal_id'], date_consumed,
+                        serving_multiplier, 1)
+    bump_versions(cursor, f'consumed_meals:{user_id}')
+    db.get_db().commit()
+
+    return jsonify({
+        'message': 'Consumed meal logged',
+        'consumed_id': consumed_id,
+        'date_consumed': date_consumed.isoformat()
+    }), 201
+
+
+# Route 8: DELETE /users/<id>/consumed_meals/<consumed_id>
+@users.route('/users/<int:user_id>/consumed_meals/<int:consumed_id>', methods=['DELETE'])
+def delete_consumed_meal(user_id, consumed_id):
+    """Remove a consumed meal and subtract it from the daily summary"""
+    cursor = db.get_db().cursor()
+
+    cursor.execute('''
+        SELECT meal_id, date_consumed, serving_multiplier
+        FROM consumed_meals
+        WHERE consumed_id = %s AND user_id = %s
+        FOR UPDATE
+    ''', (consumed_id, user_id))
+    consumed = cursor.fetchone()
+
+    if not consumed:
+        return jsonify({'error': 'Consumed meal not found'}), 404
+
+    cursor.execute('DELETE FROM consumed_meals WHERE consumed_id = %s', (consumed_id,))
+    apply_consumed_meal(cursor, user_id, consumed['meal_id'], consumed['date_consumed'],
+                        consumed['serving_multiplier'] or 1, -1)
+    bump_versions(cursor, f'consumed_meals:{user_id}')
+    db.get_db().commit()
+
+    return jsonify({'message': 'Consumed meal removed'}), 200
+
+
+def _user_week_view_scopes(user_id):
+    # The user's plans decide which plan is shown, that plan what it shows
+    scopes = [f'meal_plans:{user_id}', 'catalog']
+    try:
+        day = date.fromisoformat(request.args.get('week_start', date.today().isoformat()))
+    except ValueError:
+        return scopes
+    plan_id = find_plan_for_week(db.get_db().cursor(), user_id, day)
+    if plan_id is not None:
+        scopes.append(f'meal_plan:{plan_id}')
+    return scopes
+
+
+# Route 9: GET /users/<id>/week_view
+@users.route('/users/<int:user_id>/week_view', methods=['GET'])
+@conditional(_user_week_view_scopes)
+def get_user_week_view(user_id):
+    """Get the week view of the user's plan for the week containing week_start"""
+    try:
+        day = date.fromisoformat(request.args.get('week_start', date.today().isoformat()))
+    except ValueError:
+        return jsonify({'error': 'week_start must be YYYY-MM-DD'}), 400
+
+    cursor = db.get_db().cursor()
+
+    plan_id = find_plan_for_week(cursor, user_id, day)
+    if plan_id is None:
+        return jsonify({'error': 'No meal plan for that week'}), 404
+
+    return jsonify(get_week_view(cursor, plan_id)), 200
+
+
+# Route 10: GET /users/<id>/meal_plan_templates
+@users.route('/users/<int:user_id>/meal_plan_templates', methods=['GET'])
+@conditional(lambda user_id: [f'templates:{user_id}'])
+def get_meal_plan_templates(user_id):
+    """Get the user's saved week templates"""
+    cursor = db.get_db().cursor()
+
+    query = '''
+        SELECT t.template_id, t.name, t.created_at, t.updated_at,
+               COUNT(tm.template_meal_id) AS meal_count
+        FROM meal_plan_templates t
+        LEFT JOIN meal_plan_template_meals tm ON tm.template_id = t.template_id
+        WHERE t.user_id = %s
+        GROUP BY t.template_id, t.name, t.created_at, t.updated_at
+        ORDER BY t.name
+    '''
+    cursor.execute(query, (user_id,))
+    results = cursor.fetchall()
+
+    return jsonify(results), 200
+
+
+# Route 11: DELETE /users/<id>/meal_plan_templates/<template_id>
+@users.route('/users/<int:user_id>/meal_plan_templates/<int:template_id>', methods=['DELETE'])
+def delete_meal_plan_template(user_id, template_id):
+    """Delete a saved week template"""
+    cursor = db.get_db().cursor()
+
+    query = '''
+        DELETE FROM meal_plan_templates
+        WHERE template_id = %s AND user_id = %s
+    '''
+    cursor.execute(query, (template_id, user_id))
+    deleted = cursor.rowcount
+    bump_versions(cursor, f'templates:{user_id}')
+    db.get_db().commit()
+
+    if deleted == 0:
+        return jsonify({'error': 'Template not found'}), 404
+
+    return jsonify({'message': 'Template deleted'}), 200
+
+
+# Route 12: POST /users/<id>/meal_plans
+@users.route('/users/<int:user_id>/meal_plans', methods=['POST'])
+def create_meal_plan(user_id):
+    """Create a draft plan for a week, empty or from a saved template"""
+    data = request.json or {}
+    try:
+        week_start = date.fromisoformat(data['week_start'])
+        options = parse_copy_options(data)
+    except (KeyError, TypeError):
+        return jsonify({'error': 'week_start (YYYY-MM-DD) is required'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    if data.get('template_id') is not None:
+        plan_id = apply_template(cursor, user_id, data['template_id'], week_start, options)
+        if plan_id is None:
+            return jsonify({'error': 'Template not found'}), 404
+    else:
+        plan_id = create_plan(cursor, user_id, week_start)
+        if plan_id is None:
+            return jsonify({'error': 'User not found'}), 404
+
+    bump_versions(cursor, f'meal_plan:{plan_id}', f'meal_plans:{user_id}')
+    conn.commit()
+
+    return jsonify(get_week_view(cursor, plan_id)), 201
+
+
+# Route 13: POST /users/<id>/inventory/sync
+@users.route('/users/<int:user_id>/inventory/sync', methods=['POST'])
+def sync_user_inventory(user_id):
+    """Apply a delta or full pantry state in one transaction"""
+    try:
+        sync = parse_sync(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    conn = db.get_db()
+    cursor = conn.cursor()
+    try:
+        counts = sync_inventory(cursor, user_id, sync)
+    except ValueError as e:
+        conn.rollback()
+        return jsonify({'error': str(e)}), 400
+
+    bump_versions(cursor, f'inventory:{user_id}')
+    conn.commit()
+
+    return jsonify(dict(counts, message='Inventory synced', mode=sync['mode'])), 200
@@ -0,0 +1 @@
+# Lets pytest import the backend package when run from api/
@@ -0,0 +1,142 @@
+from datetime import datetime
+from backend import cache
+from backend.cache import CatalogCache, LRUCache
+
+
+def test_get_set_and_stats():
+    lru = LRUCache()
+    assert lru.get('a') == (False, None)
+    lru.set('a', [1, 2])
+    assert lru.get('a') == (True, [1, 2])
+    stats = lru.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_expired_entry_is_a_miss():
+    lru = LRUCache(ttl=-1)
+    lru.set('a', 1)
+    assert lru.get('a') == (False, None)
+    assert lru.stats()['entries'] == 0
+
+
+def test_byte_cap_evicts_least_recently_used():
+    lru = LRUCache(max_bytes=20)
+    lru.set('a', 'x' * 6)
+    lru.set('b', 'y' * 6)
+    lru.get('a')
+    lru.set('c', 'z' * 6)
+    assert lru.get('b') == (False, None)
+    assert lru.get('a')[0] and lru.get('c')[0]
+    assert lru.stats()['evictions'] == 1
+
+    lru.set('big', 'w' * 100)
+    assert lru.get('big') == (False, None)
+
+
+def test_invalidate_by_tag():
+    lru = LRUCache()
+    lru.set('meal', 1, tags=('meals', 'meal:1'))
+    lru.set('other', 2, tags=('meals', 'meal:2'))
+    lru.invalidate('meal:1')
+    assert lru.get('meal') == (False, None)
+    assert lru.get('other') == (True, 2)
+    lru.invalidate('meals')
+    assert lru.stats()['entries'] == 0
+    assert lru._tags == {}
+
+
+def test_get_or_load_tags_from_value():
+    lru = LRUCache()
+    calls = []
+
+    def load():
+        calls.append(1)
+        return {'ingredient_ids': [3, 4]}
+
+    tags = lambda value: [f'ingredient:{i}' for i in value['ingredient_ids']]
+    assert lru.get_or_load('k', load, tags) == {'ingredient_ids': [3, 4]}
+    assert lru.get_or_load('k', load, tags) == {'ingredient_ids': [3, 4]}
+    assert len(calls) == 1
+    lru.invalidate('ingredient:4')
+    lru.get_or_load('k', load, tags)
+    assert len(calls) == 2
+
+
+class FakeCursor:
+    """Answers the catalog refresh queries from in-memory state"""
+
+    def __init__(self, state):
+        self.state = state
+        self.queries = []
+
+    def execute(self, sql, args=None):
+        self.queries.append(sql)
+        if 'resource_versions' in sql:
+            self.result = [{'version': self.state['version']}]
+        elif 'MAX(last_modified)' in sql:
+            self.result = [{'watermark': max(self.state['ingredients'].values())}]
+        elif 'last_modified =' in sql:
+            self.result = [{'ingredient_id': i} for i, ts in self.state['ingredients'].items()
+                           if ts == args[0]]
+        else:
+            self.result = [{'ingredient_id': i, 'last_modified': ts}
+                           for i, ts in self.state['ingredients'].items() if ts >= args[0]]
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeDB:
+    def __init__(self, state):
+        self.cursors = []
+        self.state = state
+
+    def get_db(self):
+        return self
+
+    def cursor(self):
+        self.cursors.append(FakeCursor(self.state))
+        return self.cursors[-1]
+
+
+def test_catalog_refresh_invalidates_changed_ingredients(monkeypatch):
+    t0, t1 = datetime(2024, 1, 1, 0, 0, 0), datetime(2024, 1, 1, 0, 0, 1)
+    state = {'version': 3, 'ingredients': {1: t0, 2: t0}}
+    fake = FakeDB(state)
+    monkeypatch.setattr(cache, 'db', fake)
+
+    catalog = CatalogCache(refresh_interval=0)
+    assert catalog.version() == 3
+    assert catalog.watermark() == t0
+    catalog.set('one', 1, tags=('ingredient:1',))
+    catalog.set('two', 2, tags=('ingredient:2',))
+
+    state['ingredients'][2] = t1
+    state['version'] = 4
+    catalog.refresh()
+    assert catalog.get('one') == (True, 1)
+    assert catalog.get('two') == (False, None)
+    assert catalog.version() == 4
+
+    # Rows already handled at the watermark are not invalidated again
+    catalog.set('two', 2, tags=('ingredient:2',))
+    catalog.refresh()
+    assert catalog.get('two') == (True, 2)
+
+
+def test_catalog_refresh_is_rate_limited(monkeypatch):
+    fake = FakeDB({'version': 1, 'ingredients': {1: datetime(2024, 1, 1)}})
+    monkeypatch.setattr(cache, 'db', fake)
+
+    catalog = CatalogCache(refresh_interval=60)
+    catalog.version()
+    catalog.version()
+    assert len(fake.cursors) == 1
+
+    catalog.expire_version()
+    catalog.version()
+    assert len(fake.cursors) == 2
@@ -0,0 +1,158 @@
+import threading
+import time
+import pytest
+from backend.db_connection import ConnectionPool, PoolTimeout, StickyReads
+
+
+class FakeConn:
+    """Connection double recording ping, rollback and close calls"""
+
+    def __init__(self, ping_fails=False, rollback_fails=False):
+        self.ping_fails = ping_fails
+        self.rollback_fails = rollback_fails
+        self.pings = 0
+        self.rollbacks = 0
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if self.ping_fails:
+            raise ConnectionError('gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.rollback_fails:
+            raise ConnectionError('gone away')
+
+    def close(self):
+        self.closed = True
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = FakeConn()
+        opened.append(conn)
+        return conn
+
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_release_reuses_connection_and_rolls_back():
+    pool, opened = make_pool(max_size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1
+
+    assert pool.acquire() is conn
+    assert conn.pings == 1
+    assert len(opened) == 1
+    assert pool.stats()['checkouts'] == 2
+
+
+def test_acquire_times_out_when_pool_is_full():
+    pool, _ = make_pool(max_size=1, timeout=0.05)
+    pool.acquire()
+
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 1
+    assert stats['in_use'] == 1
+
+
+def test_waiter_gets_connection_released_by_another_thread():
+    pool, opened = make_pool(max_size=1, timeout=2)
+    conn = pool.acquire()
+    timer = threading.Timer(0.05, pool.release, (conn,))
+    timer.start()
+    try:
+        assert pool.acquire() is conn
+    finally:
+        timer.join()
+    assert len(opened) == 1
+    assert pool.stats()['waits'] == 1
+
+
+def test_old_idle_connection_is_recycled_on_checkout():
+    pool, opened = make_pool(recycle_seconds=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    pool._meta[id(conn)]['created'] -= 61
+
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert len(opened) == 2
+    assert pool.stats()['recycled'] == 1
+    assert pool.stats()['size'] == 1
+
+
+def test_overused_connection_is_recycled_on_release():
+    pool, _ = make_pool(max_uses=1)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert conn.closed
+    stats = pool.stats()
+    assert stats['recycled'] == 1
+    assert stats['size'] == 0
+    assert stats['idle'] == 0
+
+
+def test_failed_ping_opens_a_replacement():
+    pool, opened = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_fails = True
+
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert pool.stats()['failed_pings'] == 1
+    assert pool.stats()['size'] == 1
+
+
+def test_failed_rollback_discards_connection():
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    conn.rollback_fails = True
+    pool.release(conn)
+
+    assert conn.closed
+    assert pool.stats()['size'] == 0
+
+
+def test_failed_connect_frees_its_slot():
+    def connect():
+        raise ConnectionError('refused')
+
+    pool = ConnectionPool(connect, max_size=1, timeout=0.05)
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()['size'] == 0
+
+
+def test_sticky_reads_expire():
+    sticky = StickyReads(seconds=60)
+    sticky.mark('a')
+    assert sticky.active('a')
+    assert not sticky.active('b')
+
+    sticky = StickyReads(seconds=0)
+    sticky.mark('a')
+    assert not sticky.active('a')
+
+
+def test_sticky_reads_drop_expired_clients_at_capacity():
+    sticky = StickyReads(seconds=0, max_clients=2)
+    sticky.mark('a')
+    sticky.mark('b')
+    sticky.seconds = 60
+    sticky.mark('c')
+    assert set(sticky._until) == {'c'}
@@ -0,0 +1,22 @@
+from backend.events import EventHub, format_event
+
+
+def test_format_event():
+    assert format_event('health', {'ok': True}, event_id=3) == \
+        'id: 3\nevent: health\ndata: {"ok": true}\n\n'
+
+
+def test_late_committed_error_ids_are_published_once():
+    hub = EventHub(error_window=5)
+    hub._last_error_id = 10
+    hub._seen_error_ids = {8, 10}
+    published = []
+    hub.publish = lambda event, data, event_id=None: published.append(event_id)
+
+    hub._publish_errors([{'error_id': i} for i in (8, 9, 10, 11)])
+    # 7 committed after 11; 9 and 11 are read again inside the window
+    hub._publish_errors([{'error_id': i} for i in (7, 9, 11, 12)])
+
+    assert published == [9, 11, 7, 12]
+    assert hub._last_error_id == 12
+    assert hub._seen_error_ids == {8, 9, 10, 11, 12}
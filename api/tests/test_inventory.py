@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from backend import inventory
+from backend.inventory import _merge, parse_sync
+from backend.units import UnitTable
+
+
+@pytest.fixture(autouse=True)
+def unit_table(monkeypatch):
+    table = UnitTable(
+        [{'unit': 'g', 'dimension': 'mass', 'to_base': 1},
+         {'unit': 'kg', 'dimension': 'mass', 'to_base': 1000},
+         {'unit': 'ml', 'dimension': 'volume', 'to_base': 1}],
+        [{'ingredient_id': 1, 'density_g_per_ml': 2, 'grams_per_piece': None}]
+    )
+    monkeypatch.setattr(inventory, 'get_unit_table', lambda: table)
+
+
+def test_parse_sync_defaults_to_delta():
+    sync = parse_sync({'items': [
+        {'ingredient_id': '4', 'quantity': '1.5', 'unit': 'kg', 'expiration_date': '2024-02-01'},
+    ]})
+    assert sync == {'mode': 'delta', 'items': [{
+        'ingredient_id': 4, 'quantity': Decimal('1.5'), 'unit': 'kg',
+        'expiration_date': date(2024, 2, 1),
+    }]}
+
+
+@pytest.mark.parametrize('body', [
+    [],
+    {'mode': 'replace'},
+    {'items': [{'quantity': 1}]},
+    {'items': [{'ingredient_id': 1, 'quantity': 'lots'}]},
+    {'items': [{'ingredient_id': 1, 'quantity': 'NaN'}]},
+    {'items': [{'ingredient_id': 1, 'quantity': 1, 'expiration_date': 'soon'}]},
+    {'mode': 'full', 'items': [{'ingredient_id': 1, 'quantity': -1}]},
+])
+def test_parse_sync_rejects(body):
+    with pytest.raises(ValueError):
+        parse_sync(body)
+
+
+def test_merge_delta_sums_in_canonical_units():
+    sync = parse_sync({'items': [
+        {'ingredient_id': 1, 'quantity': 10, 'unit': 'ml'},
+        {'ingredient_id': 1, 'quantity': -5, 'unit': 'g', 'expiration_date': '2024-03-01'},
+        {'ingredient_id': 2, 'quantity': 1, 'unit': 'kg'},
+    ]})
+    merged = _merge(sync['mode'], sync['items'])
+    assert merged[1]['quantity'] == 15 and merged[1]['unit'] == 'g'
+    assert merged[1]['expiration_date'] == date(2024, 3, 1)
+    assert merged[2]['quantity'] == 1000 and merged[2]['unit'] == 'g'
+
+
+def test_merge_delta_unitless_item_takes_the_other_unit():
+    sync = parse_sync({'items': [
+        {'ingredient_id': 2, 'quantity': 3, 'unit': 'ml'},
+        {'ingredient_id': 2, 'quantity': 1},
+    ]})
+    merged = _merge(sync['mode'], sync['items'])
+    assert merged[2]['quantity'] == 4 and merged[2]['unit'] == 'ml'
+
+
+def test_merge_delta_rejects_mixed_units():
+    sync = parse_sync({'items': [
+        {'ingredient_id': 2, 'quantity': 3, 'unit': 'ml'},
+        {'ingredient_id': 2, 'quantity': 1, 'unit': 'g'},
+    ]})
+    with pytest.raises(ValueError):
+        _merge(sync['mode'], sync['items'])
+
+
+def test_merge_full_last_item_wins():
+    sync = parse_sync({'mode': 'full', 'items': [
+        {'ingredient_id': 2, 'quantity': 3, 'unit': 'ml'},
+        {'ingredient_id': 2, 'quantity': 1, 'unit': 'g'},
+    ]})
+    merged = _merge(sync['mode'], sync['items'])
+    assert merged[2]['quantity'] == 1 and merged[2]['unit'] == 'g'
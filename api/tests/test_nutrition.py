@@ -0,0 +1,59 @@
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+from backend.nutrition import NUTRIENTS, backfill_daily_nutrition
+
+MEALS = [
+    {'meal_id': 1, 'calories': 333, 'protein_g': Decimal('12.35'), 'carbs_g': Decimal('40.10'),
+     'fat_g': None, 'sodium_mg': Decimal('101.01')},
+    {'meal_id': 2, 'calories': 125, 'protein_g': Decimal('3.33'), 'carbs_g': Decimal('0.05'),
+     'fat_g': Decimal('7.77'), 'sodium_mg': Decimal('0')},
+]
+CONSUMED = [
+    {'user_id': 1, 'meal_id': 1, 'date_consumed': date(2024, 1, 1), 'serving_multiplier': Decimal('1.50')},
+    {'user_id': 1, 'meal_id': 2, 'date_consumed': date(2024, 1, 1), 'serving_multiplier': Decimal('0.50')},
+    {'user_id': 1, 'meal_id': 2, 'date_consumed': date(2024, 1, 1), 'serving_multiplier': None},
+    {'user_id': 2, 'meal_id': 1, 'date_consumed': date(2024, 1, 2), 'serving_multiplier': Decimal('0.33')},
+]
+
+
+class FakeCursor:
+    def __init__(self):
+        self.written = []
+
+    def execute(self, sql, args=None):
+        if 'FROM meals' in sql:
+            self.result = MEALS
+        elif 'FROM consumed_meals' in sql and sql.lstrip().startswith('SELECT'):
+            self.result = CONSUMED
+        else:
+            self.result = []
+
+    def executemany(self, sql, rows):
+        self.written.extend(rows)
+
+    def fetchall(self):
+        return self.result
+
+
+def incremental(user_id, day):
+    """Sum of what apply_consumed_meal adds per meal, rounded as MySQL does"""
+    meals = {m['meal_id']: m for m in MEALS}
+    totals = [Decimal(0)] * len(NUTRIENTS)
+    for c in CONSUMED:
+        if (c['user_id'], c['date_consumed']) != (user_id, day):
+            continue
+        factor = c['serving_multiplier'] or 1
+        for i, name in enumerate(NUTRIENTS):
+            value = Decimal(meals[c['meal_id']][name] or 0) * factor
+            places = Decimal('1') if name == 'calories' else Decimal('0.01')
+            totals[i] += value.quantize(places, rounding=ROUND_HALF_UP)
+    return totals
+
+
+def test_backfill_rounds_each_meal_like_the_incremental_path():
+    cursor = FakeCursor()
+    assert backfill_daily_nutrition(cursor) == 2
+
+    for user_id, day, *values in cursor.written:
+        assert values == incremental(user_id, day)
+    assert cursor.written[0][:3] == (1, date(2024, 1, 1), 500 + 63 + 125)
@@ -0,0 +1,77 @@
+import pytest
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+from backend.pagination import Page, decode_cursor, encode_cursor, keyset_clause, MAX_LIMIT
+
+ORDER = [('status', 'ASC'), ('created_at', 'DESC'), ('plan_id', 'DESC')]
+app = Flask(__name__)
+
+
+def test_keyset_clause_ascending():
+    clause, params = keyset_clause([('name', 'ASC'), ('id', 'ASC')], ['b', 7])
+    assert clause == '((name > %s) OR (name = %s AND id > %s))'
+    assert params == ['b', 'b', 7]
+
+
+def test_keyset_clause_descending_allows_nulls_unless_not_null():
+    clause, params = keyset_clause([('ts', 'DESC'), ('id', 'DESC')], ['2024-01-01', 9])
+    assert clause == ('(((ts < %s OR ts IS NULL)) OR '
+                      '(ts = %s AND (id < %s OR id IS NULL)))')
+    assert params == ['2024-01-01', '2024-01-01', 9]
+
+    clause, _ = keyset_clause([('ts', 'DESC'), ('id', 'DESC')], ['2024-01-01', 9],
+                              not_null=('ts', 'id'))
+    assert clause == '((ts < %s) OR (ts = %s AND id < %s))'
+
+
+def test_keyset_clause_null_values():
+    clause, params = keyset_clause([('expires', 'ASC'), ('id', 'ASC')], [None, 3])
+    assert clause == '((expires IS NOT NULL) OR (expires IS NULL AND id > %s))'
+    assert params == [3]
+
+    # Nothing sorts after NULL descending
+    assert keyset_clause([('ts', 'DESC')], [None]) == ('1=0', [])
+
+
+def test_cursor_round_trip_and_sort_mismatch():
+    token = encode_cursor(['Active', '2024-01-01 00:00:00', 5], sort='status')
+    assert decode_cursor(token, sort='status') == ['Active', '2024-01-01 00:00:00', 5]
+    with pytest.raises(ValueError):
+        decode_cursor(token, sort='created')
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+
+def test_page_first_page_and_limit_clamp():
+    with app.test_request_context('/plans?limit=100000'):
+        page = Page(ORDER, ['status', 'created_at', 'plan_id'])
+        assert page.limit == MAX_LIMIT
+        assert page.where() == ('', [])
+        assert page.order_by() == (' ORDER BY status ASC, created_at DESC, plan_id DESC'
+                                   f' LIMIT {MAX_LIMIT + 1}')
+
+
+def test_page_rejects_cursor_of_another_shape():
+    token = encode_cursor([1])
+    with app.test_request_context(f'/plans?after={token}'):
+        with pytest.raises(HTTPException) as e:
+            Page(ORDER, ['status', 'created_at', 'plan_id'])
+        assert e.value.response.status_code == 400
+
+
+def test_page_response_trims_lookahead_and_links_next_page():
+    rows = [{'plan_id': i, 'rank': 1} for i in (9, 8, 7)]
+    with app.test_request_context('/plans?limit=2'):
+        page = Page([('rank', 'ASC'), ('plan_id', 'DESC')], ['rank', 'plan_id'],
+                    hidden=('rank',), not_null=('rank', 'plan_id'))
+        response = page.response(rows)
+        assert response.get_json() == [{'plan_id': 9}, {'plan_id': 8}]
+        token = response.headers['X-Next-Cursor']
+        assert 'rel="next"' in response.headers['Link']
+
+    with app.test_request_context(f'/plans?limit=2&after={token}'):
+        page = Page([('rank', 'ASC'), ('plan_id', 'DESC')], ['rank', 'plan_id'],
+                    not_null=('rank', 'plan_id'))
+        assert page.where() == (' AND ((rank > %s) OR (rank = %s AND plan_id < %s))', [1, 1, 8])
+        response = page.response(rows[2:])
+        assert 'X-Next-Cursor' not in response.headers
@@ -0,0 +1,116 @@
+import pytest
+from backend import planner
+from backend.planner import apply_week_changes, parse_week_changes
+
+
+def test_parse_week_changes():
+    changes = parse_week_changes({
+        'clear': 0,
+        'delete': ['3', 4],
+        'replace': [{'day_of_week': 'Mon', 'meal_type': 'lunch', 'meal_id': '7'},
+                    {'day_of_week': 'Tue', 'meal_type': 'dinner', 'meal_id': None}],
+        'add': [{'meal_type': 'snack', 'meal_id': 2}],
+    })
+    assert changes == {
+        'clear': False,
+        'delete': {3, 4},
+        'replace': {('Mon', 'lunch'): 7, ('Tue', 'dinner'): None},
+        'add': [(None, 'snack', 2)],
+    }
+
+
+@pytest.mark.parametrize('body', [
+    ['Mon'],
+    {'delete': ['x']},
+    {'replace': [{'day_of_week': 'Mon', 'meal_id': 1}]},
+    {'replace': [{'day_of_week': 'Someday', 'meal_type': 'lunch', 'meal_id': 1}]},
+    {'add': [{'day_of_week': 'Mon', 'meal_type': 'brunch', 'meal_id': 1}]},
+    {'add': [{'day_of_week': 'Mon'}]},
+    {'add': ['Mon']},
+])
+def test_parse_week_changes_rejects(body):
+    with pytest.raises(ValueError):
+        parse_week_changes(body)
+
+
+class FakeCursor:
+    """Serves a plan, its planned meals and the meals catalog"""
+
+    def __init__(self, plan_exists=True, meals=(1, 2, 7), planned=()):
+        self.plan_exists = plan_exists
+        self.meals = set(meals)
+        self.planned = list(planned)
+        self.statements = []
+        self.inserted = []
+
+    def execute(self, sql, args=None):
+        self.statements.append(' '.join(sql.split()))
+        if 'FROM meal_plans' in sql:
+            self.result = [{'plan_id': args[0]}] if self.plan_exists else []
+        elif 'FROM meals' in sql:
+            self.result = [{'meal_id': i} for i in args if i in self.meals]
+        elif 'FROM planned_meals' in sql:
+            self.result = self.planned
+        else:
+            self.result = []
+
+    def executemany(self, sql, rows):
+        self.inserted.extend(rows)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def fetchall(self):
+        return self.result
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    plans = []
+    monkeypatch.setattr(planner, 'refresh_plan_rollups', lambda cursor, plan_id: plans.append(plan_id))
+    return plans
+
+
+PLANNED = [
+    {'planned_meal_id': 10, 'day_of_week': 'Mon', 'meal_type': 'lunch'},
+    {'planned_meal_id': 11, 'day_of_week': 'Mon', 'meal_type': 'dinner'},
+    {'planned_meal_id': 12, 'day_of_week': 'Tue', 'meal_type': 'dinner'},
+]
+
+
+def test_apply_week_changes_replaces_deletes_and_adds(refreshed):
+    cursor = FakeCursor(planned=PLANNED)
+    changes = parse_week_changes({
+        'delete': [12],
+        'replace': [{'day_of_week': 'Mon', 'meal_type': 'lunch', 'meal_id': 7}],
+        'add': [{'day_of_week': 'Wed', 'meal_type': 'dinner', 'meal_id': 1}],
+    })
+    assert apply_week_changes(cursor, 5, changes) == {'removed': 2, 'added': 2}
+
+    delete = [s for s in cursor.statements if s.startswith('DELETE FROM planned_meals')]
+    assert len(delete) == 1
+    assert sorted(cursor.inserted) == [(5, 'Mon', 'lunch', 7), (5, 'Wed', 'dinner', 1)]
+    assert refreshed == [5]
+
+
+def test_apply_week_changes_clear(refreshed):
+    cursor = FakeCursor(planned=PLANNED)
+    result = apply_week_changes(cursor, 5, parse_week_changes({'clear': True}))
+    assert result == {'removed': 3, 'added': 0}
+    assert cursor.inserted == []
+
+
+def test_apply_week_changes_unknown_rows(refreshed):
+    with pytest.raises(ValueError, match='Unknown meal_id'):
+        apply_week_changes(FakeCursor(planned=PLANNED), 5,
+                           parse_week_changes({'add': [{'meal_id': 99}]}))
+    with pytest.raises(ValueError, match='not in this plan'):
+        apply_week_changes(FakeCursor(planned=PLANNED), 5,
+                           parse_week_changes({'delete': [40]}))
+    assert refreshed == []
+
+
+def test_apply_week_changes_missing_plan_or_no_op(refreshed):
+    assert apply_week_changes(FakeCursor(plan_exists=False), 5, parse_week_changes({})) is None
+    assert apply_week_changes(FakeCursor(), 5, parse_week_changes({})) == {'removed': 0, 'added': 0}
+    assert refreshed == []
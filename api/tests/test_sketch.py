@@ -0,0 +1,34 @@
+from backend.sketch import RELATIVE_ACCURACY, LatencySketch, bucket_index, bucket_value
+
+
+def test_bucket_value_within_relative_accuracy():
+    for value in (1.5, 12, 250, 9999.9):
+        assert abs(bucket_value(bucket_index(value)) - value) <= RELATIVE_ACCURACY * value
+    assert bucket_index(0.3) == bucket_index(1) == 0
+
+
+def test_empty_sketch():
+    assert LatencySketch().quantile(0.5) is None
+
+
+def test_merge_matches_single_sketch():
+    values = [float(v) for v in range(1, 1001)]
+    whole, left, right = LatencySketch(), LatencySketch(), LatencySketch()
+    for v in values:
+        whole.add(v)
+        (left if v % 2 else right).add(v)
+
+    merged = LatencySketch().merge(left).merge(right)
+    assert merged.buckets == whole.buckets
+    assert merged.count == 1000
+    for q, expected in ((0.5, 500), (0.95, 950), (0.99, 990)):
+        assert abs(merged.quantile(q) - expected) <= RELATIVE_ACCURACY * expected + 0.01
+
+
+def test_merge_from_stored_bucket_rows():
+    # Hourly rows come back as (bucket, count) pairs
+    sketch = LatencySketch({bucket_index(10): 3})
+    sketch.merge(LatencySketch({bucket_index(10): 1, bucket_index(200): 1}))
+    assert sketch.count == 5
+    assert sketch.percentiles()['p50_ms'] == round(bucket_value(bucket_index(10)), 2)
+    assert sketch.percentiles()['p99_ms'] == round(bucket_value(bucket_index(200)), 2)
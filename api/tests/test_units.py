@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from backend.units import UnitTable
+
+UNITS = [
+    {'unit': 'g', 'dimension': 'mass', 'to_base': 1},
+    {'unit': 'kg', 'dimension': 'mass', 'to_base': 1000},
+    {'unit': 'ml', 'dimension': 'volume', 'to_base': 1},
+    {'unit': 'cup', 'dimension': 'volume', 'to_base': 240},
+    {'unit': 'piece', 'dimension': 'count', 'to_base': 1},
+]
+CONVERSIONS = [
+    {'ingredient_id': 2, 'density_g_per_ml': 1.03, 'grams_per_piece': None},
+    {'ingredient_id': 1, 'density_g_per_ml': None, 'grams_per_piece': 50},
+]
+
+
+@pytest.fixture
+def table():
+    return UnitTable(UNITS, CONVERSIONS)
+
+
+def test_normalize_converts_to_grams_where_possible(table):
+    quantities, units = table.normalize(
+        [1, 2, 3, 3, 1],
+        ['piece', 'Cup ', 'kg', 'cup', 'pinch'],
+        [2, 1, 0.5, 1, 3]
+    )
+    assert list(units) == ['g', 'g', 'g', 'ml', 'pinch']
+    assert np.allclose(quantities, [100, 247.2, 500, 240, 3])
+
+
+def test_normalize_keeps_missing_unit(table):
+    quantities, units = table.normalize([3], [None], [None])
+    assert units[0] is None
+    assert quantities[0] == 0
+
+
+def test_aggregate_sums_per_ingredient_and_unit(table):
+    ids, units, totals = table.aggregate(
+        [2, 2, 3, 3, 3, 4],
+        ['ml', 'cup', 'g', 'ml', 'kg', None],
+        [100, 1, 10, 5, 1, 2]
+    )
+    groups = {(int(i), u): float(t) for i, u, t in zip(ids, units, totals)}
+    assert groups == pytest.approx({(2, 'g'): 350.2, (3, 'g'): 1010, (3, 'ml'): 5, (4, None): 2})
+
+
+def test_aggregate_empty(table):
+    ids, units, totals = table.aggregate([], [], [])
+    assert len(ids) == len(units) == len(totals) == 0
+
+
+def test_to_canonical(table):
+    assert table.to_canonical(1, 'piece', 3) == (150.0, 'g')
+    assert table.to_canonical(9, 'piece', 3) == (3.0, 'piece')
+    assert table.nbytes > 0
@@ -1,61 +1,429 @@
+import os
+import re
+import copy
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import streamlit as st
 import logging
 
 logger = logging.getLogger(__name__)
 
-API_BASE_URL = "http://api:4000/api"
+API_URL = os.getenv("API_URL", "http://api:8000").rstrip("/")
+API_BASE_URL = f"{API_URL}/api"
 
+# (connect, read) seconds; pass timeout= to a call to override
+DEFAULT_TIMEOUT = (
+    float(os.getenv("API_CONNECT_TIMEOUT", 3.05)),
+    float(os.getenv("API_READ_TIMEOUT", 10)),
+)
+SLOW_REQUEST_MS = float(os.getenv("API_SLOW_MS", 1000))
+GATHER_WORKERS = int(os.getenv("API_GATHER_WORKERS", 8))
+CACHE_MAX_ENTRIES = int(os.getenv("API_CACHE_MAX_ENTRIES", 512))
+# Rows asked for per page when following a list's next-page cursor
+PAGE_LIMIT = int(os.getenv("API_PAGE_LIMIT", 500))
 
-class APIClient:
+# Seconds a GET response is reused, by endpoint family (first match wins)
+CACHE_TTLS = (
+    (re.compile(r"^/meals/suggestions"), 30),
+    (re.compile(r"^/meals"), 300),
+    (re.compile(r"^/ingredients"), 300),
+    (re.compile(r"^/meal_plans/"), 60),
+    (re.compile(r"^/planned_meals/"), 60),
+    (re.compile(r"^/users/"), 60),
+    (re.compile(r"^/admin/"), 10),
+)
 
-    @staticmethod
-    def get(endpoint, params=None):
-        try:
-            url = f"{API_BASE_URL}{endpoint}"
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"GET request failed: {e}")
-            return None
+# Cache tags a POST/PUT/DELETE invalidates besides its own path. {id} is
+# the id captured from the path; {plan} is that plan, or the plan of a
+# planned meal; {user} is the plan's owner. A plan or user the client has
+# not seen yet becomes *, which matches every id in that segment.
+# Writes matching no rule drop their whole top-level family.
+INVALIDATIONS = (
+    # The bulk response is the plan's new week view; drop every cached copy
+    (re.compile(r"^/meal_plans/(\d+)/planned_meals/bulk"),
+     ["meal_plans/{id}", "users/{user}/week_view", "admin/meal_plans"]),
+    (re.compile(r"^/meal_plans/(\d+)/planned_meals"),
+     ["meal_plans/{id}", "users/{user}/week_view", "admin/meal_plans"]),
+    (re.compile(r"^/planned_meals/(\d+)"),
+     ["meal_plans/{plan}", "users/{user}/week_view", "admin/meal_plans"]),
+    (re.compile(r"^/meal_plans/(\d+)/templates"), ["users/{user}/meal_plan_templates"]),
+    # A new plan changes the previous/next week links of the user's other plans
+    (re.compile(r"^/meal_plans/(\d+)/clone"),
+     ["meal_plans/*/week_view", "users/{user}/week_view", "admin/meal_plans"]),
+    (re.compile(r"^/meal_plans/(\d+)"), ["meal_plans/{id}", "users/{user}/week_view", "admin/meal_plans"]),
+    # Any plan's to-buy list may depend on the pantry
+    (re.compile(r"^/users/(\d+)/inventory"), ["users/{id}/inventory", "meals/suggestions", "meal_plans"]),
+    (re.compile(r"^/users/(\d+)/consumed_meals"), ["users/{id}"]),
+    (re.compile(r"^/users/(\d+)/meal_plans"),
+     ["meal_plans/*/week_view", "users/{id}/week_view", "admin/meal_plans"]),
+    (re.compile(r"^/users/(\d+)/meal_plan_templates"), ["users/{id}/meal_plan_templates"]),
+    (re.compile(r"^/admin/error_logs"), ["admin/error_logs", "admin/system_health"]),
+    (re.compile(r"^/admin/ingredients/duplicates"), ["ingredients", "meals", "admin/ingredients"]),
+    # Grocery lists are converted with the ingredient's conversions on read
+    (re.compile(r"^/admin/ingredients/(\d+)/conversions"), ["meal_plans", "admin/units"]),
+    (re.compile(r"^/admin/catalog_cache"), ["meals", "ingredients"]),
+)
+
+
+def session_client_id():
+    """Id of the current Streamlit session, None outside a script run
+
+    Sent as X-Client-Id so the API keeps this session's reads on the
+    primary database right after its writes, without pinning other
+    sessions that share the process-wide requests.Session.
+    """
+    try:
+        return st.session_state.setdefault("api_client_id", uuid.uuid4().hex)
+    except Exception:
+        return None
+
+
+def path_tags(endpoint):
+    """Every leading run of path segments: /a/1/b -> a, a/1, a/1/b"""
+    parts = [p for p in endpoint.split("?")[0].split("/") if p]
+    return ["/".join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def entry_tags(endpoint):
+    """path_tags plus the same runs with ids as *: a/*, a/*/b"""
+    masked = re.sub(r"(?<=/)\d+(?=/|$)", "*", endpoint.split("?")[0])
+    return set(path_tags(endpoint)) | set(path_tags(masked))
+
+
+class ResponseCache:
+    """Thread-safe LRU of GET responses with per-family TTLs and tag invalidation
+
+    One cache is shared by every Streamlit session in the process, so a
+    write made in one session also drops what other sessions cached for
+    the same paths. The last ETag and body of each GET are kept beyond
+    TTLs and invalidation so expired entries are revalidated with
+    If-None-Match instead of downloaded again; for a paginated list the
+    body is kept with its next-page cursor, which a 304 does not repeat.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires, tags, value)
+        self._validators = OrderedDict()  # key -> (etag, (value, next_cursor))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
 
     @staticmethod
-    def post(endpoint, data):
-        try:
-            url = f"{API_BASE_URL}{endpoint}"
-            response = requests.post(url, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"POST request failed: {e}")
-            return None
+    def ttl_for(endpoint):
+        for pattern, ttl in CACHE_TTLS:
+            if pattern.match(endpoint):
+                return ttl
+        return 0
 
     @staticmethod
-    def put(endpoint, data):
+    def key(endpoint, params):
+        return endpoint, tuple(sorted((params or {}).items()))
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry[2])
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, entry_tags(key[0]), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def validator(self, key):
+        with self._lock:
+            return self._validators.get(key)
+
+    def set_validator(self, key, etag, value):
+        with self._lock:
+            self._validators[key] = (etag, copy.deepcopy(value))
+            self._validators.move_to_end(key)
+            while len(self._validators) > self.max_entries:
+                self._validators.popitem(last=False)
+
+    def not_modified(self, key):
+        """Body stored with key's validator, after a 304"""
+        with self._lock:
+            self.revalidated += 1
+            self._validators.move_to_end(key)
+            return copy.deepcopy(self._validators[key][1])
+
+    def invalidate(self, *tags):
+        """Drop every entry whose path starts with one of the tags"""
+        tags = set(tags)
+        with self._lock:
+            stale = [k for k, (_, entry_tags, _) in self._entries.items() if entry_tags & tags]
+            for k in stale:
+                del self._entries[k]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._validators.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "revalidated": self.revalidated,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+class APIClient:
+    """Shared keep-alive session for every page's API calls
+
+    The module-level instance survives Streamlit reruns, so connections
+    are reused across them. Idempotent verbs (GET, PUT, DELETE) are
+    retried with exponential backoff on connection errors and 502/503/504;
+    POST is never retried. Calls return the decoded JSON or None on error.
+    GET responses are cached (see ResponseCache) and writes invalidate the
+    paths they affect. List endpoints return one page per call (see the
+    API's keyset pagination); get() follows X-Next-Cursor and returns the
+    whole list unless the caller passes after or limit itself.
+    """
+
+    def __init__(self, base_url=API_BASE_URL, timeout=DEFAULT_TIMEOUT,
+                 retries=3, backoff_factor=0.3, pool_size=10, workers=GATHER_WORKERS):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"]),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.cache = ResponseCache()
+        self._plan_of = {}  # planned_meal_id -> plan_id, for invalidation
+        self._user_of = {}  # plan_id -> user_id, for invalidation
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-gather")
+        self._lock = threading.Lock()
+        self._local = threading.local()  # client_id for gather's worker threads
+        self._latency = {}  # "METHOD endpoint" -> {'count', 'total_ms', 'max_ms', 'errors'}
+
+    def _record(self, method, endpoint, elapsed_ms, failed):
+        key = f"{method} {endpoint}"
+        with self._lock:
+            stats = self._latency.setdefault(
+                key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0}
+            )
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["errors"] += 1 if failed else 0
+
+        if elapsed_ms >= SLOW_REQUEST_MS:
+            logger.warning(f"Slow API call {key}: {elapsed_ms:.0f}ms")
+        else:
+            logger.debug(f"API call {key}: {elapsed_ms:.0f}ms")
+
+    def request(self, method, endpoint, params=None, data=None, timeout=None):
+        return self._send(method, endpoint, params, data, timeout)[0]
+
+    def _send(self, method, endpoint, params=None, data=None, timeout=None):
+        """request() plus the X-Next-Cursor of a paginated GET, or None"""
+        # GETs send the last ETag seen for the same URL
+        key = self.cache.key(endpoint, params)
+        validator = self.cache.validator(key) if method == "GET" else None
+        headers = {"If-None-Match": validator[0]} if validator else {}
+        client_id = getattr(self._local, "client_id", None) or session_client_id()
+        if client_id:
+            headers["X-Client-Id"] = client_id
+
+        started = time.perf_counter()
+        failed = True
         try:
-            url = f"{API_BASE_URL}{endpoint}"
-            response = requests.put(url, json=data)
+            response = self.session.request(
+                method, f"{self.base_url}{endpoint}", params=params, json=data,
+                headers=headers, timeout=timeout or self.timeout
+            )
             response.raise_for_status()
-            return response.json()
+            failed = False
+            if response.status_code == 304 and validator:
+                return self.cache.not_modified(key)
+
+            result = response.json()
+            next_cursor = response.headers.get("X-Next-Cursor")
+            etag = response.headers.get("ETag")
+            if method == "GET" and etag:
+                self.cache.set_validator(key, etag, (result, next_cursor))
+            return result, next_cursor
         except requests.exceptions.RequestException as e:
-            logger.error(f"PUT request failed: {e}")
-            return None
+            logger.error(f"{method} request failed: {e}")
+            return None, None
+        finally:
+            self._record(method, endpoint, (time.perf_counter() - started) * 1000, failed)
+            if method != "GET":
+                # Even a failed write may have been applied
+                self.invalidate_for(endpoint)
 
-    @staticmethod
-    def delete(endpoint):
+    def get(self, endpoint, params=None, timeout=None, cache=True):
+        ttl = self.cache.ttl_for(endpoint) if cache else 0
+        key = self.cache.key(endpoint, params)
+        if ttl:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        result, next_cursor = self._send("GET", endpoint, params=params, timeout=timeout)
+        if next_cursor and not {"after", "limit"} & set(params or {}):
+            result = self._rest_of_list(endpoint, params, result, next_cursor, timeout)
+        if result is not None:
+            self._remember_plans(endpoint, result)
+            if ttl:
+                self.cache.set(key, result, ttl)
+        return result
+
+    def _rest_of_list(self, endpoint, params, rows, next_cursor, timeout):
+        """Append the following pages to rows, None if any page fails"""
+        rows = list(rows)
+        while next_cursor:
+            page, next_cursor = self._send(
+                "GET", endpoint, dict(params or {}, after=next_cursor, limit=PAGE_LIMIT),
+                timeout=timeout
+            )
+            if page is None:
+                return None
+            rows.extend(page)
+        return rows
+
+    def _remember_plans(self, endpoint, result):
+        """Note planned meal -> plan and plan -> user pairs seen in a GET"""
+        rows = result if isinstance(result, list) else [result]
+        listed = re.match(r"^/meal_plans/(\d+)/planned_meals$", endpoint)
+        for row in rows:
+            if not isinstance(row, dict):
+                continue
+            if isinstance(row.get("plan"), dict):
+                # A week view: its header plus the meals in its grid
+                plan = row["plan"]
+                self._user_of[plan["plan_id"]] = plan["user_id"]
+                meals = [m for day in row.get("days", []) for ms in day["slots"].values() for m in ms]
+                for meal in meals + row.get("unscheduled", []):
+                    self._plan_of[meal["planned_meal_id"]] = plan["plan_id"]
+                continue
+            if "plan_id" in row and "user_id" in row:
+                self._user_of[row["plan_id"]] = row["user_id"]
+            if "planned_meal_id" in row:
+                if "plan_id" in row:
+                    self._plan_of[row["planned_meal_id"]] = row["plan_id"]
+                elif listed:
+                    self._plan_of[row["planned_meal_id"]] = int(listed.group(1))
+
+    def invalidate_for(self, endpoint):
+        """Drop cached GETs that a write to endpoint may have changed"""
+        own = path_tags(endpoint)
+        tags = own[-1:]
+        for pattern, templates in INVALIDATIONS:
+            match = pattern.match(endpoint)
+            if match:
+                found = match.group(1) if match.groups() else None
+                if endpoint.startswith("/planned_meals/"):
+                    plan_id = self._plan_of.get(int(found))
+                elif endpoint.startswith("/meal_plans/"):
+                    plan_id = int(found)
+                else:
+                    plan_id = None
+                values = {
+                    "id": found,
+                    "plan": plan_id or "*",
+                    "user": self._user_of.get(plan_id) or "*",
+                }
+                tags += [template.format(**values) for template in templates]
+                break
+        else:
+            tags = own[:1]
+        self.cache.invalidate(*tags)
+
+    def post(self, endpoint, data, timeout=None):
+        return self.request("POST", endpoint, data=data, timeout=timeout)
+
+    def put(self, endpoint, data, timeout=None):
+        return self.request("PUT", endpoint, data=data, timeout=timeout)
+
+    def delete(self, endpoint, timeout=None):
+        return self.request("DELETE", endpoint, timeout=timeout)
+
+    def gather(self, calls, timeout=None):
+        """Run several GETs concurrently, returns {name: json or None}
+
+        calls maps a name to an endpoint or an (endpoint, params) pair. A
+        failing call yields None for its name without affecting the others,
+        so the total wait is that of the slowest call.
+
+            data = api.gather({
+                "meals": f"/meal_plans/{plan_id}/planned_meals",
+                "nutrition": f"/meal_plans/{plan_id}/weekly_nutrition",
+            })
+        """
+        # Worker threads cannot read st.session_state, so pass the id along
+        client_id = session_client_id()
+        futures = {}
+        for name, call in calls.items():
+            endpoint, params = (call, None) if isinstance(call, str) else call
+            futures[name] = self._executor.submit(
+                self._get_as, client_id, endpoint, params, timeout
+            )
+
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                logger.error(f"Gathered call {name} failed: {e}")
+                results[name] = None
+        return results
+
+    def _get_as(self, client_id, endpoint, params, timeout):
+        self._local.client_id = client_id
         try:
-            url = f"{API_BASE_URL}{endpoint}"
-            response = requests.delete(url)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"DELETE request failed: {e}")
-            return None
+            return self.get(endpoint, params, timeout)
+        finally:
+            self._local.client_id = None
+
+    def latency_stats(self):
+        """Per-endpoint call counts and average/max latency in ms"""
+        with self._lock:
+            return {
+                key: {
+                    "count": s["count"],
+                    "avg_ms": round(s["total_ms"] / s["count"], 1),
+                    "max_ms": round(s["max_ms"], 1),
+                    "errors": s["errors"],
+                }
+                for key, s in self._latency.items()
+            }
 
 
 def show_db_change(operation, table, details=""):
     st.info(f"Database {operation}: {table} table updated. {details}")
 
 
-api = APIClient()
\ No newline at end of file
+api = APIClient()
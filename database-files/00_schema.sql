@@ -49,7 +49,8 @@ CREATE TABLE meals (
    carbs_g DECIMAL(10,2),
    fat_g DECIMAL(10,2),
    sodium_mg DECIMAL(10,2),
-   recipe_steps TEXT
+   recipe_steps TEXT,
+   INDEX idx_meals_name (meal_name)
 );
 
 CREATE TABLE ingredients (
@@ -58,7 +59,8 @@ CREATE TABLE ingredients (
    category VARCHAR(100),
    is_active BOOLEAN DEFAULT TRUE,
    standardized_name VARCHAR(255),
-   last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+   last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+   INDEX idx_ingredients_category_name (category, ingredient_name)
 );
 
 CREATE TABLE meal_ingredients (
@@ -71,6 +73,21 @@ CREATE TABLE meal_ingredients (
    FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
 );
 
+-- Unit conversion: size of each unit in g, ml or pieces, and per-ingredient
+-- density and piece weight for converting volumes and counts to grams
+CREATE TABLE units (
+   unit VARCHAR(50) PRIMARY KEY,
+   dimension ENUM('mass','volume','count') NOT NULL,
+   to_base DECIMAL(16,6) NOT NULL
+);
+
+CREATE TABLE ingredient_unit_conversions (
+   ingredient_id BIGINT PRIMARY KEY,
+   density_g_per_ml DECIMAL(10,4),
+   grams_per_piece DECIMAL(10,2),
+   FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
+);
+
 -- Meal Planning
 
 CREATE TABLE meal_plans (
@@ -79,7 +96,11 @@ CREATE TABLE meal_plans (
    week_start DATE NOT NULL,
    week_end DATE NOT NULL,
    status ENUM('draft','complete','corrupted','failed') DEFAULT 'draft',
-   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+   created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+   status_rank TINYINT AS (FIELD(status, 'failed', 'corrupted', 'draft', 'complete')) STORED NOT NULL,
+   INDEX idx_meal_plans_status_created (status, created_at),
+   INDEX idx_meal_plans_status_rank (status_rank, created_at DESC, plan_id DESC),
+   INDEX idx_meal_plans_user_week (user_id, week_start),
    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -89,25 +110,63 @@ CREATE TABLE planned_meals (
    meal_id BIGINT NOT NULL,
    day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun'),
    meal_type ENUM('breakfast','lunch','dinner','snack'),
+   INDEX idx_planned_meals_plan_slot (plan_id, day_of_week, meal_type),
    FOREIGN KEY (plan_id) REFERENCES meal_plans(plan_id) ON DELETE CASCADE,
    FOREIGN KEY (meal_id) REFERENCES meals(meal_id) ON DELETE CASCADE
 );
 
+-- Per-day nutrition rollup of a plan, maintained by the planned_meals routes
+CREATE TABLE plan_nutrition_summary (
+   plan_id BIGINT NOT NULL,
+   day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun','Unscheduled') NOT NULL,
+   meal_count INT NOT NULL DEFAULT 0,
+   calories INT NOT NULL DEFAULT 0,
+   protein_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+   carbs_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+   fat_g DECIMAL(10,2) NOT NULL DEFAULT 0,
+   PRIMARY KEY (plan_id, day_of_week),
+   FOREIGN KEY (plan_id) REFERENCES meal_plans(plan_id) ON DELETE CASCADE
+);
+
+-- Named week templates saved from a plan and reapplied to new weeks
+CREATE TABLE meal_plan_templates (
+   template_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+   user_id BIGINT NOT NULL,
+   name VARCHAR(100) NOT NULL,
+   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+   updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+   UNIQUE KEY uq_meal_plan_templates_user_name (user_id, name),
+   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE meal_plan_template_meals (
+   template_meal_id BIGINT PRIMARY KEY AUTO_INCREMENT,
+   template_id BIGINT NOT NULL,
+   meal_id BIGINT NOT NULL,
+   day_of_week ENUM('Mon','Tue','Wed','Thu','Fri','Sat','Sun'),
+   meal_type ENUM('breakfast','lunch','dinner','snack'),
+   INDEX idx_template_meals_template (template_id),
+   FOREIGN KEY (template_id) REFERENCES meal_plan_templates(template_id) ON DELETE CASCADE,
+   FOREIGN KEY (meal_id) REFERENCES meals(meal_id) ON DELETE CASCADE
+);
+
 -- Grocery List
 
 CREATE TABLE grocery_list (
    gl_id BIGINT PRIMARY KEY AUTO_INCREMENT,
    user_id BIGINT NOT NULL,
+   plan_id BIGINT NULL UNIQUE,
    date_generated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
+   FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+   FOREIGN KEY (plan_id) REFERENCES meal_plans(plan_id) ON DELETE CASCADE
 );
 
 CREATE TABLE grocery_list_ingredients (
    gl_id BIGINT NOT NULL,
    ingredient_id BIGINT NOT NULL,
    quantity DECIMAL(10,2),
-   unit VARCHAR(50),
-   PRIMARY KEY (gl_id, ingredient_id),
+   unit VARCHAR(50) NOT NULL,
+   PRIMARY KEY (gl_id, ingredient_id, unit),
    FOREIGN KEY (gl_id) REFERENCES grocery_list(gl_id) ON DELETE CASCADE,
    FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
 );
@@ -119,19 +178,23 @@ CREATE TABLE inventory (
    user_id BIGINT NOT NULL,
    ingredient_id BIGINT NOT NULL,
    quantity DECIMAL(10,2),
+   unit VARCHAR(50),
    expiration_date DATE,
+   INDEX idx_inventory_user_expiration (user_id, expiration_date),
+   UNIQUE KEY uq_inventory_user_ingredient (user_id, ingredient_id),
    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
    FOREIGN KEY (ingredient_id) REFERENCES ingredients(ingredient_id) ON DELETE CASCADE
 );
 
 CREATE TABLE inventory_event_log (
    event_id BIGINT PRIMARY KEY AUTO_INCREMENT,
-   inventory_id BIGINT NOT NULL,
+   inventory_id BIGINT NULL,
    user_id BIGINT NOT NULL,
    event_type ENUM('ADDED','USED','EXPIRED','DISCARDED','ADJUSTED'),
    event_quantity DECIMAL(10,2),
    event_timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-   FOREIGN KEY (inventory_id) REFERENCES inventory(inventory_id) ON DELETE CASCADE,
+   CONSTRAINT fk_inventory_event_log_inventory FOREIGN KEY (inventory_id)
+      REFERENCES inventory(inventory_id) ON DELETE SET NULL,
    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -156,6 +219,7 @@ CREATE TABLE daily_nutrition_summary (
    carbs_g DECIMAL(10,2),
    fat_g DECIMAL(10,2),
    sodium_mg DECIMAL(10,2),
+   UNIQUE KEY uq_daily_nutrition_user_date (user_id, summary_date),
    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
 );
 
@@ -165,6 +229,7 @@ CREATE TABLE meal_cost_history (
    calculation_date DATE NOT NULL,
    total_cost DECIMAL(10,2),
    cost_per_serving DECIMAL(10,2),
+   INDEX idx_meal_cost_meal_date (meal_id, calculation_date),
    FOREIGN KEY (meal_id) REFERENCES meals(meal_id) ON DELETE CASCADE
 );
 
@@ -176,7 +241,34 @@ CREATE TABLE api_logs (
    endpoint VARCHAR(255),
    request_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
    response_time_ms INT,
-   status_code INT
+   status_code INT,
+   INDEX idx_api_logs_time_service (request_time, api_service)
+);
+
+CREATE TABLE resource_versions (
+   scope VARCHAR(100) PRIMARY KEY,
+   version BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE api_log_hourly (
+   hour_start DATETIME NOT NULL,
+   api_service VARCHAR(100) NOT NULL,
+   endpoint VARCHAR(255) NOT NULL,
+   request_count INT NOT NULL DEFAULT 0,
+   error_count INT NOT NULL DEFAULT 0,
+   total_ms BIGINT NOT NULL DEFAULT 0,
+   min_ms INT,
+   max_ms INT,
+   PRIMARY KEY (hour_start, api_service, endpoint)
+);
+
+CREATE TABLE api_log_hourly_sketch (
+   hour_start DATETIME NOT NULL,
+   api_service VARCHAR(100) NOT NULL,
+   endpoint VARCHAR(255) NOT NULL,
+   bucket SMALLINT NOT NULL,
+   bucket_count INT NOT NULL DEFAULT 0,
+   PRIMARY KEY (hour_start, api_service, endpoint, bucket)
 );
 
 CREATE TABLE error_logs (
@@ -190,6 +282,9 @@ CREATE TABLE error_logs (
    related_ingredient_id BIGINT NULL,
    is_resolved BOOLEAN DEFAULT FALSE,
    resolved_by_admin_id BIGINT NULL,
+   INDEX idx_error_logs_timestamp (timestamp),
+   INDEX idx_error_logs_resolved_timestamp (is_resolved, timestamp),
+   INDEX idx_error_logs_status (is_resolved, severity, timestamp),
    FOREIGN KEY (related_user_id) REFERENCES users(user_id),
    FOREIGN KEY (related_plan_id) REFERENCES meal_plans(plan_id),
    FOREIGN KEY (related_ingredient_id) REFERENCES ingredients(ingredient_id),
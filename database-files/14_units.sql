@@ -0,0 +1,13 @@
+USE MealBuddy;
+
+insert into units (unit, dimension, to_base) values ('g', 'mass', 1);
+insert into units (unit, dimension, to_base) values ('kg', 'mass', 1000);
+insert into units (unit, dimension, to_base) values ('oz', 'mass', 28.349523);
+insert into units (unit, dimension, to_base) values ('lb', 'mass', 453.59237);
+insert into units (unit, dimension, to_base) values ('ml', 'volume', 1);
+insert into units (unit, dimension, to_base) values ('l', 'volume', 1000);
+insert into units (unit, dimension, to_base) values ('tsp', 'volume', 4.928922);
+insert into units (unit, dimension, to_base) values ('tbsp', 'volume', 14.786765);
+insert into units (unit, dimension, to_base) values ('cup', 'volume', 236.588237);
+insert into units (unit, dimension, to_base) values ('pinch', 'volume', 0.308058);
+insert into units (unit, dimension, to_base) values ('piece', 'count', 1);